@@ -0,0 +1,95 @@
+"""
+This script compares two backups of the AWS Route 53 hosted zones
+made by aws_dump_backup_files.py
+"""
+from webapis import utils
+from webapis.awsapi.backup_diff import diff_backup_directories, get_record_set_key
+from webapis.utils import Console
+
+welcome_msg = """
+-------------------------------------------------------------------------------------------------
+**                                                                                             **
+**                         AMAZON WEB SERVICES ROUTE 53 BACKUP DIFF                            **
+**                                                                                             **
+**                    Compare two backups of the Route 53 Hosted Zones                         **
+-------------------------------------------------------------------------------------------------
+"""
+
+
+def main():
+    """
+    Report the record sets added, removed and modified between two backups
+    of the Route 53 Hosted Zones.
+
+    This script expects:
+     - the path to the directory of the old backup, and
+     - the path to the directory of the new backup.
+
+    The zones are compared using their JSON backups if both backups have one,
+    and their CloudFormation YAML templates otherwise. Zones whose backup files
+    are identical are skipped without being parsed. Zones that have no common
+    format in both backups, or whose record sets can't be told apart, like the
+    weighted record sets of the YAML templates which have no SetIdentifier, are
+    reported as not comparable.
+
+    Usage:
+
+    ```
+    <python 3 interpreter> aws_diff_backup_files.py \
+            --old etc/dump/aws_backup_files_yesterday/ \
+            --new etc/dump/aws_backup_files/
+    ```
+    """
+    Console.print_header(welcome_msg)
+    parser = utils.get_diff_arg_parser(description="Compare two backups of the AWS Route 53 hosted zones")
+    args = parser.parse_args()
+
+    report_changed_zones_count = 0
+    report_added_count = 0
+    report_removed_count = 0
+    report_modified_count = 0
+    report_not_comparable_count = 0
+    for zone_diff in diff_backup_directories(args.old_dump, args.new_dump):
+        if zone_diff.diff is None:
+            Console.print_red("\n****** Zone: %s, File: %s: not comparable, %s"
+                              % (zone_diff.zone_name, zone_diff.file_name, zone_diff.not_comparable_reason))
+            report_not_comparable_count += 1
+            continue
+        print("\n****** Zone: %s, File: %s" % (zone_diff.zone_name, zone_diff.file_name))
+        for record_set in zone_diff.diff.added:
+            Console.print_green("\t+ ", format_record_set_key(record_set))
+        for record_set in zone_diff.diff.removed:
+            Console.print_red("\t- ", format_record_set_key(record_set))
+        for old_record_set, new_record_set in zone_diff.diff.modified:
+            Console.print_yellow("\t~ ", format_record_set_key(new_record_set))
+            for key in sorted(set(old_record_set) | set(new_record_set)):
+                if old_record_set.get(key) != new_record_set.get(key):
+                    print("\t\t%s: %s -> %s" % (key, old_record_set.get(key), new_record_set.get(key)))
+        report_changed_zones_count += 1
+        report_added_count += len(zone_diff.diff.added)
+        report_removed_count += len(zone_diff.diff.removed)
+        report_modified_count += len(zone_diff.diff.modified)
+    Console.print_green("\n", report_changed_zones_count, " zone(s) changed: ",
+                        report_added_count, " record set(s) added, ",
+                        report_removed_count, " removed and ",
+                        report_modified_count, " modified.")
+    if report_not_comparable_count:
+        Console.print_red(report_not_comparable_count, " zone(s) not comparable.")
+    Console.print_good_bye_message()
+
+
+def format_record_set_key(record_set: dict) -> str:
+    """
+    Provide a printable identifier of a record set.
+
+    :param record_set: a record set, as found in a backup file
+    :return: the name and type of the record set, and its set identifier if any
+    """
+    name, record_type, set_identifier = get_record_set_key(record_set)
+    if set_identifier is None:
+        return "%s %s" % (name, record_type)
+    return "%s %s (%s)" % (name, record_type, set_identifier)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,21 @@
 """
 http://boto3.readthedocs.io/en/latest/reference/services/route53.html#Route53.Client.list_hosted_zones
 """
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from typing import Iterator, List, NamedTuple
 import boto3
 import botocore.client
-import yaml
-from webapis.awsapi.data_model import ResourceRecordSetList
+import botocore.config
+import settings
+from webapis.awsapi.backup_manifest import BackupManifest
+from webapis.awsapi.backup_writers import BACKUP_WRITERS
+from webapis.awsapi.data_model import ResourceRecordSetList, ResourceRecordSet
 from webapis import utils
+from webapis.instrumentation import instrument_boto3_client, write_metrics_on_exit
 from webapis.utils import Console
-from webapis.awsapi.utils import update_type_counter_aws_resource_record_set
+from webapis.awsapi.utils import (update_type_counter_aws_resource_record_set, call_with_backoff,
+                                  iter_resource_record_set_pages)
 
 welcome_msg = """
 -------------------------------------------------------------------------------------------------
@@ -28,6 +35,18 @@ def main():
      - the path to the output file, where the template will be create.
      The directories of this path must exist.
 
+    Hosted zones can be backed up concurrently with the --workers option.
+    Route 53 throttling errors are retried with an exponential backoff.
+
+    With the --incremental option, the zones that did not change since the
+    last backup (according to the manifest kept in the output directory)
+    are skipped. The manifest is saved after the backup of each zone, so that
+    an interrupted backup resumes where it stopped.
+
+    The --format option selects one or several backup formats: a CloudFormation
+    YAML template (default), a BIND zone file and/or compact JSON. The record sets
+    of a zone are listed only once, whatever the number of formats.
+
     Usage:
 
     ```
@@ -39,123 +58,167 @@ def main():
     Console.print_header(welcome_msg)
     parser = utils.get_output_arg_parser(description="Create a YAML backup for AWS route53",
                                          require_credentials=False)
+    parser.add_argument('--workers',
+                        dest="workers",
+                        type=int,
+                        default=settings.awsapi["route53"]["default_workers"],
+                        help='number of hosted zones to back up concurrently')
+    parser.add_argument('--incremental',
+                        action='store_true',
+                        required=False,
+                        help='skip the hosted zones that did not change since the last backup')
+    parser.add_argument('--format',
+                        dest="formats",
+                        nargs='+',
+                        choices=sorted(BACKUP_WRITERS),
+                        default=["cloudformation"],
+                        help='formats of the backup files')
     args = parser.parse_args()
+    write_metrics_on_exit(args)
 
-    client = boto3.client('route53')
+    client = boto3.client('route53', config=botocore.config.Config(
+        max_pool_connections=max(args.workers, settings.awsapi["route53"]["max_pool_connections"])))
+    instrument_boto3_client(client)
     print("\nRetrieving Route53 Hosted Zones...\n")
-    request_result = client.list_hosted_zones()
 
+    manifest = None
+    if args.incremental:
+        manifest = BackupManifest(args.dump_file + settings.awsapi["route53"]["manifest_file_name"])
+
+    formats = list(dict.fromkeys(args.formats))
     report_total_hosted_zones = 0
+    report_skipped_hosted_zones = 0
+
+    # Each zone is backed up by a worker thread, but the reports are
+    # consumed in submission order so that the console output stays ordered.
+    with ThreadPoolExecutor(max_workers=max(args.workers, 1)) as executor:
+        reports = executor.map(lambda hosted_zone: dump_hosted_zone(hosted_zone, args.with_soa,
+                                                                    args.dump_file, client, manifest,
+                                                                    formats),
+                               iter_hosted_zones(client))
+        for report in reports:
+            if report.skipped:
+                report_skipped_hosted_zones += 1
+            if print_hosted_zone_backup_report(report):
+                report_total_hosted_zones += 1
+    if manifest is not None:
+        Console.print_green("%s unchanged zones have been skipped" % report_skipped_hosted_zones)
+    Console.print_green("%s zones have been backed up" % report_total_hosted_zones)
+    Console.print_good_bye_message()
 
+
+HostedZoneBackupReport = NamedTuple("HostedZoneBackupReport", [("zone_name", str),
+                                                               ("file_names", List[str]),
+                                                               ("type_counter", dict),
+                                                               ("skipped", bool)])
+"""
+Outcome of the backup of a hosted zone. file_names is empty when no file has been written,
+skipped is True when the zone did not change since the last (incremental) backup.
+"""
+
+
+def iter_hosted_zones(client: botocore.client.BaseClient) -> Iterator[dict]:
+    """
+    Iterate over all the hosted zones of the account, following the pagination markers.
+
+    :param client: the boto3 Route 53 client
+    :return: an iterator over the HostedZones items of the list_hosted_zones responses
+    """
+    request_result = call_with_backoff(client.list_hosted_zones)
     while request_result is not None:
         for hosted_zone in request_result.get('HostedZones', ()):
-            if dump_hosted_zone(hosted_zone, args.with_soa, args.dump_file, client):
-                report_total_hosted_zones += 1
+            yield hosted_zone
         next_marker = request_result.get('NextMarker')
         if next_marker:
             print("\nRetrieving Route 53 next Hosted Zones\n")
-            request_result = client.list_hosted_zones(Marker=next_marker)
+            request_result = call_with_backoff(client.list_hosted_zones, Marker=next_marker)
         else:
             request_result = None
-    Console.print_green("%s templates have been created" % report_total_hosted_zones)
-    Console.print_good_bye_message()
 
 
-def dump_hosted_zone(hosted_zone: dict, with_soa: bool, output_file_path: str, boto3_client: botocore.client.BaseClient):
-    zone_id = hosted_zone["Id"].split('/')[2]
-    zone_name = hosted_zone["Name"]
-    zone_details = ResourceRecordSetList(boto3_client.list_resource_record_sets(HostedZoneId=zone_id))
-    type_counter_aws_resource_record_set = {}
-    cloud_formation_template_dict = {
-        "AWSTemplateFormatVersion": '2010-09-09',
-        "Description": "Backup definition for the " + zone_name + " zone",
-        "Resources": {
-            "zone": {
-                "Type": "AWS::Route53::HostedZone",
-                "Properties": {
-                    "Name": zone_name
-                }
-            },
-            "records": {
-                "DependsOn": "Zone",
-                "Type": "AWS::Route53::RecordSetGroup",
-                "Properties": {
-                    "HostedZoneName": zone_name,
-                    "Comment": "Zone record for " + zone_name + " HostedZoneId is " + zone_id,
-                    "RecordSets": get_resource_record_set_cloud_formation_dict_list(
-                        zone_details, with_soa, boto3_client, zone_id, type_counter_aws_resource_record_set)
-                }
-            }
-        }
-    }
-    file_name = output_file_path + zone_name + 'yml'
-    set_record_list = cloud_formation_template_dict.get("Resources").get("records").get('Properties').get('RecordSets')
-    if len(set_record_list) != 0:
-        print("Creating template for %s zone" % zone_name)
-        with open(file_name, 'w+') as outfile:
-            yaml.dump(cloud_formation_template_dict, outfile,
-                      explicit_start=True, width=1000, default_flow_style=False)
-        print("\t\t File: ", file_name)
-        print("\t\t Total Records: ", sum(type_counter_aws_resource_record_set.values()))
-        print("\t\t Records types: ", str(type_counter_aws_resource_record_set))
+def print_hosted_zone_backup_report(report: HostedZoneBackupReport) -> bool:
+    """
+    Print the outcome of the backup of a hosted zone.
+
+    :param report: the report returned by dump_hosted_zone
+    :return: True if backup files have been created for the zone
+    """
+    if report.skipped:
+        print("Skipping %s zone, unchanged since the last backup\n" % report.zone_name)
+        return False
+    if report.file_names:
+        print("Creating backup for %s zone" % report.zone_name)
+        for file_name in report.file_names:
+            print("\t\t File: ", file_name)
+        print("\t\t Total Records: ", sum(report.type_counter.values()))
+        print("\t\t Records types: ", str(report.type_counter))
         print("\t\t ++ \tDone\n")
         return True
-    Console.print_red("Can't create %s zone template, recordSets is empty\n" % zone_name)
+    Console.print_red("Can't create %s zone template, recordSets is empty\n" % report.zone_name)
     return False
 
 
-def get_resource_record_set_cloud_formation_dict_list(hosted_zone: ResourceRecordSetList,
-                                                      with_soa: str,
-                                                      client: botocore.client.BaseClient, zone_id: str,
-                                                      type_counter_aws_resource_record_set: dict) -> List[dict]:
+def dump_hosted_zone(hosted_zone: dict, with_soa: bool, output_file_path: str,
+                     boto3_client: botocore.client.BaseClient,
+                     manifest: BackupManifest = None,
+                     formats: List[str] = ("cloudformation",)) -> HostedZoneBackupReport:
     """
-    Provide a dict representation of a resource record set that can
-    be used to dump a cloud formation formatted YAML file.
-
-    :return: a dict in the form:
-        {
-            "Name": str,
-            "Type": str,
-            "TTL": str,
-            "ResourceRecord": [str],
-            "AliasTarget": {
-                "DNSName": str,
-                "HostedZoneId": str
-            }
-        }
+    Write the backup files of a hosted zone.
+
+    This function is called from the worker threads: it must not print
+    anything, the report it returns is printed by the main thread.
+
+    :param hosted_zone: a HostedZones item from the list_hosted_zones response
+    :param with_soa: whether or not SOA and NS records must be included
+    :param output_file_path: directory where the backup files will be created
+    :param boto3_client: the boto3 Route 53 client
+    :param manifest: when provided, the zone is skipped if it did not change since
+    the last backup, and the manifest is updated and saved otherwise.
+    :param formats: names of the backup formats, keys of BACKUP_WRITERS
+    :return: the report of the backup of the zone
     """
-    resource_record_set_cloud_formation_dict_list = []
-    while hosted_zone is not None:
-        for resource_record_set in hosted_zone.resource_record_sets:
-            if ((resource_record_set.type != "SOA" and resource_record_set.type != "NS")
-            or (with_soa and (resource_record_set.type == "SOA" or resource_record_set.type == "NS"))):
-                resource_record_values = [resource_record.value
-                                          for resource_record in resource_record_set.resource_records]
-                resource_record_set_cloud_formation_dict = {
-                    "Name": resource_record_set.name,
-                    "Type": resource_record_set.type
-                }
-                update_type_counter_aws_resource_record_set(type_counter_aws_resource_record_set,
-                                                            resource_record_set.type)
-
-                if resource_record_set.ttl:
-                    resource_record_set_cloud_formation_dict['TTL'] = resource_record_set.ttl
-                if resource_record_values:
-                    resource_record_set_cloud_formation_dict['ResourceRecords'] = resource_record_values
-                if resource_record_set.alias_target:
-                    resource_record_set_cloud_formation_dict['AliasTarget'] = {
-                        "DNSName": resource_record_set.alias_target.dns_name,
-                        "HostedZoneId": resource_record_set.alias_target.hosted_zone_id
-                    }
-
-                resource_record_set_cloud_formation_dict_list.append(resource_record_set_cloud_formation_dict)
-        next_record_name = hosted_zone.next_record_name
-        if next_record_name:
-            hosted_zone = ResourceRecordSetList(client.list_resource_record_sets(HostedZoneId=zone_id,
-                                                                                 StartRecordName=next_record_name))
-        else:
-            hosted_zone = None
-    return resource_record_set_cloud_formation_dict_list
+    zone_id = hosted_zone["Id"].split('/')[2]
+    zone_name = hosted_zone["Name"]
+    record_count = hosted_zone.get("ResourceRecordSetCount")
+    if manifest is not None and manifest.is_up_to_date(zone_id, record_count, with_soa, formats):
+        return HostedZoneBackupReport(zone_name, [], {}, True)
+    type_counter_aws_resource_record_set = {}
+    writers = [BACKUP_WRITERS[backup_format](output_file_path, zone_name, zone_id) for backup_format in formats]
+    # Each page of record sets is listed once and handed to every writer as soon as it is received.
+    with ExitStack() as stack:
+        for writer in writers:
+            stack.enter_context(writer)
+        for zone_details in iter_resource_record_set_pages(boto3_client, zone_id):
+            resource_record_sets = filter_resource_record_sets(zone_details, with_soa,
+                                                               type_counter_aws_resource_record_set)
+            for writer in writers:
+                writer.write(resource_record_sets)
+    file_names = [writer.file_path for writer in writers if writer.records_count]
+    if manifest is not None:
+        manifest.update(zone_id, zone_name, record_count, with_soa, formats, file_names)
+        manifest.save()
+    return HostedZoneBackupReport(zone_name, file_names, type_counter_aws_resource_record_set, False)
+
+
+def filter_resource_record_sets(hosted_zone: ResourceRecordSetList,
+                                with_soa: bool,
+                                type_counter_aws_resource_record_set: dict) -> List[ResourceRecordSet]:
+    """
+    Select the resource record sets of a page that must be backed up.
+
+    :param hosted_zone: a page of the record sets of the zone
+    :param with_soa: whether or not SOA and NS records must be included
+    :param type_counter_aws_resource_record_set: counter of the selected records by type, updated in place
+    :return: the selected resource record sets
+    """
+    resource_record_sets = []
+    for resource_record_set in hosted_zone.resource_record_sets:
+        if ((resource_record_set.type != "SOA" and resource_record_set.type != "NS")
+        or (with_soa and (resource_record_set.type == "SOA" or resource_record_set.type == "NS"))):
+            update_type_counter_aws_resource_record_set(type_counter_aws_resource_record_set,
+                                                        resource_record_set.type)
+            resource_record_sets.append(resource_record_set)
+    return resource_record_sets
 
 
 if __name__ == "__main__":
@@ -0,0 +1,435 @@
+"""
+Local stand-ins of the APIs called by the scripts, used by bench_scripts.py to run
+the scripts end-to-end without network access.
+
+ - Route53StandIn answers the Route 53 calls of a boto3 client from the botocore
+   event hooks that botocore.stub.Stubber uses, but computes each response from
+   the request parameters, so that concurrent workers can be served in any order.
+ - AnalyticsHttpStandIn is an httplib2.Http, in the manner of googleapiclient's
+   HttpMock, that answers the accountSummaries/list calls of the Analytics
+   Management API. The services are built offline from ANALYTICS_DISCOVERY_DOCUMENT.
+ - MonitisStandInServer is a local HTTP server that answers the token, monitor
+   creation and monitor search calls of the Monitis API.
+
+The entities are generated on the fly: the memory used by the stand-ins does not
+depend on the number of entities. Each stand-in waits latency seconds per call and
+counts the calls by endpoint.
+"""
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from typing import Dict, Iterator
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import httplib2
+
+try:
+    from botocore.awsrequest import AWSResponse
+except ImportError:
+    # botocore < 1.11, like the one installed with boto3==1.4.7, answers with the responses of
+    # its vendored requests, as botocore.stub.Stubber does.
+    from botocore.vendored.requests.models import Response
+    AWSResponse = None
+
+
+class CallCounter:
+    """Thread-safe counter of the calls by endpoint."""
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, endpoint: str):
+        """
+        :param endpoint: name of the called endpoint
+        """
+        with self._lock:
+            self._counts[endpoint] += 1
+
+    def get_counts(self) -> Dict[str, int]:
+        """
+        :return: the number of calls by endpoint
+        """
+        with self._lock:
+            return dict(self._counts)
+
+
+class Route53StandIn:
+    """
+    Answer the list_hosted_zones and list_resource_record_sets calls of the boto3
+    Route 53 clients of a session, with generated hosted zones.
+
+    Each zone holds records_per_zone record sets: the SOA and NS records of the apex,
+    then A, CNAME, TXT and MX records, one out of ten A records being an alias.
+
+    Usage example:
+    ``
+    stand_in = Route53StandIn(zones_count=10, records_per_zone=1000)
+    stand_in.register(boto3.DEFAULT_SESSION.events)
+    ``
+    """
+    def __init__(self, zones_count: int, records_per_zone: int, page_size: int = 100,
+                 zones_page_size: int = 100, latency: float = 0):
+        """
+        :param zones_count: number of hosted zones
+        :param records_per_zone: number of record sets per zone (at least 2: SOA and NS)
+        :param page_size: maximum number of record sets per list_resource_record_sets page (at most 300)
+        :param zones_page_size: maximum number of zones per list_hosted_zones page (at most 100)
+        :param latency: number of seconds waited per call
+        """
+        self.zones_count = zones_count
+        self.records_per_zone = max(2, records_per_zone)
+        self.page_size = page_size
+        self.zones_page_size = zones_page_size
+        self.latency = latency
+        self.calls = CallCounter()
+
+    def register(self, events):
+        """
+        :param events: the event emitter of a boto3 session, or of a client
+        """
+        events.register("before-parameter-build.route53", self._keep_params)
+        events.register("before-call.route53", self._answer)
+
+    @staticmethod
+    def _keep_params(params: dict, context: dict, **kwargs):
+        # The before-call event only receives the serialized request.
+        context["stand_in_params"] = dict(params)
+
+    def _answer(self, model, context: dict, **kwargs) -> tuple:
+        self.calls.add(model.name)
+        if self.latency:
+            time.sleep(self.latency)
+        params = context.get("stand_in_params", {})
+        if model.name == "ListHostedZones":
+            parsed = self.list_hosted_zones(params)
+        elif model.name == "ListResourceRecordSets":
+            parsed = self.list_resource_record_sets(params)
+        else:
+            raise NotImplementedError("The Route 53 stand-in does not answer " + model.name)
+        parsed["ResponseMetadata"] = {"HTTPStatusCode": 200, "HTTPHeaders": {}, "RetryAttempts": 0}
+        return self.new_http_response(200), parsed
+
+    @staticmethod
+    def new_http_response(status_code: int):
+        """
+        :param status_code: the HTTP status of the response
+        :return: an HTTP response without body, of the type of the installed botocore
+        """
+        if AWSResponse is not None:
+            return AWSResponse(None, status_code, {}, None)
+        http_response = Response()
+        http_response.status_code = status_code
+        return http_response
+
+    @staticmethod
+    def get_zone_name(zone_index: int) -> str:
+        return "zone%05d.example.com." % zone_index
+
+    def list_hosted_zones(self, params: dict) -> dict:
+        start = int(params.get("Marker", "Z0")[1:])
+        end = min(start + self.zones_page_size, self.zones_count)
+        response = {
+            "HostedZones": [{"Id": "/hostedzone/Z%d" % zone_index,
+                             "Name": self.get_zone_name(zone_index),
+                             "CallerReference": "stand-in-%d" % zone_index,
+                             "Config": {"PrivateZone": False},
+                             "ResourceRecordSetCount": self.records_per_zone}
+                            for zone_index in range(start, end)],
+            "Marker": params.get("Marker", ""),
+            "IsTruncated": end < self.zones_count,
+            "MaxItems": str(self.zones_page_size)
+        }
+        if end < self.zones_count:
+            response["NextMarker"] = "Z%d" % end
+        return response
+
+    def get_record_set(self, zone_index: int, record_index: int) -> dict:
+        zone_name = self.get_zone_name(zone_index)
+        if record_index == 0:
+            return {"Name": zone_name, "Type": "SOA", "TTL": 900, "ResourceRecords": [
+                {"Value": "ns-1.awsdns-01.org. awsdns-hostmaster.amazon.com. 1 7200 900 1209600 86400"}]}
+        if record_index == 1:
+            return {"Name": zone_name, "Type": "NS", "TTL": 172800, "ResourceRecords": [
+                {"Value": "ns-%d.awsdns-%02d.org." % (index, index)} for index in range(1, 5)]}
+        name = "r%07d.%s" % (record_index, zone_name)
+        record_type = ("A", "CNAME", "TXT", "MX")[record_index % 4]
+        if record_type == "A" and record_index % 10 == 0:
+            return {"Name": name, "Type": "A", "AliasTarget": {"HostedZoneId": "Z2FDTNDATAQYW2",
+                                                               "DNSName": "d%d.cloudfront.net." % record_index,
+                                                               "EvaluateTargetHealth": False}}
+        value = {"A": "10.0.%d.%d" % (record_index // 256 % 256, record_index % 256),
+                 "CNAME": "target-%d.example.net." % record_index,
+                 "TXT": '"verification=%d"' % record_index,
+                 "MX": "10 mail-%d.example.net." % record_index}[record_type]
+        return {"Name": name, "Type": record_type, "TTL": 300, "ResourceRecords": [{"Value": value}]}
+
+    def list_resource_record_sets(self, params: dict) -> dict:
+        zone_index = int(params["HostedZoneId"].rsplit("/", 1)[-1][1:])
+        start_name = params.get("StartRecordName")
+        if start_name is None or start_name == self.get_zone_name(zone_index):
+            start = 0 if params.get("StartRecordType", "SOA") == "SOA" else 1
+        else:
+            start = int(start_name[1:8])
+        end = min(start + self.page_size, self.records_per_zone)
+        response = {
+            "ResourceRecordSets": [self.get_record_set(zone_index, record_index)
+                                   for record_index in range(start, end)],
+            "IsTruncated": end < self.records_per_zone,
+            "MaxItems": str(self.page_size)
+        }
+        if end < self.records_per_zone:
+            next_record_set = self.get_record_set(zone_index, end)
+            response["NextRecordName"] = next_record_set["Name"]
+            response["NextRecordType"] = next_record_set["Type"]
+        return response
+
+
+ANALYTICS_DISCOVERY_DOCUMENT = {
+    "kind": "discovery#restDescription",
+    "discoveryVersion": "v1",
+    "id": "analytics:v3",
+    "name": "analytics",
+    "version": "v3",
+    "rootUrl": "https://www.googleapis.com/",
+    "servicePath": "analytics/v3/",
+    "baseUrl": "https://www.googleapis.com/analytics/v3/",
+    "protocol": "rest",
+    "parameters": {},
+    "schemas": {
+        "AccountSummaries": {"id": "AccountSummaries", "type": "object"}
+    },
+    "resources": {
+        "management": {
+            "resources": {
+                "accountSummaries": {
+                    "methods": {
+                        "list": {
+                            "id": "analytics.management.accountSummaries.list",
+                            "path": "management/accountSummaries",
+                            "httpMethod": "GET",
+                            "response": {"$ref": "AccountSummaries"},
+                            "parameters": {
+                                "max-results": {"type": "integer", "format": "int32", "location": "query"},
+                                "start-index": {"type": "integer", "format": "int32", "location": "query"}
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    }
+}
+"""The part of the discovery document of the Analytics API v3 used by the Analytics dump"""
+
+
+class AnalyticsHttpStandIn(httplib2.Http):
+    """
+    Answer the accountSummaries/list calls of the Analytics Management API, with
+    generated accounts of web_properties_per_account web properties.
+
+    The responses are computed from the URL of the requests, like those of a
+    googleapiclient.http.HttpMock, so that each thread can have its own instance.
+
+    Usage example:
+    ``
+    stand_in = AnalyticsHttpStandIn(accounts_count=1000)
+    service = googleapiclient.discovery.build_from_document(ANALYTICS_DISCOVERY_DOCUMENT, http=stand_in)
+    ``
+    """
+    def __init__(self, accounts_count: int, web_properties_per_account: int = 10, latency: float = 0,
+                 calls: CallCounter = None):
+        """
+        :param accounts_count: number of accounts
+        :param web_properties_per_account: number of web properties per account
+        :param latency: number of seconds waited per call
+        :param calls: the counter of the calls, shared by the instances of a benchmark
+        """
+        super().__init__()
+        self.accounts_count = accounts_count
+        self.web_properties_per_account = web_properties_per_account
+        self.latency = latency
+        self.calls = calls or CallCounter()
+
+    def request(self, uri: str, method: str = "GET", body=None, headers=None, redirections: int = 5,
+                connection_type=None) -> tuple:
+        url = urlparse(uri)
+        if not url.path.endswith("/management/accountSummaries"):
+            self.calls.add(url.path)
+            return httplib2.Response({"status": 404}), b'{"error": {"code": 404, "message": "Not Found"}}'
+        self.calls.add("accountSummaries.list")
+        if self.latency:
+            time.sleep(self.latency)
+        query = parse_qs(url.query)
+        max_results = int(query.get("max-results", ["1000"])[0])
+        start_index = int(query.get("start-index", ["1"])[0])
+        content = json.dumps(self.get_account_summaries(start_index, max_results,
+                                                        url._replace(query="").geturl())).encode("utf-8")
+        return httplib2.Response({"status": 200, "content-type": "application/json; charset=UTF-8"}), content
+
+    def get_account_summaries(self, start_index: int, max_results: int, list_url: str) -> dict:
+        start = start_index - 1
+        end = min(start + max_results, self.accounts_count)
+        response = {
+            "kind": "analytics#accountSummaries",
+            "username": "stand-in@example.com",
+            "totalResults": self.accounts_count,
+            "startIndex": start_index,
+            "itemsPerPage": max_results,
+            "items": [{
+                "id": str(account_index),
+                "kind": "analytics#accountSummary",
+                "name": "Account %d" % account_index,
+                "webProperties": [{
+                    "kind": "analytics#webPropertySummary",
+                    "id": "UA-%d-%d" % (account_index, property_index),
+                    "name": "Property %d" % property_index,
+                    "level": "STANDARD",
+                    # One out of ten web properties has no URL, and is skipped by the dump.
+                    "websiteUrl": ("http://www.site-%d-%d.com/" % (account_index, property_index)
+                                   if property_index % 10 != 9 else None),
+                    "profiles": [{"kind": "analytics#profileSummary", "id": "%d%02d" % (account_index,
+                                                                                        property_index),
+                                  "name": "All Web Site Data", "type": "WEB"}]
+                } for property_index in range(self.web_properties_per_account)]
+            } for account_index in range(start, end)]
+        }
+        if end < self.accounts_count:
+            response["nextLink"] = list_url + "?" + urlencode({"max-results": max_results,
+                                                               "start-index": end + 1})
+        return response
+
+
+class _MonitisRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # The headers and the body are written separately: without TCP_NODELAY, each
+    # response would wait for the delayed ACK of the client.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, data: dict):
+        content = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _answer(self, endpoint: str):
+        self.server.calls.add(endpoint)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.endswith("/searchitem"):
+            self._answer("searchitem")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for chunk in self.server.iter_search_response_chunks():
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+        elif parse_qs(url.query).get("action") == ["authToken"]:
+            self._answer("authToken")
+            self._send_json({"authToken": "stand-in-token"})
+        else:
+            self._answer(url.path)
+            self.send_error(404)
+
+    def do_POST(self):
+        data = parse_qs(self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8"))
+        action = data.get("action", [""])[0]
+        self._answer(action)
+        if action == "addCompositeMonitor":
+            self._send_json({"status": "ok", "data": {"testId": self.server.next_monitor_id()}})
+        else:
+            self._send_json({"error": "Unknown action " + action})
+
+
+class MonitisStandInServer(ThreadingMixIn, HTTPServer):
+    """
+    Local HTTP server that answers the calls of the Monitis API, with monitors_count
+    generated monitors listed by the search endpoint.
+
+    Usage example:
+    ``
+    server = MonitisStandInServer(monitors_count=1000)
+    server.start()
+    settings.monitisapi["api_url"] = server.url + "/customMonitorApi"
+    settings.monitisapi["search_url"] = server.url + "/layout/{user_key}/searchitem"
+    ...
+    server.stop()
+    ``
+    """
+    daemon_threads = True
+
+    def __init__(self, monitors_count: int = 0, latency: float = 0, chunk_size: int = 64 * 1024):
+        """
+        :param monitors_count: number of monitors listed by the search endpoint
+        :param latency: number of seconds waited per call
+        :param chunk_size: approximate size of the chunks of the search response
+        """
+        super().__init__(("127.0.0.1", 0), _MonitisRequestHandler)
+        self.monitors_count = monitors_count
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.calls = CallCounter()
+        self._monitor_id = 0
+        self._monitor_id_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """The root URL of the server"""
+        return "http://%s:%d" % self.server_address
+
+    def start(self):
+        """Serve the requests from a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop serving the requests and close the socket."""
+        self.shutdown()
+        self.server_close()
+
+    def handle_error(self, request, client_address):
+        # The clients close their keep-alive connections when they exit.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def next_monitor_id(self) -> int:
+        with self._monitor_id_lock:
+            self._monitor_id += 1
+            return self._monitor_id
+
+    def iter_search_response_chunks(self) -> Iterator[bytes]:
+        """
+        :return: the chunks of the search response, generated while they are sent
+        """
+        chunk = [b'{"searchItems": {"monitors": [']
+        chunk_length = len(chunk[0])
+        for index in range(self.monitors_count):
+            monitor = json.dumps({
+                "name": "site-%d.com_RUM" % index, "categoryId": 8, "category": "RUM", "type": "RUM",
+                "id": 100000 + index, "tag": "Account %d" % (index // 10), "groups": ["Account %d" % (index // 10)],
+                "enabled": 1, "dataTypeId": 25, "monitorTypeId": 71,
+                "params": {"ignoreQueryParams": "true", "domain": "www.site-%d.com/" % index, "aggType": "median"}
+            }).encode("utf-8")
+            if index:
+                monitor = b"," + monitor
+            chunk.append(monitor)
+            chunk_length += len(monitor)
+            if chunk_length >= self.chunk_size:
+                yield b"".join(chunk)
+                chunk = []
+                chunk_length = 0
+        chunk.append(b"]}}")
+        yield b"".join(chunk)
@@ -0,0 +1,69 @@
+"""
+Compare the extraction of the domain names of URLs with the previous implementation
+of webapis.utils.get_domain_name_from_url, on synthetic columns of URLs.
+
+The previous implementation searched the URL for each of its prefixes with chained
+substring_after() calls. The current one is memoized: the same URLs appear on many
+rows of the property lists. Two columns are measured: one where most URLs are
+repeated, and one where all the URLs are distinct (the worst case of the cache).
+
+Usage (from the project root):
+
+```
+<python 3 interpreter> -m benchmarks.bench_domain_names --urls 1000000
+```
+"""
+import argparse
+import random
+import time
+from typing import Callable, List
+
+from webapis import utils
+
+
+def legacy_get_domain_name_from_url(url: str) -> str:
+    """The previous get_domain_name_from_url."""
+    wo_url = utils.substring_after(utils.substring_after(utils.substring_after(url, "http://"), "https://"), "www.")
+    return utils.substring_before(wo_url, "/")
+
+
+def generate_urls(urls_count: int, distinct_urls_count: int, seed: int = 0) -> List[str]:
+    """
+    :param urls_count: number of URLs of the column
+    :param distinct_urls_count: number of distinct URLs of the column
+    :param seed: seed of the random generator, to get reproducible columns
+    :return: a column of URLs, in the forms found in the Analytics properties
+    """
+    rand = random.Random(seed)
+    forms = ("http://www.site-%d.com/", "https://site-%d.com", "http://www.site-%d.co.uk/fr/", "site-%d.com")
+    distinct_urls = [rand.choice(forms) % index for index in range(distinct_urls_count)]
+    if distinct_urls_count == urls_count:
+        return distinct_urls
+    return [rand.choice(distinct_urls) for _ in range(urls_count)]
+
+
+def measure(label: str, extract: Callable[[List[str]], List[str]], urls: List[str]):
+    start = time.perf_counter()
+    domain_names = extract(urls)
+    duration = time.perf_counter() - start
+    print("%8d URLs, %-28s %.3fs, %.3f us/URL" % (len(domain_names), label, duration, duration / len(urls) * 1e6))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the extractions of the domain names of URLs.")
+    parser.add_argument('--urls', type=int, default=1000000, help='number of URLs of the columns')
+    args = parser.parse_args()
+
+    for column, distinct_urls_count in (("repeated URLs", max(1, args.urls // 100)), ("distinct URLs", args.urls)):
+        urls = generate_urls(args.urls, distinct_urls_count)
+        print("\n%s (%d distinct)" % (column, distinct_urls_count))
+        utils.get_domain_name_from_url.cache_clear()
+        measure("previous", lambda column_urls: [legacy_get_domain_name_from_url(url) for url in column_urls], urls)
+        measure("current, one by one", lambda column_urls: [utils.get_domain_name_from_url(url)
+                                                            for url in column_urls], urls)
+        utils.get_domain_name_from_url.cache_clear()
+        measure("current, by column", utils.get_domain_names_from_urls, urls)
+
+
+if __name__ == "__main__":
+    main()
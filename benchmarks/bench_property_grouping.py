@@ -0,0 +1,106 @@
+"""
+Compare the grouping of the Analytics properties by account with the previous
+implementation of the Tag Manager script, on synthetic CSV files of growing size.
+
+The previous implementation appended every property (duplicates included) to the
+list of its account, and kept the processed accounts in a list, checked with `in`
+for every Tag Manager account: the time grows with the square of the number of
+accounts. A copy of it is kept in this module as the baseline.
+
+Usage (from the project root):
+
+```
+<python 3 interpreter> -m benchmarks.bench_property_grouping --rows 100000
+```
+"""
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+
+from webapis.googleapi.analyticss.property_list import load_properties_by_account
+
+
+def write_synthetic_property_list(csv_file_path: str, rows_count: int, properties_per_account: int = 10,
+                                  duplicates_ratio: float = 0.1, seed: int = 0):
+    """
+    Write a CSV file in the format of google_analytics_dump_property_list.py.
+
+    :param csv_file_path: path of the file to write
+    :param rows_count: number of rows
+    :param properties_per_account: average number of properties per account
+    :param duplicates_ratio: proportion of the rows that repeat a previous row
+    :param seed: seed of the random generator, to get reproducible files
+    """
+    rand = random.Random(seed)
+    accounts_count = max(1, rows_count // properties_per_account)
+    rows = []
+    with open(csv_file_path, "w", newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(("Account Id", "Account", "Properties Id", "Properties", "Without URL"))
+        for index in range(rows_count):
+            if rows and rand.random() < duplicates_ratio:
+                row = rand.choice(rows)
+            else:
+                account_index = rand.randrange(accounts_count)
+                row = (account_index, "Account %d" % account_index, "UA-%d-%d" % (account_index, index),
+                       "http://www.site-%d.com" % index, "site-%d.com" % index)
+                rows.append(row)
+            writer.writerow(row)
+
+
+def legacy_load_properties_by_account(csv_file_path: str) -> dict:
+    """The previous get_analytics_account_properties_dict_from_csv."""
+    account_to_properties = {}
+    with open(csv_file_path, "r") as csv_file:
+        reader = csv.DictReader(csv_file)
+        for row in reader:
+            account = row["Account"]
+            account_property = row["Properties"]
+            if account not in account_to_properties and account_property != '':
+                account_to_properties[account] = [account_property]
+            elif account_property != '':
+                account_to_properties[account].append(account_property)
+    return account_to_properties
+
+
+def run_sync_loop(properties_by_account: dict, processed_accounts) -> int:
+    """
+    Run the account loop of the Tag Manager script, without the API calls.
+
+    :param properties_by_account: the properties grouped by account
+    :param processed_accounts: an empty list (previous implementation) or set (current one)
+    :return: the number of container creations that would be requested
+    """
+    add = processed_accounts.append if isinstance(processed_accounts, list) else processed_accounts.add
+    creations_count = 0
+    for account_name in list(properties_by_account):
+        if account_name not in processed_accounts:
+            creations_count += len(properties_by_account[account_name])
+            add(account_name)
+    return creations_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the groupings of the Analytics properties.")
+    parser.add_argument('--rows', type=int, default=100000, help='number of rows of the largest CSV file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for rows_count in (args.rows // 10, args.rows // 4, args.rows // 2, args.rows):
+            csv_file_path = os.path.join(tmp_dir, "GA_property_list_%d.csv" % rows_count)
+            write_synthetic_property_list(csv_file_path, rows_count)
+            for label, load, processed_accounts in (
+                    ("list (previous)", legacy_load_properties_by_account, []),
+                    ("set (current)", load_properties_by_account, set())):
+                start = time.perf_counter()
+                creations_count = run_sync_loop(load(csv_file_path), processed_accounts)
+                duration = time.perf_counter() - start
+                print("%7d rows, %-16s %6d creations, %.3fs, %.2f us/row"
+                      % (rows_count, label, creations_count, duration, duration / rows_count * 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Compare the compact Route 53 record model with the previous dict-wrapping one.
+
+The previous wrapper kept the boto3 dict, created a GenericWrappingIterator per
+record set and a new NamedTuple class on each alias_target/geo_location access.
+A copy of it is kept in this module as the baseline.
+
+Usage (from the project root):
+
+```
+<python 3 interpreter> -m benchmarks.bench_record_model --records 100000
+```
+"""
+import argparse
+import time
+import tracemalloc
+from typing import NamedTuple
+
+from webapis.awsapi.data_model import ResourceRecordSet
+from webapis.common.data_model import GenericWrappingIterator
+
+
+class LegacyResourceRecord:
+    """The previous dict-wrapping resource record."""
+    def __init__(self, json_as_dict):
+        self.data = json_as_dict
+
+    @property
+    def value(self) -> str:
+        return self.data.get('Value')
+
+
+class LegacyResourceRecordSet:
+    """The previous dict-wrapping resource record set (reduced to the attributes read by the backups)."""
+    def __init__(self, json_as_dict: dict):
+        self.data = json_as_dict
+        self._items_iterator = GenericWrappingIterator(self.data.get("ResourceRecords", []), LegacyResourceRecord)
+
+    @property
+    def name(self) -> str:
+        return self.data.get('Name')
+
+    @property
+    def type(self) -> str:
+        return self.data.get("Type")
+
+    @property
+    def ttl(self) -> int:
+        return self.data.get("TTL")
+
+    @property
+    def resource_records(self) -> GenericWrappingIterator:
+        return self._items_iterator
+
+    @property
+    def alias_target(self) -> NamedTuple:
+        alias_target = self.data.get('AliasTarget')
+        if alias_target:
+            alias_target = NamedTuple("GeoLocation", [("hosted_zone_id", str), ("dns_name", str)])(
+                hosted_zone_id=alias_target['HostedZoneId'],
+                dns_name=alias_target['DNSName'])
+        return alias_target
+
+
+def get_synthetic_record_set_dicts(records_count: int) -> list:
+    """Provide record sets as returned by boto3, one out of four being an alias."""
+    record_sets = []
+    for index in range(records_count):
+        if index % 4 == 0:
+            record_sets.append({"Name": "alias-%d.example.com." % index, "Type": "A",
+                                "AliasTarget": {"HostedZoneId": "Z2FDTNDATAQYW2",
+                                                "DNSName": "d%d.cloudfront.net." % index,
+                                                "EvaluateTargetHealth": False}})
+        else:
+            record_sets.append({"Name": "host-%d.example.com." % index, "Type": "TXT", "TTL": 300,
+                                "ResourceRecords": [{"Value": '"verification=%d"' % index},
+                                                    {"Value": '"v=spf1 -all"'}]})
+    return record_sets
+
+
+def read_record_sets(record_sets: list) -> int:
+    """Read the attributes used by the backup writers, as they do."""
+    values_count = 0
+    for record_set in record_sets:
+        record_set.name
+        record_set.type
+        record_set.ttl
+        values_count += len([record.value for record in record_set.resource_records])
+        alias_target = record_set.alias_target
+        if alias_target:
+            alias_target.dns_name
+            alias_target.hosted_zone_id
+    return values_count
+
+
+def measure_memory(wrapper_class: type, records_count: int) -> tuple:
+    """
+    Measure the memory used by the wrapped record sets.
+
+    The boto3 dicts are dropped once wrapped, as they are when a page has been wrapped:
+    only what the wrappers keep alive is counted as retained.
+
+    :return: the retained memory and the peak memory allocated while reading the record sets (bytes)
+    """
+    tracemalloc.start()
+    record_set_dicts = get_synthetic_record_set_dicts(records_count)
+    record_sets = [wrapper_class(record_set_dict) for record_set_dict in record_set_dicts]
+    del record_set_dicts
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    tracemalloc.start()
+    read_record_sets(record_sets)
+    _, read_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return retained, read_peak
+
+
+def measure_time(wrapper_class: type, record_set_dicts: list) -> tuple:
+    """
+    Wrap all the record sets, then read them.
+
+    :return: the wrapping time and the reading time (seconds)
+    """
+    start = time.perf_counter()
+    record_sets = [wrapper_class(record_set_dict) for record_set_dict in record_set_dicts]
+    build_time = time.perf_counter() - start
+    start = time.perf_counter()
+    read_record_sets(record_sets)
+    read_time = time.perf_counter() - start
+    return build_time, read_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the Route 53 record models.")
+    parser.add_argument('--records', type=int, default=100000, help='number of record sets')
+    args = parser.parse_args()
+
+    record_set_dicts = get_synthetic_record_set_dicts(args.records)
+    for label, wrapper_class in (("dict-wrapping (previous)", LegacyResourceRecordSet),
+                                 ("slotted (current)", ResourceRecordSet)):
+        retained, read_allocated = measure_memory(wrapper_class, args.records)
+        build_time, read_time = measure_time(wrapper_class, record_set_dicts)
+        print("%-25s retained %6.1f bytes/record, allocated by reads %6.1f bytes/record, "
+              "wrap %.3fs, read %.3fs, total %.3fs"
+              % (label, retained / args.records, read_allocated / args.records,
+                 build_time, read_time, build_time + read_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+Run the scripts end-to-end against local stand-ins of their APIs (see
+api_standins.py), at growing scales, and report their wall time, peak memory and
+number of API calls.
+
+The scenarios are:
+ - aws_dump: aws_dump_backup_files.py, <scale> Route 53 record sets, rounded up to whole
+   zones of --records-per-zone record sets
+ - ga_dump: google_analytics_dump_property_list.py, <scale> Analytics web properties
+ - monitis_add: monitis_add_monitor_from_GA_property_list.py, <scale> properties to add
+ - monitis_dump: monitis_dump_monitor_list.py, <scale> Monitis monitors
+
+Each run is a child process, so that its peak resident set size (RSS) only counts
+the script and the in-process stand-ins: the Monitis stand-in server runs in the
+parent process, and shares the CPU with the script. The wall time is measured around
+the main() of the script, without the start of the interpreter and the setup of the
+stand-ins. The standard output of the scripts is discarded.
+
+With --json, the results are also written in a file, to compare two versions of
+the scripts.
+
+Usage (from the project root):
+
+```
+<python 3 interpreter> -m benchmarks.bench_scripts --scales 1000 10000 100000 --latency 0.001
+```
+"""
+import argparse
+import contextlib
+import csv
+import json
+import math
+import os
+import resource
+import runpy
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, NamedTuple
+
+from benchmarks.api_standins import (ANALYTICS_DISCOVERY_DOCUMENT, AnalyticsHttpStandIn, CallCounter,
+                                     MonitisStandInServer, Route53StandIn)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+Scenario = NamedTuple("Scenario", [("module", str), ("uses_monitis", bool)])
+"""A script run by the benchmark, and whether or not it calls the Monitis stand-in server"""
+
+SCENARIOS = {
+    "aws_dump": Scenario("aws_dump_backup_files", False),
+    "ga_dump": Scenario("google_analytics_dump_property_list", False),
+    "monitis_add": Scenario("monitis_add_monitor_from_GA_property_list", True),
+    "monitis_dump": Scenario("monitis_dump_monitor_list", True),
+}
+
+WEB_PROPERTIES_PER_ACCOUNT = 10
+"""Number of web properties of each generated Analytics account"""
+
+
+def get_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Run the scripts against local stand-ins of their APIs.")
+    parser.add_argument('--scenarios', nargs='+', choices=sorted(SCENARIOS), default=sorted(SCENARIOS),
+                        help='the scripts to run, all of them by default')
+    parser.add_argument('--scales', nargs='+', type=int, default=[1000, 10000, 100000],
+                        help='numbers of entities (record sets, web properties or monitors) of the runs')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds waited by the stand-ins per call')
+    parser.add_argument('--page-size', type=int, default=100,
+                        help='number of record sets per Route 53 page, and of accounts per Analytics page')
+    parser.add_argument('--records-per-zone', type=int, default=1000, help='number of record sets per zone')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='value of the --workers and --concurrency options of the scripts')
+    parser.add_argument('--json', dest="json_file", help='path of a JSON file where the results are written')
+    # Options of the child processes
+    parser.add_argument('--run-scenario', choices=sorted(SCENARIOS), help=argparse.SUPPRESS)
+    parser.add_argument('--scale', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--work-directory', help=argparse.SUPPRESS)
+    parser.add_argument('--monitis-url', help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', help=argparse.SUPPRESS)
+    return parser
+
+
+def prepare_monitis_inputs(work_directory: str, scale: int) -> str:
+    """
+    Write the Monitis credentials file, and a CSV file of <scale> Analytics properties.
+
+    :return: the path of the credentials file
+    """
+    credentials_file_path = os.path.join(work_directory, "monitis_credentials.json")
+    with open(credentials_file_path, "w") as credentials_file:
+        json.dump({"api_key": "api", "secret_key": "secret", "agent_key": "agent", "user_key": "user"},
+                  credentials_file)
+    with open(os.path.join(work_directory, "GA_property_list.csv"), "w", newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(("Account Id", "Account", "Properties Id", "Properties", "Without URL"))
+        for index in range(scale):
+            account_index = index // WEB_PROPERTIES_PER_ACCOUNT
+            writer.writerow((str(account_index), "Account %d" % account_index, "UA-%d-%d" % (account_index, index),
+                             "http://www.site-%d.com/" % index, "site-%d.com" % index))
+    return credentials_file_path
+
+
+def prepare_google_inputs(work_directory: str) -> str:
+    """
+    Write the client secrets, valid stored credentials of the Analytics API and its
+    discovery document.
+
+    :return: the path of the client secrets file
+    """
+    import datetime
+    from oauth2client import client, file
+
+    import settings
+
+    client_secrets_path = os.path.join(work_directory, "client_secret.json")
+    token_uri = "https://oauth2.googleapis.com/token"
+    with open(client_secrets_path, "w") as client_secrets_file:
+        json.dump({"installed": {"client_id": "stand-in", "client_secret": "stand-in",
+                                 "auth_uri": "https://accounts.google.com/o/oauth2/auth", "token_uri": token_uri,
+                                 "redirect_uris": ["urn:ietf:wg:oauth:2.0:oob"]}}, client_secrets_file)
+    analytics_settings = settings.googleapi["analytics"]
+    file.Storage(os.path.join(work_directory, analytics_settings["api_name"] + ".dat")).put(
+        client.OAuth2Credentials("stand-in", "stand-in", "stand-in", "stand-in",
+                                 datetime.datetime.utcnow() + datetime.timedelta(days=1), token_uri, None,
+                                 scopes=analytics_settings["scopes"]))
+    with open(os.path.join(work_directory, "%s.%s.json" % (analytics_settings["api_name"],
+                                                           analytics_settings["api_version"])), "w") as document:
+        json.dump(ANALYTICS_DISCOVERY_DOCUMENT, document)
+    return client_secrets_path
+
+
+def get_script_argv(scenario_name: str, args: argparse.Namespace) -> List[str]:
+    """
+    Prepare the input files of a scenario in the work directory.
+
+    :return: the command line options of the script
+    """
+    work_directory = args.work_directory
+    if scenario_name == "aws_dump":
+        output_directory = os.path.join(work_directory, "AWS_backup_files") + os.sep
+        os.makedirs(output_directory)
+        return ["--output", output_directory, "--workers", str(args.workers)]
+    if scenario_name == "ga_dump":
+        return ["--credentials", prepare_google_inputs(work_directory),
+                "--output", os.path.join(work_directory, "GA_property_list.csv"),
+                "--discovery-documents", work_directory, "--max-results", str(args.page_size),
+                "--noauth_local_webserver"]
+    if scenario_name == "monitis_add":
+        return ["--credentials", prepare_monitis_inputs(work_directory, args.scale),
+                "--input", os.path.join(work_directory, "GA_property_list.csv"),
+                "--concurrency", str(args.workers), "--rate", "0"]
+    return ["--credentials", prepare_monitis_inputs(work_directory, 0),
+            "--output", os.path.join(work_directory, "monitis_rum_monitors.csv")]
+
+
+def install_stand_ins(scenario_name: str, args: argparse.Namespace) -> CallCounter:
+    """
+    Direct the calls of the script of a scenario to the stand-ins.
+
+    :return: the counter of the calls to the in-process stand-ins
+    """
+    if scenario_name == "aws_dump":
+        import boto3
+
+        boto3.setup_default_session(aws_access_key_id="stand-in", aws_secret_access_key="stand-in",
+                                    region_name="us-east-1")
+        stand_in = Route53StandIn(zones_count=math.ceil(args.scale / args.records_per_zone),
+                                  records_per_zone=min(args.scale, args.records_per_zone),
+                                  page_size=min(args.page_size, 300), latency=args.latency)
+        stand_in.register(boto3.DEFAULT_SESSION.events)
+        return stand_in.calls
+    if scenario_name == "ga_dump":
+        from webapis.googleapi import api_connector
+
+        calls = CallCounter()
+        accounts_count = math.ceil(args.scale / WEB_PROPERTIES_PER_ACCOUNT)
+        api_connector.new_authorized_http = lambda credentials: credentials.authorize(
+            http=AnalyticsHttpStandIn(accounts_count, WEB_PROPERTIES_PER_ACCOUNT, args.latency, calls))
+        return calls
+    import settings
+
+    settings.monitisapi["api_url"] = args.monitis_url + "/customMonitorApi"
+    settings.monitisapi["search_url"] = args.monitis_url + "/layout/{user_key}/searchitem"
+    return CallCounter()
+
+
+def run_scenario(args: argparse.Namespace):
+    """Run the script of a scenario in this process, and write its measures in the result file."""
+    scenario = SCENARIOS[args.run_scenario]
+    script_argv = get_script_argv(args.run_scenario, args)
+    calls = install_stand_ins(args.run_scenario, args)
+    sys.argv = [scenario.module + ".py"] + script_argv
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        runpy.run_module(scenario.module, run_name="__main__")
+        wall_seconds = time.perf_counter() - start
+    # ru_maxrss is in kilobytes on Linux, and in bytes on macOS.
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    max_rss_kb = max_rss // 1024 if sys.platform == "darwin" else max_rss
+    with open(args.result_file, "w") as result_file:
+        json.dump({"wall_seconds": wall_seconds, "max_rss_kb": max_rss_kb, "calls": calls.get_counts()},
+                  result_file)
+
+
+def measure(scenario_name: str, scale: int, args: argparse.Namespace) -> dict:
+    """
+    Run a scenario in a child process.
+
+    :return: the measures of the run
+    """
+    server = None
+    if SCENARIOS[scenario_name].uses_monitis:
+        server = MonitisStandInServer(monitors_count=scale if scenario_name == "monitis_dump" else 0,
+                                      latency=args.latency)
+        server.start()
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench_scripts_") as work_directory:
+            result_file_path = os.path.join(work_directory, "result.json")
+            command = [sys.executable, "-m", "benchmarks.bench_scripts", "--run-scenario", scenario_name,
+                       "--scale", str(scale), "--work-directory", work_directory,
+                       "--result-file", result_file_path, "--latency", str(args.latency),
+                       "--page-size", str(args.page_size), "--records-per-zone", str(args.records_per_zone),
+                       "--workers", str(args.workers)]
+            if server is not None:
+                command += ["--monitis-url", server.url]
+            subprocess.run(command, cwd=PROJECT_ROOT, check=True)
+            with open(result_file_path, "r") as result_file:
+                result = json.load(result_file)
+    finally:
+        if server is not None:
+            server.stop()
+    if server is not None:
+        result["calls"].update(server.calls.get_counts())
+    result.update(scenario=scenario_name, scale=scale)
+    return result
+
+
+def main():
+    args = get_arg_parser().parse_args()
+    if args.run_scenario:
+        run_scenario(args)
+        return
+
+    print("latency %.3fs/call, page size %d, %d workers\n" % (args.latency, args.page_size, args.workers))
+    print("%-13s %8s %10s %10s  %s" % ("scenario", "scale", "wall (s)", "RSS (MB)", "API calls"))
+    results = []
+    for scenario_name in args.scenarios:
+        for scale in args.scales:
+            result = measure(scenario_name, scale, args)
+            results.append(result)
+            calls = ", ".join("%s=%d" % item for item in sorted(result["calls"].items()))
+            print("%-13s %8d %10.2f %10.1f  %d (%s)" % (scenario_name, scale, result["wall_seconds"],
+                                                       result["max_rss_kb"] / 1024, sum(result["calls"].values()),
+                                                       calls))
+    if args.json_file:
+        with open(args.json_file, "w") as json_file:
+            json.dump(results, json_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
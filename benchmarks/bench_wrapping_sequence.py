@@ -0,0 +1,193 @@
+"""
+Compare the lazy WrappingSequence of the Google API models with the previous
+GenericWrappingIterator, on a large synthetic accountSummaries/list response.
+
+The previous models created a GenericWrappingIterator in their __init__: wrapping
+an account summary allocated the iterator of its web properties, and wrapping a web
+property the iterator of its profiles, whether they were read or not. A copy of these
+models is kept in this module as the baseline.
+
+The indexed reads compare the two modes of WrappingSequence on a cheap wrapper: the
+memoization only pays off when the wrappers are costly to build, or must be the same
+objects from one access to the next.
+
+Usage (from the project root):
+
+```
+<python 3 interpreter> -m benchmarks.bench_wrapping_sequence --accounts 20000
+```
+"""
+import argparse
+import time
+import tracemalloc
+from typing import Callable
+
+from webapis.common.data_model import GenericWrappingIterator, WrappingSequence
+from webapis.googleapi.analyticss.data_model import AccountSummaryList
+
+
+class LegacyAccountSummaryList:
+    """The previous AccountSummaryList (reduced to the attributes read by the scripts)."""
+    def __init__(self, json_as_dict: dict):
+        self.data = json_as_dict
+        self._items_iterator = GenericWrappingIterator(self.data.get("items", []), LegacyAccountSummary)
+
+    @property
+    def items(self) -> GenericWrappingIterator:
+        return self._items_iterator
+
+
+class LegacyAccountSummary:
+    """The previous AccountSummary (reduced to the attributes read by the scripts)."""
+    def __init__(self, json_as_dict: dict):
+        self.data = json_as_dict
+        self._items_iterator = GenericWrappingIterator(self.data.get("webProperties", []), LegacyWebProperty)
+
+    @property
+    def id(self) -> str:
+        return self.data.get("id")
+
+    @property
+    def name(self) -> str:
+        return self.data.get("name")
+
+    @property
+    def web_properties(self) -> GenericWrappingIterator:
+        return self._items_iterator
+
+
+class LegacyWebProperty:
+    """The previous WebProperty (reduced to the attributes read by the scripts)."""
+    def __init__(self, json_as_dict: dict):
+        self.data = json_as_dict
+        self._profile_iterator = GenericWrappingIterator(self.data.get("profiles", []), LegacyProfile)
+
+    @property
+    def id(self) -> str:
+        return self.data.get("id")
+
+    @property
+    def website_url(self) -> str:
+        return self.data.get("websiteUrl")
+
+    @property
+    def profiles(self) -> GenericWrappingIterator:
+        return self._profile_iterator
+
+
+class LegacyProfile:
+    """The previous Profile (reduced to the attributes read by the scripts)."""
+    def __init__(self, json_as_dict: dict):
+        self.data = json_as_dict
+
+    @property
+    def id(self) -> str:
+        return self.data.get("id")
+
+
+def get_synthetic_account_summaries(accounts_count: int, web_properties_count: int = 10,
+                                    profiles_count: int = 2) -> dict:
+    """Provide an accountSummaries/list response with the given number of accounts."""
+    return {"kind": "analytics#accountSummaries", "items": [
+        {"id": str(account_index), "kind": "analytics#accountSummary", "name": "Account %d" % account_index,
+         "webProperties": [
+             {"kind": "analytics#webPropertySummary", "id": "UA-%d-%d" % (account_index, property_index),
+              "name": "Property %d" % property_index,
+              "websiteUrl": "http://www.site-%d-%d.com" % (account_index, property_index),
+              "profiles": [{"kind": "analytics#profileSummary", "id": "%d%d%d" % (account_index, property_index,
+                                                                                  profile_index),
+                            "name": "All Web Site Data", "type": "WEB"}
+                           for profile_index in range(profiles_count)]}
+             for property_index in range(web_properties_count)]}
+        for account_index in range(accounts_count)]}
+
+
+def read_urls(account_summary_list) -> int:
+    """Read the accounts and the URLs of their web properties, as the Analytics dump does."""
+    urls_count = 0
+    for account in account_summary_list.items:
+        account.id
+        account.name
+        for web_property in account.web_properties:
+            if web_property.website_url:
+                urls_count += 1
+    return urls_count
+
+
+def read_profiles(account_summary_list) -> int:
+    """Read the accounts, web properties and views (profiles)."""
+    profiles_count = 0
+    for account in account_summary_list.items:
+        for web_property in account.web_properties:
+            for profile in web_property.profiles:
+                profile.id
+                profiles_count += 1
+    return profiles_count
+
+
+def measure(page_class: type, response: dict, read: Callable) -> float:
+    """
+    Wrap the response and read it.
+
+    :return: the time (seconds)
+    """
+    start = time.perf_counter()
+    read(page_class(response))
+    return time.perf_counter() - start
+
+
+def measure_retained_memory(page_class: type, response: dict) -> int:
+    """
+    Measure the memory kept alive by the wrapped account summaries, when they are
+    kept in a list as the Analytics dump does.
+
+    :return: the retained memory (bytes)
+    """
+    tracemalloc.start()
+    accounts = list(page_class(response).items)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del accounts
+    return retained
+
+
+def measure_indexed_reads(items: list, memoize: bool, passes: int = 3) -> float:
+    """
+    Read all the items of a sequence by index, several times.
+
+    :return: the time (seconds)
+    """
+    sequence = WrappingSequence(items, LegacyProfile, memoize=memoize)
+    start = time.perf_counter()
+    for _ in range(passes):
+        for index in range(len(sequence)):
+            sequence[index].id
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the wrappers of the Google API models.")
+    parser.add_argument('--accounts', type=int, default=20000, help='number of account summaries')
+    args = parser.parse_args()
+
+    response = get_synthetic_account_summaries(args.accounts)
+    page_classes = (("GenericWrappingIterator (previous)", LegacyAccountSummaryList),
+                    ("WrappingSequence (current)", AccountSummaryList))
+    print("\nlist of the wrapped accounts, %d accounts" % args.accounts)
+    for label, page_class in page_classes:
+        print("\t%-35s retained %6.1f bytes/account"
+              % (label, measure_retained_memory(page_class, response) / args.accounts))
+    for read in (read_urls, read_profiles):
+        print("\n%s, %d accounts" % (read.__name__, args.accounts))
+        for label, page_class in page_classes:
+            print("\t%-35s %.3fs" % (label, measure(page_class, response, read)))
+
+    profiles = [profile for account in response["items"] for web_property in account["webProperties"]
+                for profile in web_property["profiles"]]
+    print("\nindexed reads, %d items, 3 passes" % len(profiles))
+    for label, memoize in (("not memoized", False), ("memoized", True)):
+        print("\t%-35s %.3fs" % (label, measure_indexed_reads(profiles, memoize)))
+
+
+if __name__ == "__main__":
+    main()
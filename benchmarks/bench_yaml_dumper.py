@@ -0,0 +1,93 @@
+"""
+Compare the pure-Python and the libyaml YAML dumpers on a synthetic Route 53 zone.
+
+Usage (from the project root):
+
+```
+<python 3 interpreter> -m benchmarks.bench_yaml_dumper --records 10000
+```
+"""
+import argparse
+import random
+import time
+
+import yaml
+
+from webapis.awsapi.backup_writers import get_cloud_formation_template_dict
+from webapis.awsapi.serializers import dump_yaml
+from webapis.utils import Console
+
+
+def get_synthetic_record_sets(records_count: int, seed: int = 0) -> list:
+    """
+    Provide CloudFormation record sets that look like the ones of a real zone.
+
+    :param records_count: number of record sets to generate
+    :param seed: seed of the random generator, to get reproducible zones
+    :return: a list of cloud formation dict representation of record sets
+    """
+    rand = random.Random(seed)
+    record_sets = []
+    for index in range(records_count):
+        record_type = rand.choice(("A", "CNAME", "TXT", "MX", "ALIAS"))
+        record_set = {"Name": "host-%d.example.com." % index, "Type": record_type}
+        if record_type == "ALIAS":
+            record_set["Type"] = "A"
+            record_set["AliasTarget"] = {"DNSName": "d%d.cloudfront.net." % index,
+                                         "HostedZoneId": "Z2FDTNDATAQYW2"}
+            record_sets.append(record_set)
+            continue
+        record_set["TTL"] = rand.choice((60, 300, 3600, 86400))
+        if record_type == "A":
+            values = ["10.%d.%d.%d" % (rand.randrange(256), rand.randrange(256), rand.randrange(256))]
+        elif record_type == "CNAME":
+            values = ["target-%d.example.net." % rand.randrange(records_count)]
+        elif record_type == "MX":
+            values = ["%d mx%d.example.com." % (10 * priority, priority) for priority in range(1, 3)]
+        else:
+            values = ['"google-site-verification=%032x"' % rand.getrandbits(128),
+                      '"v=spf1 include:_spf.example.com ~all"']
+        record_set["ResourceRecords"] = values
+        record_sets.append(record_set)
+    return record_sets
+
+
+def time_dump(template: dict, dumper: type, repeat: int) -> tuple:
+    """
+    Time the dump of a template.
+
+    :return: the best time in seconds, and the dumped YAML
+    """
+    best = None
+    dumped = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        dumped = dump_yaml(template, explicit_start=True, dumper=dumper)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, dumped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the YAML dumpers on a synthetic Route 53 zone.")
+    parser.add_argument('--records', type=int, default=10000, help='number of record sets of the zone')
+    parser.add_argument('--repeat', type=int, default=3, help='number of runs for each dumper')
+    args = parser.parse_args()
+
+    template = get_cloud_formation_template_dict("example.com.", "Z0000000000000",
+                                                 get_synthetic_record_sets(args.records))
+    python_time, python_yaml = time_dump(template, yaml.SafeDumper, args.repeat)
+    print("Pure-Python SafeDumper: %.3fs" % python_time)
+    if not hasattr(yaml, "CSafeDumper"):
+        Console.print_yellow("libyaml is not available: CSafeDumper can't be benchmarked")
+        return
+    c_time, c_yaml = time_dump(template, yaml.CSafeDumper, args.repeat)
+    print("libyaml CSafeDumper:    %.3fs (x%.1f)" % (c_time, python_time / c_time))
+    if c_yaml == python_yaml:
+        Console.print_green("Both dumpers produce identical output")
+    else:
+        Console.print_red("The dumpers produce different outputs")
+
+
+if __name__ == "__main__":
+    main()
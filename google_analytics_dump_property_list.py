@@ -3,13 +3,19 @@ This script creates a list of all the properties (and the corresponding account)
 from a given Google Analytics Account
 """
 import csv
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List
 
+from googleapiclient.discovery import Resource
 from oauth2client import tools
+from oauth2client.client import Credentials
 
 import settings
 from webapis import utils
-from webapis.googleapi.analyticss.data_model import AccountSummaryList
-from webapis.googleapi.api_connector import get_service
+from webapis.googleapi.analyticss.data_model import AccountSummary
+from webapis.googleapi.analyticss.management import AccountDetails, get_account_details, iter_account_summaries
+from webapis.googleapi.api_connector import ThreadLocalHttp, discovery_argparser, get_credentials, get_service
+from webapis.instrumentation import write_metrics_on_exit
 from webapis.utils import Console
 
 
@@ -33,55 +39,144 @@ def main():
      - the path to the output file, where the data will be written.
      The directories of this path must exist.
 
+    The accounts are listed page by page (--max-results accounts per call).
+    With the --details option, the web properties and views (profiles) of the
+    accounts are also requested, for --workers accounts at the same time, and
+    the CSV file gets the additional columns "Industry Vertical",
+    "Default Profile Id" and "Profiles Id".
+
     Usage:
 
     ```
     <python 3 interpreter>  google_analytics_dump_property_list.py \
             --credentials etc/credentials/googleapi/client_secret.json \
-            --output etc/dump/GA_property_list.csv
+            --output etc/dump/GA_property_list.csv \
+            --details --workers 8
     ```
     """
     Console.print_header(welcome_msg)
     parser = utils.get_output_arg_parser(description="Dump the list of all Google Analytics properties.",
-                                         parents=[tools.argparser])
+                                         parents=[tools.argparser, discovery_argparser])
+    parser.add_argument('--max-results',
+                        dest="max_results",
+                        type=int,
+                        default=settings.googleapi["analytics"]["max_results"],
+                        help='maximum number of items requested per call (at most 1000)')
+    parser.add_argument('--details',
+                        action='store_true',
+                        required=False,
+                        help='also request the web properties and views (profiles) of each account')
+    parser.add_argument('--workers',
+                        dest="workers",
+                        type=int,
+                        default=settings.googleapi["analytics"]["default_workers"],
+                        help='number of accounts whose details are requested concurrently')
     args = parser.parse_args()
+    write_metrics_on_exit(args)
 
     analytics_settings = settings.googleapi["analytics"]
-    api_analytics = get_service(api_name=analytics_settings["api_name"],
-                                api_version=analytics_settings['api_version'],
-                                client_secrets_path=args.credentials,
-                                scope=analytics_settings['scopes'],
-                                flags=args)
+    credentials = get_credentials(api_name=analytics_settings["api_name"],
+                                  client_secrets_path=args.credentials,
+                                  scope=analytics_settings['scopes'],
+                                  flags=args)
+    api_analytics = get_service(analytics_settings["api_name"], analytics_settings['api_version'],
+                                analytics_settings['scopes'], args.credentials, args)
 
     print("\nRetrieving Accounts and properties list...\n")
-    account_summaries = api_analytics.management().accountSummaries().list().execute(num_retries=10)
-    acc_list = AccountSummaryList(account_summaries)
+    accounts = list(iter_account_summaries(api_analytics, args.max_results))
+    accounts_details = iter_accounts_details(api_analytics, credentials, accounts, args.max_results,
+                                             args.workers) if args.details else None
 
     with open(args.dump_file, 'w+', newline='') as csv_file:
         wr = csv.writer(csv_file)
-        wr.writerow(("Account Id", "Account", "Properties Id", "Properties", "Without URL"))
-        report_total_accounts_count = 0
+        wr.writerow(get_csv_header(args.details))
         report_total_properties_count = 0
-        for account in acc_list.items:
-            print("\n****** Account Name: ", account.name, " , Account ID: ", account.id)
-            report_properties_count = 0
-            for web_property in account.web_properties:
-                url = web_property.website_url
-                if url:
-                    wo_url = utils.get_domain_name_from_url(url)
-                    wr.writerow((account.id, account.name, web_property.id, url, wo_url))
-                    report_properties_count += 1
-                    report_total_properties_count += 1
-                    print("\tProperty Name: %s, URL: %s\n\t\t ++ \tDone" % (web_property.name, url))
-                else:
-                    print("\tProperty Name: %s, URL: %s" % (web_property.name, url))
-                    Console.print_yellow("\t\t ++ \tSkipped")
-            print("\n\t****** Processed %d propertie(s) for this account" % report_properties_count)
-            report_total_accounts_count += 1
-    Console.print_green("\nProcessed ", report_total_accounts_count, " account(s) and ",
+        for row in iter_property_rows(accounts, accounts_details):
+            wr.writerow(row)
+            report_total_properties_count += 1
+    Console.print_green("\nProcessed ", len(accounts), " account(s) and ",
                         report_total_properties_count, " propertie(s) in total.")
     Console.print_good_bye_message()
 
 
+def get_csv_header(details: bool = False) -> tuple:
+    """
+    :param details: whether or not the details columns are written
+    :return: the header of the CSV file
+    """
+    header = ("Account Id", "Account", "Properties Id", "Properties", "Without URL")
+    if details:
+        header += ("Industry Vertical", "Default Profile Id", "Profiles Id")
+    return header
+
+
+def iter_property_rows(accounts: List[AccountSummary],
+                       accounts_details: Iterator[AccountDetails] = None) -> Iterator[tuple]:
+    """
+    Provide the rows of the CSV file for the web properties that have a URL,
+    and print the progress of each account.
+
+    :param accounts: the account summaries
+    :param accounts_details: the details of the accounts, in the order of the accounts
+    (see iter_accounts_details()). The details columns are only added if they are given.
+    :return: an iterator over the rows, in the order of the columns of get_csv_header()
+    """
+    for account in accounts:
+        print("\n****** Account Name: ", account.name, " , Account ID: ", account.id)
+        report_properties_count = 0
+        details_columns = get_details_columns(next(accounts_details)) if accounts_details is not None else None
+        for web_property in account.web_properties:
+            url = web_property.website_url
+            if url:
+                wo_url = utils.get_domain_name_from_url(url)
+                row = (account.id, account.name, web_property.id, url, wo_url)
+                if details_columns is not None:
+                    row += details_columns.get(web_property.id, ("", "", ""))
+                yield row
+                report_properties_count += 1
+                print("\tProperty Name: %s, URL: %s\n\t\t ++ \tDone" % (web_property.name, url))
+            else:
+                print("\tProperty Name: %s, URL: %s" % (web_property.name, url))
+                Console.print_yellow("\t\t ++ \tSkipped")
+        print("\n\t****** Processed %d propertie(s) for this account" % report_properties_count)
+
+
+def iter_accounts_details(api_analytics: Resource, credentials: Credentials, accounts: List[AccountSummary],
+                          max_results: int, workers: int) -> Iterator[AccountDetails]:
+    """
+    Request the details of the accounts with a pool of threads.
+
+    :param api_analytics: the Google Analytics service
+    :param credentials: the credentials of the service, used to authorize the http object of each thread
+    :param accounts: the account summaries
+    :param max_results: maximum number of items requested per call
+    :param workers: number of accounts whose details are requested concurrently
+    :return: an iterator over the AccountDetails, in the order of the accounts
+    """
+    thread_local_http = ThreadLocalHttp(credentials)
+    executor = ThreadPoolExecutor(max_workers=max(workers, 1))
+    try:
+        yield from executor.map(lambda account: get_account_details(api_analytics, account.id,
+                                                                    http=thread_local_http.get(),
+                                                                    max_results=max_results),
+                                accounts)
+    finally:
+        executor.shutdown(wait=False)
+
+
+def get_details_columns(account_details: AccountDetails) -> dict:
+    """
+    :param account_details: the details of an account
+    :return: the additional CSV columns (Industry Vertical, Default Profile Id, Profiles Id) by web property ID
+    """
+    profile_ids = {}
+    for profile in account_details.profiles:
+        profile_ids.setdefault(profile.web_property_id, []).append(profile.id)
+    return {web_property.id: (web_property.industry_vertical or "",
+                              web_property.default_profile_id or "",
+                              ";".join(profile_ids.get(web_property.id, ())))
+            for web_property in account_details.web_properties}
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,231 @@
+"""
+This script fetches the Google Analytics properties once, and synchronizes
+Google Search Console, Google Tag Manager and Monitis on them concurrently,
+without going through the CSV file of google_analytics_dump_property_list.py.
+"""
+import argparse
+import contextlib
+import csv
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator
+
+from oauth2client import tools
+
+import settings
+from google_analytics_dump_property_list import get_csv_header, iter_property_rows
+from google_search_console_add_from_analytics_property_list import add_sites_from_property_table
+from google_tagmanager_add_from_analytics_property_list import add_containers_from_properties
+from monitis_add_monitor_from_GA_property_list import add_monitors_via_api, get_monitors_dict, skip_created_monitors
+from webapis.googleapi.analyticss.management import iter_account_summaries
+from webapis.googleapi.analyticss.property_list import PropertyTable
+from webapis.googleapi.api_connector import discovery_argparser, get_credentials, get_service
+from webapis.instrumentation import metrics_argparser, write_metrics_on_exit
+from webapis.utils import Console, LabelledOutput
+
+
+welcome_msg = """
+-------------------------------------------------------------------------------------------------
+**                                                                                             **
+**                            GOOGLE ANALYTICS SYNC PIPELINE                                   **
+**                                                                                             **
+**     Synchronize Search Console, Tag Manager and Monitis on the Analytics properties         **
+-------------------------------------------------------------------------------------------------
+"""
+
+SINKS = ("search_console", "tag_manager", "monitis")
+"""The services that can be synchronized on the Analytics properties"""
+
+
+def main():
+    """
+    Synchronize Google Search Console, Google Tag Manager and Monitis on the
+    Google Analytics properties, in a single process.
+
+    The Analytics accounts and properties are requested once, and kept in memory.
+    The sinks (--sinks, all of them by default) are then run concurrently, each
+    one as its own script would do with the CSV file of the properties. Each line
+    printed by a sink is prefixed with its name, e.g. "[monitis] ". With the
+    --output option, the properties are also dumped in a CSV file, in the format of
+    google_analytics_dump_property_list.py.
+
+    The OAuth flows of the Google APIs, which may require the user, are run before
+    the sinks start. The failure of a sink does not stop the other ones, but the
+    script then exits with the status 1.
+
+    This script expects:
+     - the client_secret.json file which you can download from your
+     Google Developer Console, and
+     - the Monitis credentials file (see monitis_add_monitor_from_GA_property_list.py),
+     if Monitis is one of the sinks.
+
+    Usage:
+
+    ```
+    <python 3 interpreter>  google_analytics_sync_pipeline.py \
+            --credentials etc/credentials/googleapi/client_secret.json \
+            --monitis-credentials etc/credentials/monitisapi/secret_credentials.json \
+            --output etc/dump/GA_property_list.csv \
+            --sync
+    ```
+    """
+    Console.print_header(welcome_msg)
+    args = get_arg_parser().parse_args()
+    write_metrics_on_exit(args)
+
+    sinks = get_sinks(args)
+
+    analytics_settings = settings.googleapi["analytics"]
+    api_analytics = get_service(analytics_settings["api_name"], analytics_settings['api_version'],
+                                analytics_settings['scopes'], args.credentials, args)
+    print("\nRetrieving Accounts and properties list...\n")
+    accounts = list(iter_account_summaries(api_analytics, args.max_results))
+    property_table = PropertyTable.from_records(dump_property_rows(iter_property_rows(accounts), args.dump_file))
+    Console.print_green("\nRetrieved ", len(accounts), " account(s) and ", len(property_table),
+                        " propertie(s) in total.")
+
+    print("\nSynchronizing ", ", ".join(sinks), "...\n")
+    failed_sinks = []
+    with contextlib.redirect_stdout(LabelledOutput(sys.stdout)) as output, \
+            ThreadPoolExecutor(max_workers=len(sinks)) as executor:
+        def run_sink(sink_name: str):
+            with output.labelled(sink_name):
+                sinks[sink_name](property_table)
+
+        futures = {sink_name: executor.submit(run_sink, sink_name) for sink_name in sinks}
+        for sink_name, future in futures.items():
+            exception = future.exception()
+            if exception is not None:
+                failed_sinks.append(sink_name)
+                Console.print_red("\nThe synchronization of ", sink_name, " failed: ", repr(exception))
+
+    if failed_sinks:
+        Console.print_red("\n", len(failed_sinks), " sink(s) failed: ", ", ".join(failed_sinks))
+    else:
+        Console.print_green("\nAll the sinks are synchronized.")
+    Console.print_good_bye_message()
+    if failed_sinks:
+        sys.exit(1)
+
+
+def get_arg_parser() -> argparse.ArgumentParser:
+    """
+    :return: the parser of the options of the pipeline
+    """
+    parser = argparse.ArgumentParser(description="Synchronize Search Console, Tag Manager and Monitis on "
+                                                 "the Google Analytics properties.",
+                                     parents=(tools.argparser, discovery_argparser, metrics_argparser))
+    parser.add_argument('--credentials',
+                        dest="credentials",
+                        required=True,
+                        help='path to the client_secret.json file of the Google APIs.')
+    parser.add_argument('--monitis-credentials',
+                        dest="monitis_credentials",
+                        required=False,
+                        help='path to the credentials file of the Monitis API. Required for the monitis sink.')
+    parser.add_argument('--sinks',
+                        dest="sinks",
+                        nargs='+',
+                        choices=SINKS,
+                        default=SINKS,
+                        help='the services to synchronize, all of them by default')
+    parser.add_argument('--output',
+                        dest="dump_file",
+                        required=False,
+                        help='path of a CSV file where the Analytics properties are also dumped')
+    parser.add_argument('--max-results',
+                        dest="max_results",
+                        type=int,
+                        default=settings.googleapi["analytics"]["max_results"],
+                        help='maximum number of Analytics accounts requested per call (at most 1000)')
+    parser.add_argument('--workers',
+                        dest="workers",
+                        type=int,
+                        default=settings.googleapi["tag_manager"]["default_workers"],
+                        help='number of accounts whose Tag Manager containers are listed concurrently')
+    parser.add_argument('--concurrency',
+                        dest="concurrency",
+                        type=int,
+                        default=settings.monitisapi["bulk"]["default_concurrency"],
+                        help='number of Monitis monitors created concurrently. 1 (one at a time) by default')
+    parser.add_argument('--rate',
+                        dest="calls_per_second",
+                        type=float,
+                        default=settings.monitisapi["bulk"]["calls_per_second"],
+                        help='maximum number of calls per second to the Monitis API. Not limited by default')
+    parser.add_argument('--results',
+                        dest="results_file",
+                        required=False,
+                        help='path of the CSV file where the outcome of each Monitis monitor creation is recorded')
+    parser.add_argument('--sync',
+                        action='store_true',
+                        required=False,
+                        help='only create the Monitis monitors that do not exist yet')
+    return parser
+
+
+def get_sinks(args: argparse.Namespace) -> Dict[str, Callable[[PropertyTable], None]]:
+    """
+    Authenticate to the APIs of the requested sinks, and provide the functions
+    that synchronize them on the Analytics properties.
+
+    :param args: the parsed options of the pipeline
+    :return: the synchronization functions by sink name, in the order of SINKS
+    """
+    if "monitis" in args.sinks and not args.monitis_credentials:
+        get_arg_parser().error("--monitis-credentials is required for the monitis sink")
+    sinks = {}
+    if "search_console" in args.sinks:
+        search_console_settings = settings.googleapi["search_console"]
+        search_console_credentials = get_credentials(api_name=search_console_settings["api_name"],
+                                                     client_secrets_path=args.credentials,
+                                                     scope=search_console_settings['scopes'],
+                                                     flags=args)
+        api_search_console = get_service(search_console_settings["api_name"],
+                                         search_console_settings['api_version'],
+                                         search_console_settings['scopes'], args.credentials, args)
+        sinks["search_console"] = lambda property_table: add_sites_from_property_table(
+            api_search_console, search_console_credentials, property_table)
+    if "tag_manager" in args.sinks:
+        tag_manager_settings = settings.googleapi["tag_manager"]
+        tag_manager_credentials = get_credentials(api_name=tag_manager_settings["api_name"],
+                                                  client_secrets_path=args.credentials,
+                                                  scope=tag_manager_settings['scopes'],
+                                                  flags=args)
+        api_tag_manager = get_service(tag_manager_settings["api_name"], tag_manager_settings['api_version'],
+                                      tag_manager_settings['scopes'], args.credentials, args)
+        sinks["tag_manager"] = lambda property_table: add_containers_from_properties(
+            api_tag_manager, tag_manager_credentials, property_table.group_by_account(), args.workers)
+    if "monitis" in args.sinks:
+        def add_monitors(property_table: PropertyTable):
+            monitors_dict = get_monitors_dict(property_table)
+            if args.results_file:
+                monitors_dict = skip_created_monitors(monitors_dict, args.results_file)
+            add_monitors_via_api(monitors_dict, args.monitis_credentials, concurrency=args.concurrency,
+                                 calls_per_second=args.calls_per_second, results_file_path=args.results_file,
+                                 sync=args.sync)
+        sinks["monitis"] = add_monitors
+    return sinks
+
+
+def dump_property_rows(rows: Iterable[tuple], dump_file_path: str = None) -> Iterator[tuple]:
+    """
+    Pass the rows of the Analytics properties through, while writing them in a CSV file.
+
+    :param rows: the rows, as provided by iter_property_rows()
+    :param dump_file_path: path of the CSV file. The rows are not written if it is None.
+    :return: an iterator over the rows
+    """
+    if not dump_file_path:
+        yield from rows
+        return
+    with open(dump_file_path, 'w+', newline='') as csv_file:
+        wr = csv.writer(csv_file)
+        wr.writerow(get_csv_header())
+        for row in rows:
+            wr.writerow(row)
+            yield row
+
+
+if __name__ == "__main__":
+    main()
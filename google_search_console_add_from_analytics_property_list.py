@@ -2,16 +2,20 @@
 This script creates properties in Google Search Console based on
 properties declared in Google Analytics
 """
-import csv
-
-from googleapiclient.http import BatchHttpRequest
+from googleapiclient.discovery import Resource
 from oauth2client import tools
+from oauth2client.client import Credentials
 
 import settings
 from webapis import utils
 from webapis.utils import Console
-from webapis.googleapi.api_connector import get_service
-from webapis.googleapi.utils import batch_http_request_default_callback
+from webapis.googleapi.analyticss.property_list import PropertyTable, load_property_table
+from webapis.googleapi.api_connector import discovery_argparser, get_credentials, get_service
+from webapis.googleapi.batch import BatchExecutor
+from webapis.googleapi.pagination import PageIterator
+from webapis.googleapi.searchconsoleapi.data_model import SitesList, get_site_domain_name
+from webapis.googleapi.utils import get_labelled_batch_callback
+from webapis.instrumentation import write_metrics_on_exit
 
 
 welcome_msg = """
@@ -29,6 +33,10 @@ def main():
     Synchronize Google Search Console sites on Analytics properties
     from a CSV file.
 
+    The existing sites are listed first: only the properties whose domain is
+    not a site yet are added. The sites are added through batch requests of at
+    most settings.googleapi["batch"]["chunk_size"] calls (see BatchExecutor).
+
     This script expects:
      - the client_secret.json file which you can download from your
      Google Developer Console, and
@@ -47,31 +55,62 @@ def main():
     Console.print_header(welcome_msg)
     parser = utils.get_input_arg_parser(description="Add sites in google search console base on a "
                                                     "list of google analytics properties from a CSV file.",
-                                        parents=(tools.argparser,))
+                                        parents=(tools.argparser, discovery_argparser))
     args = parser.parse_args()
+    write_metrics_on_exit(args)
 
     search_console_settings = settings.googleapi["search_console"]
-    api_search_console = get_service(api_name=search_console_settings["api_name"],
-                                     api_version=search_console_settings['api_version'],
-                                     client_secrets_path=args.credentials,
-                                     scope=search_console_settings['scopes'],
-                                     flags=args)
-
-    batch = BatchHttpRequest(callback=batch_http_request_default_callback)
-    with open(args.input_file, 'r') as csv_file:
-        reader = csv.DictReader(csv_file)
-        print("Preparing batch request:")
-        sites_count = 0
-        for row in reader:
-            website_url = row["Properties"]
-            batch.add(api_search_console.sites().add(siteUrl=website_url),
-                      callback=(lambda *x: print(website_url)))
-            sites_count += 1
-            print("\t** Analytics account: %s, Site URL: %s" % (row["Account"], website_url))
-    Console.print_green("\n", sites_count, " sites added to batch request")
-    batch.execute()
+    credentials = get_credentials(api_name=search_console_settings["api_name"],
+                                  client_secrets_path=args.credentials,
+                                  scope=search_console_settings['scopes'],
+                                  flags=args)
+    api_search_console = get_service(search_console_settings["api_name"], search_console_settings['api_version'],
+                                     search_console_settings['scopes'], args.credentials, args)
+    add_sites_from_property_table(api_search_console, credentials, load_property_table(args.input_file))
     Console.print_good_bye_message()
 
 
+def add_sites_from_property_table(api_search_console: Resource, credentials: Credentials,
+                                  property_table: PropertyTable):
+    """
+    Add a site in Search Console for each domain of the Analytics properties that is not a site yet.
+
+    :param api_search_console: the Search Console service
+    :param credentials: the credentials of the service, used to authorize the batch requests
+    :param property_table: the Analytics properties
+    """
+    search_console_settings = settings.googleapi["search_console"]
+    print("\nRetrieving the list of existing sites...\n")
+    existing_domain_names = {site.domain_name for site in PageIterator(
+        api_search_console.sites().list, SitesList,
+        num_retries=search_console_settings["num_retries"]).items("site_entry")}
+    added_domain_names = set()
+
+    batch = BatchExecutor(credentials)
+    print("Preparing batch request:")
+    existing_sites_count = 0
+    for account, website_url in zip(property_table.accounts, property_table.urls):
+        if not website_url:
+            continue
+        domain_name = get_site_domain_name(website_url)
+        if domain_name in existing_domain_names:
+            existing_sites_count += 1
+            continue
+        if domain_name in added_domain_names:
+            # The same domain may be used by several properties: it is added only once.
+            continue
+        added_domain_names.add(domain_name)
+        batch.add(api_search_console.sites().add(siteUrl=website_url),
+                  callback=get_labelled_batch_callback(website_url))
+        print("\t** Analytics account: %s, Site URL: %s" % (account, website_url))
+    Console.print_yellow("\n", existing_sites_count, " sites already exist in Search Console")
+    Console.print_green(len(batch), " sites added to batch request")
+    report = batch.execute()
+    Console.print_green("\nExisting: ", existing_sites_count, ", added: ", report.calls_count - report.errors_count,
+                        ", failed: ", report.errors_count)
+    if report.retries_count:
+        Console.print_yellow(report.retries_count, " call(s) retried.")
+
+
 if __name__ == "__main__":
     main()
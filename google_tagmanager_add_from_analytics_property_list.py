@@ -4,17 +4,22 @@ For the containers : https://developers.google.com/tag-manager/api/v2/reference/
 """
 
 
-import csv
-
-from googleapiclient.http import BatchHttpRequest
+from googleapiclient.discovery import Resource
 from oauth2client import tools
+from oauth2client.client import Credentials
 
 import settings
 from webapis import utils
-from webapis.googleapi.api_connector import get_service
+from webapis.googleapi.analyticss.property_list import load_properties_by_account
+from webapis.googleapi.api_connector import discovery_argparser, get_credentials, get_service
+from webapis.googleapi.batch import BatchExecutor
+from webapis.googleapi.pagination import PageIterator
+from webapis.googleapi.tagmanagerapi.containers import (get_accounts_containers_indexes,
+                                                        normalize_container_domain_name)
 from webapis.googleapi.tagmanagerapi.data_model import AccountsList
 from webapis.utils import Console
-from webapis.googleapi.utils import batch_http_request_default_callback
+from webapis.googleapi.utils import get_labelled_batch_callback, print_batch_report
+from webapis.instrumentation import write_metrics_on_exit
 
 welcome_msg = """
 -------------------------------------------------------------------------------------------------
@@ -33,6 +38,13 @@ def main():
     The tag is to be add in a container that ha the same name as the
     Google Analytics Account to which the property belongs.
 
+    The existing containers of the accounts are listed first (--workers accounts
+    at the same time), and a container is created only for the domains that have
+    no container yet, by name or by domain name.
+
+    The containers are created through batch requests of at most
+    settings.googleapi["batch"]["chunk_size"] calls (see BatchExecutor).
+
     This script expects:
      - the client_secret.json file which you can download from your
      Google Developer Console, and
@@ -51,29 +63,64 @@ def main():
     Console.print_header(welcome_msg)
     parser = utils.get_input_arg_parser(description="Add tags in google tag manager base on a "
                                                     "list of google analytics properties from a CSV file.",
-                                        parents=(tools.argparser,))
+                                        parents=(tools.argparser, discovery_argparser))
+    parser.add_argument('--workers',
+                        dest="workers",
+                        type=int,
+                        default=settings.googleapi["tag_manager"]["default_workers"],
+                        help='number of accounts whose containers are listed concurrently')
     args = parser.parse_args()
+    write_metrics_on_exit(args)
 
     tag_manager_settings = settings.googleapi["tag_manager"]
-    api_tag_manager = get_service(api_name=tag_manager_settings["api_name"],
-                                  api_version=tag_manager_settings['api_version'],
+    credentials = get_credentials(api_name=tag_manager_settings["api_name"],
                                   client_secrets_path=args.credentials,
                                   scope=tag_manager_settings['scopes'],
                                   flags=args)
+    api_tag_manager = get_service(tag_manager_settings["api_name"], tag_manager_settings['api_version'],
+                                  tag_manager_settings['scopes'], args.credentials, args)
 
     print("\nRetrieving Accounts and properties list from csv file...\n")
     analytics_account_properties_dict = get_analytics_account_properties_dict_from_csv(args.input_file)
+    add_containers_from_properties(api_tag_manager, credentials, analytics_account_properties_dict, args.workers)
+    Console.print_good_bye_message()
+
 
-    processed_accounts = []
+def add_containers_from_properties(api_tag_manager: Resource, credentials: Credentials,
+                                   analytics_account_properties_dict: dict,
+                                   workers: int = settings.googleapi["tag_manager"]["default_workers"]):
+    """
+    Create a container in the Tag Manager account of the same name as each Analytics
+    account, for each domain of its properties that has no container yet.
+
+    :param api_tag_manager: the Tag Manager service
+    :param credentials: the credentials of the service, used to authorize the batch requests
+    and the http objects of the threads
+    :param analytics_account_properties_dict: the list of the unique property URLs by
+    Analytics account name (see get_analytics_account_properties_dict_from_csv()).
+    The processed accounts are removed from it.
+    :param workers: number of accounts whose containers are listed concurrently
+    """
+    tag_manager_settings = settings.googleapi["tag_manager"]
+    processed_accounts = set()
     print("\nRetrieving Accounts list from Google Tag Manager...\n")
-    tagmanager_account_list = AccountsList(api_tag_manager.accounts().list().execute())
+    tagmanager_accounts = list(PageIterator(api_tag_manager.accounts().list, AccountsList,
+                                            num_retries=tag_manager_settings["num_retries"]).items("account"))
 
-    batch = BatchHttpRequest(callback=batch_http_request_default_callback)
+    print("\nRetrieving the existing containers of the Analytics accounts...\n")
+    containers_indexes = get_accounts_containers_indexes(
+        api_tag_manager, credentials,
+        {account.name: account.account_id for account in reversed(tagmanager_accounts)
+         if account.name in analytics_account_properties_dict}.values(),
+        workers=workers)
+
+    batch = BatchExecutor(credentials)
 
     report_total_accounts_count = 0
     report_total_containers_count = 0
+    report_existing_containers_count = 0
 
-    for account in tagmanager_account_list.account:
+    for account in tagmanager_accounts:
         account_name = account.name
         account_id = account.account_id
         report_containers_count = 0
@@ -81,10 +128,18 @@ def main():
         account_exist_in_analytics = analytics_account_properties_dict.get(account_name)
         if account_exist_in_analytics and account_name not in processed_accounts:
             print("\nAccount name: %s , Account Id: %s" % (account_name, account_id))
-            for prop in analytics_account_properties_dict[account_name]:
+            containers_index = containers_indexes[account_id]
+            account_properties = analytics_account_properties_dict[account_name]
+            for prop, domain in zip(account_properties, utils.get_domain_names_from_urls(account_properties)):
+                normalized_domain = normalize_container_domain_name(domain)
+                if normalized_domain in containers_index:
+                    report_existing_containers_count += 1
+                    print("\tDomain Name: %s, URL: %s\n\t\t ++ \tAlready exists " % (domain, prop))
+                    continue
+                # Several properties of the account may share the same domain.
+                containers_index.add(normalized_domain)
                 report_total_containers_count += 1
                 report_containers_count += 1
-                domain = utils.get_domain_name_from_url(prop)
                 print("\tDomain Name: %s, URL: %s\n\t\t ++ \tDone " % (domain, prop))
                 body = {
                     "name": domain,
@@ -92,24 +147,24 @@ def main():
                 }
                 batch.add(api_tag_manager.accounts().containers().create(parent='accounts/' + account_id,
                                                                          body=body),
-                          callback=lambda *x: print(account_id, ", ", str(body)))
+                          callback=get_labelled_batch_callback(account_id + ", " + str(body)))
             print("\n\t****** ", report_containers_count, " tags creation request added "
                                                           "to batch for this account")
             report_total_accounts_count += 1
-            processed_accounts.append(account.name)
+            processed_accounts.add(account.name)
             analytics_account_properties_dict.pop(account_name)
         else:
             Console.print_yellow("\nThe Tag Manager Account +",
                                  account_name, "+ doesn't exist in Google Analytics")
-    batch.execute()
+    print_batch_report(batch.execute())
     Console.print_green("\nProcessed ", report_total_accounts_count,
                         " account(s) and ", report_total_containers_count, " Container(s) in total.")
+    Console.print_yellow(report_existing_containers_count, " Container(s) already existed.")
 
     for missing_account in analytics_account_properties_dict.keys():
         Console.print_red("\nThe Google Analytics +", missing_account,
                           "+ is missing as an account in Tag Manger account. Please "
                           "create it manually if you want to add some containers to it")
-    Console.print_good_bye_message()
 
 
 def get_analytics_account_properties_dict_from_csv(csv_file_path: str) -> dict:
@@ -118,19 +173,10 @@ def get_analytics_account_properties_dict_from_csv(csv_file_path: str) -> dict:
 
     :param csv_file_path: path to the CSV file where Google Analytics
     Properties have previously been dumped.
-    :return: a dict representation of the Analytics Properties.
+    :return: a dict representation of the Analytics Properties: the list of
+    the unique property URLs by account name.
     """
-    account_to_properties = {}
-    with open(csv_file_path, "r") as csv_file:
-        reader = csv.DictReader(csv_file)
-        for row in reader:
-            account = row["Account"]
-            account_property = row["Properties"]
-            if account not in account_to_properties and account_property != '':
-                account_to_properties[account] = [account_property]
-            elif account_property != '':
-                account_to_properties[account].append(account_property)
-    return account_to_properties
+    return load_properties_by_account(csv_file_path)
 
 
 if __name__ == "__main__":
@@ -3,10 +3,18 @@ This script creates all the monitors for each properties
 given in a csv file on the Monitis Application
 """
 
+from concurrent.futures import ThreadPoolExecutor
+import os
+from typing import Iterable
+from webapis.googleapi.analyticss.property_list import PropertyTable, load_property_table
 from webapis.monitisapi import api_connector
+from webapis.monitisapi.data_model import Monitor
 import csv
+import requests
+import settings
 from webapis import utils
-from webapis.utils import Console
+from webapis.instrumentation import write_metrics_on_exit
+from webapis.utils import Console, RateLimiter
 
 
 welcome_msg = """
@@ -41,21 +49,56 @@ def main():
         }
     ```
 
+    Monitors are created one at a time by default. They can be created
+    concurrently (--concurrency), and the rate of calls to the API can be
+    limited (--rate). With the --results option, the outcome of
+    each creation is appended to a CSV file, and the monitors successfully
+    created by a previous run are not created again.
+
+    With the --sync option, the existing monitors are listed first, and only the
+    monitors that do not exist yet, by name or by monitored domain, are created.
+
     Usage:
 
     ```
     <python 3 interpreter> monitis_add_monitor_from_GA_property_list.py \
             --credentials etc/credentials/monitisapi/secret_credentials.json \
-            --input etc/dump/GA_property_list.csv
+            --input etc/dump/GA_property_list.csv \
+            --sync \
+            --results etc/dump/monitis_add_monitor_results.csv
     ```
     """
     Console.print_header(welcome_msg)
     parser = utils.get_input_arg_parser(description="Add monitors in Monitis from a list of properties "
                                                     "previously dumped from Google Analytics.")
+    parser.add_argument('--concurrency',
+                        dest="concurrency",
+                        type=int,
+                        default=settings.monitisapi["bulk"]["default_concurrency"],
+                        help='number of monitors created concurrently. 1 (one at a time) by default')
+    parser.add_argument('--rate',
+                        dest="calls_per_second",
+                        type=float,
+                        default=settings.monitisapi["bulk"]["calls_per_second"],
+                        help='maximum number of calls per second to the Monitis API. Not limited by default')
+    parser.add_argument('--results',
+                        dest="results_file",
+                        required=False,
+                        help='path of the CSV file where the outcome of each creation is recorded')
+    parser.add_argument('--sync',
+                        action='store_true',
+                        required=False,
+                        help='only create the monitors that do not exist yet in Monitis')
     args = parser.parse_args()
+    write_metrics_on_exit(args)
 
     monitors_dict = load_analytics_properties(args.input_file)
-    add_monitors_via_api(monitors_dict, args.credentials)
+    if args.results_file:
+        monitors_dict = skip_created_monitors(monitors_dict, args.results_file)
+    add_monitors_via_api(monitors_dict, args.credentials, concurrency=args.concurrency,
+                         calls_per_second=args.calls_per_second, results_file_path=args.results_file,
+                         sync=args.sync)
+    Console.print_good_bye_message()
 
 
 def load_analytics_properties(csv_file: str) -> dict:
@@ -76,18 +119,27 @@ def load_analytics_properties(csv_file: str) -> dict:
         }
     }
     """
+    print("\nLoading Analytics Properties's CSV file...\n")
+    return get_monitors_dict(load_property_table(csv_file))
+
+
+def get_monitors_dict(property_table: PropertyTable) -> dict:
+    """
+    Gather the monitors to create for the Google Analytics properties, by monitor name
+    (see load_analytics_properties()).
+
+    :param property_table: the Analytics properties
+    :return: a dictionary of the url and account of the monitors by monitor name
+    """
     monitors_dict = {}
     csv_lines_count = 0
-    print("\nLoading Analytics Properties's CSV file...\n")
-    with open(csv_file, "r") as csv_file:
-        reader = csv.DictReader(csv_file)
-        for row in reader:
-            csv_lines_count += 1
-            url = row.get('Properties')
-            monitor_name = get_monitor_name(row.get('Without URL'))
-            account = row['Account']
-            monitors_dict[monitor_name] = {"url": url, "account": account}
-            print("\t**** ", monitor_name, ", ", url, ", ", account)
+    for row in property_table.rows():
+        csv_lines_count += 1
+        url = row.url
+        monitor_name = get_monitor_name(row.domain_name)
+        account = row.account
+        monitors_dict[monitor_name] = {"url": url, "account": account}
+        print("\t**** ", monitor_name, ", ", url, ", ", account)
     Console.print_green("\n", csv_lines_count, " CSV lines loaded\n")
     return monitors_dict
 
@@ -103,36 +155,138 @@ def get_monitor_name(domain_name: str) -> str:
     return domain_name + "_RUM"
 
 
-def add_monitors_via_api(monitors_dict: dict, api_credentials_file_path: str):
+def skip_created_monitors(monitors_dict: dict, results_file_path: str) -> dict:
+    """
+    Remove the monitors successfully created by a previous run.
+
+    :param monitors_dict: monitors to add, represented as a dict.
+    :param results_file_path: path to the results file of the previous runs.
+    If the monitor appears several times in the file, its last outcome is used.
+    :return: the monitors that remain to be created
+    """
+    if not os.path.isfile(results_file_path):
+        return monitors_dict
+    last_statuses = {}
+    with open(results_file_path, "r", newline='') as results_file:
+        for row in csv.DictReader(results_file):
+            last_statuses[row["Monitor"]] = row["Status"]
+    remaining_monitors_dict = {monitor_name: monitor_dict for monitor_name, monitor_dict in monitors_dict.items()
+                               if last_statuses.get(monitor_name) != "OK"}
+    Console.print_yellow(len(monitors_dict) - len(remaining_monitors_dict),
+                         " monitors already created by a previous run are skipped\n")
+    return remaining_monitors_dict
+
+
+def skip_existing_monitors(monitors_dict: dict, existing_monitors: Iterable[Monitor]) -> dict:
+    """
+    Remove the monitors that already exist in Monitis.
+
+    A monitor exists if a monitor has the same name (see get_monitor_name()) or
+    monitors the same domain.
+
+    :param monitors_dict: monitors to add, represented as a dict.
+    :param existing_monitors: the monitors that exist in Monitis
+    :return: the monitors that remain to be created
+    """
+    existing_names = set()
+    existing_domain_names = set()
+    for monitor in existing_monitors:
+        existing_names.add(monitor.name)
+        if monitor.params.url:
+            existing_domain_names.add(utils.get_domain_name_from_url(monitor.params.url))
+    remaining_monitors_dict = {
+        monitor_name: monitor_dict for monitor_name, monitor_dict in monitors_dict.items()
+        if monitor_name not in existing_names
+        and utils.get_domain_name_from_url(monitor_dict["url"]) not in existing_domain_names}
+    Console.print_yellow(len(monitors_dict) - len(remaining_monitors_dict),
+                         " monitors already exist in Monitis and are skipped\n")
+    return remaining_monitors_dict
+
+
+def add_monitors_via_api(monitors_dict: dict, api_credentials_file_path: str,
+                         concurrency: int = 1, calls_per_second: float = 0,
+                         results_file_path: str = None, sync: bool = False):
     """
     Add a monitor in Monitis using its API?
 
+    The monitors are created by a pool of threads, but the outcome of each creation
+    is printed in the order of monitors_dict.
+
     :param monitors_dict: monitors to add, represented as a dict.
     :param api_credentials_file_path: path to the API credentials file.
+    :param concurrency: number of monitors created concurrently.
+    :param calls_per_second: maximum number of calls per second to the API. Not limited if 0.
+    :param results_file_path: path to a CSV file where the outcome of each creation is appended.
+    :param sync: if True, the monitors that already exist in Monitis are not created.
     """
-    service = api_connector.Service(api_credentials_file_path)
-    auth_token = service.get_token()
+    service = api_connector.Service(api_credentials_file_path,
+                                    pool_size=max(concurrency, settings.monitisapi["http"]["pool_size"]))
+    # Fails early on invalid credentials. The token is then renewed by the service when needed.
+    service.get_token()
+    if sync:
+        print("\nRequesting the list of existing monitors...\n")
+        monitors_dict = skip_existing_monitors(monitors_dict, map(Monitor, service.iter_monitors()))
+    rate_limiter = RateLimiter(calls_per_second)
+
+    def add_monitor(monitor_item: tuple) -> tuple:
+        monitor_name, monitor_dict = monitor_item
+        domain_name = utils.get_domain_name_from_url(monitor_dict["url"])
+        try:
+            response = service.add_rum_monitor(monitor_name=monitor_name,
+                                               resource_url=domain_name,
+                                               tag='["'+monitor_dict["account"]+'"]',
+                                               rate_limiter=rate_limiter)
+            json_response = response.json()
+            error = response.status_code >= 300 or json_response.get("error")
+        except (requests.RequestException, ValueError) as exception:
+            json_response = {"error": str(exception)}
+            error = True
+        return monitor_name, domain_name, monitor_dict["account"], json_response, error
+
+    results_writer = None
+    results_file = None
+    if results_file_path:
+        write_header = not os.path.isfile(results_file_path)
+        results_file = open(results_file_path, "a", newline='')
+        results_writer = csv.writer(results_file)
+        if write_header:
+            results_writer.writerow(("Monitor", "URL", "Account", "Status", "Response"))
 
     processed_properties_count = 0
     errors_count = 0
-    for monitor_name, monitor_dict in monitors_dict.items():
-        domain_name = utils.get_domain_name_from_url(monitor_dict["url"])
-        account = monitor_dict["account"]
-        response = service.add_rum_monitor(auth_token=auth_token,
-                                           monitor_name=monitor_name,
-                                           resource_url=domain_name,
-                                           tag='["'+account+'"]')
-        json_response = response.json()
-        if response.status_code >= 300 or json_response.get("error"):
-            errors_count += 1
-            Console.print_red("\t", str(json_response), "\t",
-                              monitor_name, ", ", domain_name, ", ", account)
-        else:
-            processed_properties_count += 1
-            print("\t**** ", monitor_name, ", ", domain_name, ", ", account)
+    try:
+        with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+            for monitor_name, domain_name, account, json_response, error in executor.map(
+                    add_monitor, monitors_dict.items()):
+                if error:
+                    errors_count += 1
+                    Console.print_red("\t", str(json_response), "\t",
+                                      monitor_name, ", ", domain_name, ", ", account)
+                else:
+                    processed_properties_count += 1
+                    print("\t**** ", monitor_name, ", ", domain_name, ", ", account)
+                if results_writer is not None:
+                    results_writer.writerow((monitor_name, domain_name, account,
+                                             "ERROR" if error else "OK", str(json_response)))
+                    results_file.flush()
+    finally:
+        if results_file is not None:
+            results_file.close()
+        service.close()
     Console.print_green(processed_properties_count, " monitors added.")
     Console.print_red(errors_count, " errors.")
-    Console.print_good_bye_message()
+    print_request_stats(service.get_request_stats())
+
+
+def print_request_stats(request_stats: dict):
+    """
+    Print the latency of the calls to the Monitis API.
+
+    :param request_stats: the latency counters by action, as returned by Service.get_request_stats()
+    """
+    for action, stats in sorted(request_stats.items()):
+        print("\t%s: %d calls, %d errors, average %.3fs, max %.3fs"
+              % (action, stats.count, stats.errors, stats.total_seconds / stats.count, stats.max_seconds))
 
 
 if __name__ == "__main__":
@@ -1,7 +1,10 @@
+import csv
+
+import settings
 from webapis.monitisapi import api_connector
 from webapis.monitisapi.data_model import Monitor
-from webapis.common.data_model import GenericWrappingIterator
 from webapis import utils
+from webapis.instrumentation import write_metrics_on_exit
 from webapis.utils import Console
 
 
@@ -14,6 +17,9 @@ welcome_msg = """
 -------------------------------------------------------------------------------------------------
 """
 
+PROGRESS_INTERVAL = 1000
+"""A progress line is printed each time this number of monitors has been dumped"""
+
 
 def main():
     """
@@ -35,6 +41,9 @@ def main():
         }
     ```
 
+    The monitors are decoded and written one by one while the list is downloaded,
+    so that the memory used does not depend on the number of monitors.
+
     Usage:
 
     ```
@@ -46,21 +55,20 @@ def main():
     Console.print_header(welcome_msg)
     parser = utils.get_output_arg_parser(description='Dump the list of monitor in Monitis into a CSV file.')
     args = parser.parse_args()
+    write_metrics_on_exit(args)
 
     service = api_connector.Service(args.credentials)
     print("\nRequesting the list of monitors...\n")
-    res = service.list_monitors()
     dumped_monitors_count = 0
-    with open(args.dump_file, "w+") as file:
+    with open(args.dump_file, "w+", newline='', buffering=settings.monitisapi["http"]["stream_chunk_size"]) as file:
+        # Same format as before the csv module: an unquoted header, and quoted strings in the rows.
         file.write("Domain,URL,Monitor ID\n")
-        for monitor in GenericWrappingIterator(res, Monitor):
-            csv_line = '"{domain}","{url}",{id}\r\n'.format(
-                domain=monitor.params.domain,
-                url=monitor.params.url,
-                id=monitor.id)
-            file.write(csv_line)
+        writer = csv.writer(file, quoting=csv.QUOTE_NONNUMERIC)
+        for monitor in map(Monitor, service.iter_monitors()):
+            writer.writerow((monitor.params.domain, monitor.params.url, monitor.id))
             dumped_monitors_count += 1
-            print("\t**** " + csv_line)
+            if dumped_monitors_count % PROGRESS_INTERVAL == 0:
+                print("\t**** %d monitors dumped" % dumped_monitors_count)
     Console.print_green(dumped_monitors_count, " monitors dumped")
     Console.print_good_bye_message()
 
@@ -1,23 +1,43 @@
 
 
+import os
+
 googleapi = {
     "analytics": {
         "api_name": "analytics",
         "api_version": "v3",
         "scopes": ["https://www.googleapis.com/auth/analytics.edit",
-                   "https://www.googleapis.com/auth/analytics.readonly"]
+                   "https://www.googleapis.com/auth/analytics.readonly"],
+        "max_results": 1000,
+        "num_retries": 10,
+        "default_workers": 4
     },
     "search_console": {
         "api_name": "webmasters",
         "api_version": "v3",
         "scopes": ['https://www.googleapis.com/auth/webmasters',
-                   'https://www.googleapis.com/auth/webmasters.readonly']
+                   'https://www.googleapis.com/auth/webmasters.readonly'],
+        "num_retries": 10
     },
     "tag_manager": {
         "api_name": "tagmanager",
         "api_version": "v2",
         "scopes": ['https://www.googleapis.com/auth/tagmanager.edit.containers',
-                   'https://www.googleapis.com/auth/tagmanager.readonly']
+                   'https://www.googleapis.com/auth/tagmanager.readonly'],
+        "num_retries": 10,
+        "default_workers": 4
+    },
+    "batch": {
+        "chunk_size": 100,
+        "workers": 2,
+        "max_retries": 5,
+        "base_delay": 1,
+        "max_delay": 32,
+        "retry_status_codes": (429, 500, 502, 503, 504)
+    },
+    "discovery": {
+        "cache_directory": os.path.join(os.path.expanduser("~"), ".cache", "webapis", "googleapi_discovery"),
+        "ttl": 24 * 3600
     }
 }
 
@@ -32,6 +52,24 @@ monitisapi = {
     "credentials": {
         "auth_method": "token"
     },
+    "bulk": {
+        "default_concurrency": 1,
+        "calls_per_second": 0
+    },
+    "token_cache": {
+        "file_name": ".monitis_token_cache.json",
+        "ttl": 24 * 3600,
+        "refresh_margin": 15 * 60
+    },
+    "http": {
+        "pool_size": 10,
+        "connect_timeout": 5,
+        "read_timeout": 60,
+        "max_retries": 3,
+        "backoff_factor": 0.5,
+        "retry_status_codes": (500, 502, 503, 504),
+        "stream_chunk_size": 64 * 1024
+    },
     "monitor": {
         "monitor_default_type": "RUM",
         "default_tag": '["test"]',
@@ -39,4 +77,23 @@ monitisapi = {
                            "false:false;aggType:AggType:median:1:false:false;"),
         "result_params": "position:Position:N/A:2;difference:Difference:N/A:3;"
     }
-}
\ No newline at end of file
+}
+
+awsapi = {
+    "route53": {
+        "default_workers": 1,
+        "max_pool_connections": 10,
+        "manifest_file_name": ".route53_backup_manifest.json"
+    },
+    "throttling": {
+        "error_codes": ("Throttling", "ThrottlingException", "PriorRequestNotComplete"),
+        "max_retries": 8,
+        "base_delay": 0.5,
+        "max_delay": 20
+    }
+}
+
+metrics = {
+    "default_format": "json",
+    "latency_buckets": (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+}
@@ -0,0 +1,41 @@
+import os
+import tempfile
+import unittest
+
+import boto3
+import botocore.exceptions
+from botocore.stub import Stubber
+
+from aws_dump_backup_files import dump_hosted_zone
+from webapis.awsapi.backup_manifest import BackupManifest
+
+
+def new_hosted_zone(zone_id: str, zone_name: str) -> dict:
+    return {"Id": "/hostedzone/" + zone_id, "Name": zone_name, "CallerReference": zone_id,
+            "ResourceRecordSetCount": 1}
+
+
+class IncrementalBackupTest(unittest.TestCase):
+    def test_manifest_is_saved_after_each_zone(self):
+        client = boto3.client("route53", aws_access_key_id="stand-in", aws_secret_access_key="stand-in",
+                              region_name="us-east-1")
+        with tempfile.TemporaryDirectory() as output_dir, Stubber(client) as stubber:
+            output_dir += os.sep
+            manifest_file_path = os.path.join(output_dir, ".manifest.json")
+            manifest = BackupManifest(manifest_file_path)
+            stubber.add_response("list_resource_record_sets", {
+                "ResourceRecordSets": [{"Name": "www.a.com.", "Type": "A", "TTL": 60,
+                                        "ResourceRecords": [{"Value": "192.0.2.1"}]}],
+                "IsTruncated": False, "MaxItems": "100"})
+            stubber.add_client_error("list_resource_record_sets", "AccessDenied", http_status_code=403)
+            dump_hosted_zone(new_hosted_zone("ZA", "a.com."), False, output_dir, client, manifest, ["json"])
+            # The backup is interrupted by the second zone.
+            with self.assertRaises(botocore.exceptions.ClientError):
+                dump_hosted_zone(new_hosted_zone("ZB", "b.com."), False, output_dir, client, manifest, ["json"])
+            saved_manifest = BackupManifest(manifest_file_path)
+            self.assertTrue(saved_manifest.is_up_to_date("ZA", 1, False, ["json"]))
+            self.assertFalse(saved_manifest.is_up_to_date("ZB", 1, False, ["json"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
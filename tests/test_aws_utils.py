@@ -0,0 +1,47 @@
+import unittest
+from unittest import mock
+
+import boto3
+import botocore.exceptions
+from botocore.stub import Stubber
+
+import settings
+from webapis.awsapi.utils import call_with_backoff
+from webapis.instrumentation import instrument_boto3_client, metrics
+
+
+class CallWithBackoffMetricsTest(unittest.TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.client = boto3.client("route53", aws_access_key_id="stand-in", aws_secret_access_key="stand-in",
+                                   region_name="us-east-1")
+        instrument_boto3_client(self.client)
+
+    def get_endpoint_metrics(self) -> dict:
+        return metrics.get_summary()["calls"]["aws"]["route53.ListHostedZones"]
+
+    @mock.patch("time.sleep")
+    def test_throttled_calls_are_recorded_as_failed(self, sleep):
+        max_retries = settings.awsapi["throttling"]["max_retries"]
+        with Stubber(self.client) as stubber:
+            for _ in range(max_retries + 1):
+                stubber.add_client_error("list_hosted_zones", "Throttling", http_status_code=400)
+            with self.assertRaises(botocore.exceptions.ClientError):
+                call_with_backoff(self.client.list_hosted_zones)
+        endpoint_metrics = self.get_endpoint_metrics()
+        self.assertEqual(max_retries + 1, endpoint_metrics["calls"])
+        self.assertEqual(max_retries + 1, endpoint_metrics["errors"])
+        self.assertEqual(max_retries, endpoint_metrics["retries"])
+
+    def test_call_without_response_is_recorded_as_failed_once(self):
+        error = botocore.exceptions.EndpointConnectionError(endpoint_url="https://route53.amazonaws.com")
+        with mock.patch.object(self.client._endpoint, "make_request", side_effect=error):
+            with self.assertRaises(botocore.exceptions.EndpointConnectionError):
+                call_with_backoff(self.client.list_hosted_zones)
+        endpoint_metrics = self.get_endpoint_metrics()
+        self.assertEqual(1, endpoint_metrics["calls"])
+        self.assertEqual(1, endpoint_metrics["errors"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import json
+import os
+import tempfile
+import unittest
+
+from webapis.awsapi.backup_diff import diff_backup_directories
+
+
+def write_json_backup(backup_dir: str, zone_name: str, record_sets: list):
+    with open(os.path.join(backup_dir, zone_name + "json"), "w") as file:
+        json.dump({"ResourceRecordSets": record_sets}, file)
+
+
+class DiffBackupDirectoriesTest(unittest.TestCase):
+    def test_zone_without_common_format_does_not_abort_the_diff(self):
+        record_set = {"Name": "www.b.com.", "Type": "A", "TTL": 60, "ResourceRecords": [{"Value": "192.0.2.1"}]}
+        with tempfile.TemporaryDirectory() as old_dir, tempfile.TemporaryDirectory() as new_dir:
+            # a.com. is a JSON backup in the old directory and a YAML template in the new one.
+            write_json_backup(old_dir, "a.com.", [])
+            with open(os.path.join(new_dir, "a.com.yml"), "w") as file:
+                file.write("Resources: {}\n")
+            write_json_backup(old_dir, "b.com.", [])
+            write_json_backup(new_dir, "b.com.", [record_set])
+            zone_diffs = list(diff_backup_directories(old_dir, new_dir))
+        self.assertEqual(["a.com.", "b.com."], [zone_diff.zone_name for zone_diff in zone_diffs])
+        self.assertIsNone(zone_diffs[0].diff)
+        self.assertEqual("the backups have no common format", zone_diffs[0].not_comparable_reason)
+        self.assertEqual([record_set], zone_diffs[1].diff.added)
+
+    def test_weighted_record_sets_without_set_identifier_are_not_comparable(self):
+        # The CloudFormation templates have no SetIdentifier.
+        template = """Resources:
+  records:
+    Properties:
+      RecordSets:
+      - {Name: www.a.com., Type: A, TTL: 60, ResourceRecords: [192.0.2.1]}
+      - {Name: www.a.com., Type: A, TTL: 60, ResourceRecords: [%s]}
+"""
+        with tempfile.TemporaryDirectory() as old_dir, tempfile.TemporaryDirectory() as new_dir:
+            with open(os.path.join(old_dir, "a.com.yml"), "w") as file:
+                file.write(template % "192.0.2.2")
+            with open(os.path.join(new_dir, "a.com.yml"), "w") as file:
+                file.write(template % "192.0.2.3")
+            zone_diffs = list(diff_backup_directories(old_dir, new_dir))
+        self.assertEqual(1, len(zone_diffs))
+        self.assertIsNone(zone_diffs[0].diff)
+        self.assertIn("www.a.com. A", zone_diffs[0].not_comparable_reason)
+
+
+if __name__ == "__main__":
+    unittest.main()
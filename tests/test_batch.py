@@ -0,0 +1,54 @@
+import unittest
+from unittest import mock
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+import settings
+from webapis.googleapi.api_connector import ThreadLocalHttp
+from webapis.googleapi.batch import BatchExecutor
+
+
+class ThrottlingBatchHttpRequest:
+    """A BatchHttpRequest whose calls are all throttled (429) on the first batch request only."""
+    batch_requests_count = 0
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.request_ids = []
+
+    def add(self, request, request_id):
+        self.request_ids.append(request_id)
+
+    def execute(self, http=None):
+        ThrottlingBatchHttpRequest.batch_requests_count += 1
+        for request_id in self.request_ids:
+            if ThrottlingBatchHttpRequest.batch_requests_count == 1:
+                self.callback(request_id, None, HttpError(httplib2.Response({"status": 429}), b"{}"))
+            else:
+                self.callback(request_id, {}, None)
+
+
+class BatchExecutorTest(unittest.TestCase):
+    def test_many_throttled_calls_of_a_chunk_are_retried_once(self):
+        ThrottlingBatchHttpRequest.batch_requests_count = 0
+        outcomes = []
+        executor = BatchExecutor(None, callback=lambda request_id, response, exception: outcomes.append(exception),
+                                 chunk_size=10, workers=1, max_retries=2)
+        for _ in range(6):
+            executor.add(mock.Mock(methodId="webmasters.sites.add"))
+        with mock.patch("webapis.googleapi.batch.BatchHttpRequest", ThrottlingBatchHttpRequest), \
+                mock.patch.object(ThreadLocalHttp, "get", return_value=None), \
+                mock.patch("webapis.googleapi.batch.time.sleep") as sleep:
+            report = executor.execute()
+
+        self.assertEqual((6, 0, 6), tuple(report))
+        self.assertEqual([None] * 6, outcomes)
+        self.assertEqual(2, ThrottlingBatchHttpRequest.batch_requests_count)
+        # The delay of the first retry is based on the attempt number, not on the number of failed calls.
+        self.assertEqual(1, sleep.call_count)
+        self.assertLessEqual(sleep.call_args[0][0], settings.googleapi["batch"]["base_delay"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,22 @@
+import unittest
+
+from webapis.awsapi.data_model import ResourceRecordSet
+
+
+class ResourceRecordSetTest(unittest.TestCase):
+    def test_to_dict_keeps_the_fields_that_are_not_modelled(self):
+        record_set = {'Name': 'www.example.com.', 'Type': 'A', 'TTL': 60, 'SetIdentifier': 'paris',
+                      'ResourceRecords': [{'Value': '192.0.2.1'}], 'MultiValueAnswer': True,
+                      'HealthCheckId': 'check', 'CidrRoutingConfig': {'CollectionId': 'c', 'LocationName': 'l'},
+                      'GeoLocation': {'CountryCode': 'FR', 'SubdivisionCode': None, 'NewKey': 'value'}}
+        self.assertEqual(record_set, ResourceRecordSet(record_set).to_dict())
+
+    def test_modelled_record_set_has_no_other_fields(self):
+        record_set = ResourceRecordSet({'Name': 'example.com.', 'Type': 'A',
+                                        'AliasTarget': {'HostedZoneId': 'Z', 'DNSName': 'd.example.net.',
+                                                        'EvaluateTargetHealth': False}})
+        self.assertIsNone(record_set.other_fields)
+
+
+if __name__ == "__main__":
+    unittest.main()
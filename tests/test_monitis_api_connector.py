@@ -0,0 +1,42 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from webapis.monitisapi.api_connector import Service
+from webapis.utils import RateLimiter
+
+
+def new_response(status_code: int, json_body: dict) -> mock.Mock:
+    response = mock.Mock(status_code=status_code, content=json.dumps(json_body).encode("utf-8"))
+    response.json.return_value = json_body
+    response.request.body = None
+    response.raw.retries = None
+    return response
+
+
+class AddRumMonitorTest(unittest.TestCase):
+    def test_repost_with_a_renewed_token_goes_through_the_rate_limiter(self):
+        with tempfile.TemporaryDirectory() as work_directory:
+            credentials_file_path = os.path.join(work_directory, "monitis_credentials.json")
+            with open(credentials_file_path, "w") as file:
+                json.dump({"api_key": "api", "secret_key": "secret", "agent_key": "agent", "user_key": "user"}, file)
+            service = Service(credentials_file_path)
+            service.session = mock.Mock()
+            service.session.request.side_effect = [
+                new_response(200, {"authToken": "old"}),
+                new_response(200, {"error": "Invalid authToken"}),
+                new_response(200, {"authToken": "new"}),
+                new_response(200, {"status": "ok", "data": 1}),
+            ]
+            rate_limiter = mock.Mock(spec=RateLimiter)
+            response = service.add_rum_monitor("example.com_RUM", "example.com", None, '["dev"]',
+                                               rate_limiter=rate_limiter)
+        self.assertEqual("ok", response.json()["status"])
+        self.assertEqual(2, rate_limiter.wait.call_count)
+        self.assertEqual('["dev"]', service.session.request.call_args[1]["data"]["tag"])
+
+
+if __name__ == "__main__":
+    unittest.main()
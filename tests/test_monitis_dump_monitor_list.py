@@ -0,0 +1,31 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import monitis_dump_monitor_list
+
+
+class DumpMonitorListTest(unittest.TestCase):
+    def test_csv_file_has_the_format_of_the_hand_written_dump(self):
+        monitors = [{"id": 124115, "params": {"domain": "www.example.com/"}},
+                    {"id": 124116, "params": {"domain": "example.org/shop"}}]
+        with tempfile.TemporaryDirectory() as work_directory:
+            dump_file_path = os.path.join(work_directory, "monitis_rum_monitors.csv")
+            argv = ["monitis_dump_monitor_list.py", "--credentials", "credentials.json", "--output", dump_file_path]
+            with mock.patch("sys.argv", argv), \
+                    mock.patch("webapis.monitisapi.api_connector.Service") as service, \
+                    contextlib.redirect_stdout(io.StringIO()):
+                service.return_value.iter_monitors.return_value = iter(monitors)
+                monitis_dump_monitor_list.main()
+            with open(dump_file_path, "rb") as file:
+                content = file.read()
+        self.assertEqual(b'Domain,URL,Monitor ID\n'
+                         b'"example.com","www.example.com/",124115\r\n'
+                         b'"example.org","example.org/shop",124116\r\n', content)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import contextlib
+import io
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from webapis.utils import LabelledOutput, get_domain_name_from_url, get_domain_names_from_urls, with_output_label
+
+
+class DomainNameTest(unittest.TestCase):
+    def test_url_with_trailing_spaces(self):
+        self.assertEqual("example.com", get_domain_name_from_url("http://www.example.com  "))
+        self.assertEqual("example.com", get_domain_name_from_url(" example.com \t"))
+
+    def test_column_of_urls_is_memoized(self):
+        get_domain_name_from_url.cache_clear()
+        urls = ["http://www.example.com/", "https://example.org/a", "http://www.example.com/"]
+        self.assertEqual(["example.com", "example.org", "example.com"], get_domain_names_from_urls(urls))
+        self.assertEqual(2, get_domain_name_from_url.cache_info().currsize)
+        get_domain_names_from_urls(urls)
+        self.assertEqual(2, get_domain_name_from_url.cache_info().hits)
+
+
+class LabelledOutputTest(unittest.TestCase):
+    def test_lines_of_concurrent_tasks_are_prefixed_and_not_mixed(self):
+        stream = io.StringIO()
+        with contextlib.redirect_stdout(LabelledOutput(stream)) as output:
+            def task(label: str):
+                with output.labelled(label):
+                    for index in range(200):
+                        print("line", index, "of", label)
+                    print("no new line", end="")
+
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                list(executor.map(task, ["one", "two"]))
+            print("unlabelled")
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(403, len(lines))
+        for label in ("one", "two"):
+            expected_lines = ["[%s] line %d of %s" % (label, index, label) for index in range(200)]
+            expected_lines.append("[%s] no new line" % label)
+            self.assertEqual(expected_lines, [line for line in lines if line.startswith("[%s] " % label)])
+        self.assertEqual("unlabelled", lines[-1])
+
+    def test_pool_threads_print_with_the_label_of_the_caller(self):
+        stream = io.StringIO()
+        with contextlib.redirect_stdout(LabelledOutput(stream)) as output, output.labelled("sink"):
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                list(executor.map(with_output_label(print), ["a", "b"]))
+        self.assertEqual(["[sink] a", "[sink] b"], sorted(stream.getvalue().splitlines()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+"""
+Compare two Route 53 backups, made by aws_dump_backup_files.py.
+
+Record sets are indexed by (Name, Type, SetIdentifier), which identifies a record set
+in a hosted zone, so that two versions of a zone are compared in linear time.
+"""
+import json
+import os
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import yaml
+
+from webapis.awsapi.backup_manifest import get_file_fingerprint
+
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
+
+BACKUP_FILE_EXTENSIONS = ("json", "yml")
+"""Extensions of the backup files that can be compared, by order of preference"""
+
+RecordSetKey = Tuple[str, str, Optional[str]]
+"""(Name, Type, SetIdentifier) of a record set"""
+
+RecordSetDiff = NamedTuple("RecordSetDiff", [("added", List[dict]),
+                                             ("removed", List[dict]),
+                                             ("modified", List[Tuple[dict, dict]])])
+"""Differences between two versions of the record sets of a zone. modified holds (old, new) pairs."""
+
+ZoneDiff = NamedTuple("ZoneDiff", [("zone_name", str),
+                                   ("file_name", str),
+                                   ("diff", Optional[RecordSetDiff]),
+                                   ("not_comparable_reason", Optional[str])])
+"""
+Differences between two versions of the backup of a zone. diff is None when they
+can't be compared, and not_comparable_reason then tells why.
+"""
+
+
+def load_record_sets(file_path: str) -> List[dict]:
+    """
+    Load the record sets of a backup file.
+
+    :param file_path: path to a JSON backup or to a CloudFormation YAML template
+    :return: the record sets, as found in the backup file
+    """
+    with open(file_path, "r") as file:
+        if file_path.endswith(".json"):
+            return json.load(file)["ResourceRecordSets"]
+        template = yaml.load(file, Loader=YamlLoader)
+    return template["Resources"]["records"]["Properties"]["RecordSets"]
+
+
+def get_record_set_key(record_set: dict) -> RecordSetKey:
+    """
+    Provide the key that identifies a record set in a zone.
+
+    :param record_set: a record set, as found in a backup file
+    :return: the (Name, Type, SetIdentifier) triple
+    """
+    return record_set["Name"], record_set["Type"], record_set.get("SetIdentifier")
+
+
+def index_record_sets(record_sets: List[dict]) -> Dict[RecordSetKey, dict]:
+    """
+    Index record sets by (Name, Type, SetIdentifier).
+
+    :param record_sets: the record sets of a zone
+    :return: a dict of the record sets by key
+    :raise ValueError: if several record sets have the same key. For example, the
+    weighted record sets of a CloudFormation template, which has no SetIdentifier.
+    """
+    index = {}
+    for record_set in record_sets:
+        key = get_record_set_key(record_set)
+        if key in index:
+            raise ValueError("several record sets are identified by %s %s" % key[:2])
+        index[key] = record_set
+    return index
+
+
+def _get_comparable_record_set(record_set: dict) -> dict:
+    """The order of the values of a record set is not significant."""
+    resource_records = record_set.get("ResourceRecords")
+    if not resource_records:
+        return record_set
+    comparable_record_set = dict(record_set)
+    comparable_record_set["ResourceRecords"] = sorted(resource_records, key=json.dumps)
+    return comparable_record_set
+
+
+def diff_record_sets(old_record_sets: List[dict], new_record_sets: List[dict]) -> RecordSetDiff:
+    """
+    Compare two versions of the record sets of a zone.
+
+    :param old_record_sets: the record sets of the old backup
+    :param new_record_sets: the record sets of the new backup
+    :return: the added, removed and modified record sets
+    :raise ValueError: if several record sets of a version have the same key (see index_record_sets())
+    """
+    old_index = index_record_sets(old_record_sets)
+    new_index = index_record_sets(new_record_sets)
+    added = [record_set for key, record_set in new_index.items() if key not in old_index]
+    removed = [record_set for key, record_set in old_index.items() if key not in new_index]
+    modified = []
+    for key, new_record_set in new_index.items():
+        old_record_set = old_index.get(key)
+        if (old_record_set is not None
+                and _get_comparable_record_set(old_record_set) != _get_comparable_record_set(new_record_set)):
+            modified.append((old_record_set, new_record_set))
+    return RecordSetDiff(added, removed, modified)
+
+
+def get_backup_files(backup_dir: str) -> Dict[str, str]:
+    """
+    Find the backup files of a backup directory.
+
+    When a zone has been backed up in several formats, the JSON backup is used.
+
+    :param backup_dir: the directory where the backup files have been written
+    :return: a dict of the backup file names by zone name
+    """
+    backup_files = {}
+    for file_name in sorted(os.listdir(backup_dir)):
+        zone_name, _, extension = file_name.rpartition(".")
+        # Hidden files, like the manifest of the incremental backups, are not zone backups.
+        if extension not in BACKUP_FILE_EXTENSIONS or not zone_name or file_name.startswith("."):
+            continue
+        zone_name += "."
+        current_file_name = backup_files.get(zone_name)
+        if (current_file_name is None
+                or BACKUP_FILE_EXTENSIONS.index(extension) < BACKUP_FILE_EXTENSIONS.index(
+                    current_file_name.rpartition(".")[2])):
+            backup_files[zone_name] = file_name
+    return backup_files
+
+
+def _are_identical_files(old_file_path: str, new_file_path: str) -> bool:
+    return (os.path.getsize(old_file_path) == os.path.getsize(new_file_path)
+            and get_file_fingerprint(old_file_path) == get_file_fingerprint(new_file_path))
+
+
+def diff_backup_directories(old_backup_dir: str, new_backup_dir: str) -> Iterator[ZoneDiff]:
+    """
+    Compare two backups of the hosted zones.
+
+    Zones whose backup files are identical are skipped without being parsed.
+    A zone that exists in only one of the backups is reported as entirely added
+    or removed. The zones are compared in the same format in both backups. A zone
+    whose backups have no common format, or whose record sets can't be told apart,
+    is reported with no diff, and the other zones are still compared.
+
+    :param old_backup_dir: directory of the old backup
+    :param new_backup_dir: directory of the new backup
+    :return: an iterator over the differences of the zones that changed
+    """
+    old_backup_files = get_backup_files(old_backup_dir)
+    new_backup_files = get_backup_files(new_backup_dir)
+    for zone_name in sorted(set(old_backup_files) | set(new_backup_files)):
+        old_file_name = old_backup_files.get(zone_name)
+        new_file_name = new_backup_files.get(zone_name)
+        if old_file_name and new_file_name and old_file_name != new_file_name:
+            # The zone has been backed up in different formats: compare the YAML templates.
+            yaml_file_name = zone_name + "yml"
+            if not (os.path.isfile(os.path.join(old_backup_dir, yaml_file_name))
+                    and os.path.isfile(os.path.join(new_backup_dir, yaml_file_name))):
+                yield ZoneDiff(zone_name, "%s, %s" % (old_file_name, new_file_name), None,
+                               "the backups have no common format")
+                continue
+            old_file_name = new_file_name = yaml_file_name
+        old_file_path = os.path.join(old_backup_dir, old_file_name) if old_file_name else None
+        new_file_path = os.path.join(new_backup_dir, new_file_name) if new_file_name else None
+        if old_file_path and new_file_path and _are_identical_files(old_file_path, new_file_path):
+            continue
+        old_record_sets = load_record_sets(old_file_path) if old_file_path else []
+        new_record_sets = load_record_sets(new_file_path) if new_file_path else []
+        try:
+            diff = diff_record_sets(old_record_sets, new_record_sets)
+        except ValueError as exception:
+            yield ZoneDiff(zone_name, new_file_name or old_file_name, None, str(exception))
+            continue
+        if diff.added or diff.removed or diff.modified:
+            yield ZoneDiff(zone_name, new_file_name or old_file_name, diff, None)
@@ -0,0 +1,116 @@
+"""
+Manifest of the last Route 53 backups, used to make incremental backups.
+"""
+import hashlib
+import json
+import os
+import threading
+from typing import Iterable
+
+
+def get_file_fingerprint(file_path: str) -> str:
+    """
+    Compute the content hash of a file.
+
+    :param file_path: path to the file to hash
+    :return: the hexadecimal SHA-256 digest of the file content
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BackupManifest:
+    """
+    Keep track of the state of each hosted zone at the time of its last backup.
+
+    A zone is considered unchanged when its ResourceRecordSetCount (as returned by
+    list_hosted_zones) is the same as during the last backup, and when the files
+    written by the last backup are still on disk with the same content. Unchanged
+    zones can be skipped without listing their record sets.
+
+    Note that a modification of a record that does not change the number of record
+    sets of the zone can not be detected this way: run a full backup to pick it up.
+
+    The manifest file contains JSON in the form:
+
+    {
+        "<hosted zone id>": {
+            "zone_name": str,
+            "record_count": int,
+            "with_soa": bool,
+            "formats": [str],
+            "files": {
+                "<file path>": "<SHA-256 of the file>"
+            }
+        }
+    }
+
+    The update() and save() methods can be called from several threads.
+    """
+    def __init__(self, manifest_file_path: str):
+        """
+        :param manifest_file_path: path to the manifest file. It is created by
+        the save() method if it does not exist yet.
+        """
+        self.manifest_file_path = manifest_file_path
+        self._lock = threading.Lock()
+        self._zones = {}
+        if os.path.isfile(manifest_file_path):
+            with open(manifest_file_path, "r") as file:
+                self._zones = json.load(file)
+
+    def is_up_to_date(self, zone_id: str, record_count: int, with_soa: bool, formats: Iterable[str]) -> bool:
+        """
+        Tell whether or not a zone is unchanged since its last backup.
+
+        :param zone_id: ID of the hosted zone
+        :param record_count: the current ResourceRecordSetCount of the hosted zone
+        :param with_soa: whether or not SOA and NS records are included in the backup
+        :param formats: the formats of the backup files
+        :return: True if the files of the last backup are still valid
+        """
+        with self._lock:
+            zone_state = self._zones.get(zone_id)
+        if zone_state is None or record_count is None:
+            return False
+        if (zone_state["record_count"] != record_count or zone_state["with_soa"] != with_soa
+                or zone_state.get("formats") != sorted(formats)):
+            return False
+        for file_path, fingerprint in zone_state["files"].items():
+            if not os.path.isfile(file_path) or get_file_fingerprint(file_path) != fingerprint:
+                return False
+        return True
+
+    def update(self, zone_id: str, zone_name: str, record_count: int, with_soa: bool,
+               formats: Iterable[str], file_paths: Iterable[str]):
+        """
+        Record the state of a zone after its backup.
+
+        :param zone_id: ID of the hosted zone
+        :param zone_name: name of the hosted zone
+        :param record_count: the ResourceRecordSetCount of the hosted zone
+        :param with_soa: whether or not SOA and NS records are included in the backup
+        :param formats: the formats of the backup files
+        :param file_paths: paths of the files written by the backup
+        """
+        zone_state = {
+            "zone_name": zone_name,
+            "record_count": record_count,
+            "with_soa": with_soa,
+            "formats": sorted(formats),
+            "files": {file_path: get_file_fingerprint(file_path) for file_path in file_paths}
+        }
+        with self._lock:
+            self._zones[zone_id] = zone_state
+
+    def save(self):
+        """Write the manifest to disk, replacing the previous one atomically."""
+        tmp_file_path = self.manifest_file_path + ".tmp"
+        # The temporary file is shared by the threads: it is replaced while the lock is held.
+        with self._lock:
+            with open(tmp_file_path, "w") as file:
+                json.dump(self._zones, file, indent=2, sort_keys=True)
+            os.replace(tmp_file_path, self.manifest_file_path)
@@ -0,0 +1,282 @@
+"""
+The classes in this module write the backup files of the Route 53 hosted zones.
+
+The record sets of a zone are written page by page, as they are returned by the
+list_resource_record_sets endpoint, so that the memory used by a backup is bounded
+by the size of a page and not by the size of the zone.
+
+Several writers can be fed with the same pages, so that a zone is listed only once
+whatever the number of backup formats.
+"""
+import json
+import os
+from typing import List
+
+from webapis.awsapi.data_model import ResourceRecordSet
+from webapis.awsapi.serializers import dump_yaml
+from webapis.instrumentation import metrics
+
+
+def get_cloud_formation_template_dict(zone_name: str, zone_id: str, record_sets: object) -> dict:
+    """
+    Provide the CloudFormation template of a hosted zone.
+
+    :param zone_name: name of the hosted zone
+    :param zone_id: ID of the hosted zone
+    :param record_sets: the RecordSets of the template
+    :return: a dict that can be dumped as a CloudFormation YAML file
+    """
+    return {
+        "AWSTemplateFormatVersion": '2010-09-09',
+        "Description": "Backup definition for the " + zone_name + " zone",
+        "Resources": {
+            "zone": {
+                "Type": "AWS::Route53::HostedZone",
+                "Properties": {
+                    "Name": zone_name
+                }
+            },
+            "records": {
+                "DependsOn": "Zone",
+                "Type": "AWS::Route53::RecordSetGroup",
+                "Properties": {
+                    "HostedZoneName": zone_name,
+                    "Comment": "Zone record for " + zone_name + " HostedZoneId is " + zone_id,
+                    "RecordSets": record_sets
+                }
+            }
+        }
+    }
+
+
+def get_cloud_formation_record_set_dict(resource_record_set: ResourceRecordSet) -> dict:
+    """
+    Provide a dict representation of a resource record set that can
+    be used to dump a cloud formation formatted YAML file.
+
+    :return: a dict in the form:
+        {
+            "Name": str,
+            "Type": str,
+            "TTL": str,
+            "ResourceRecord": [str],
+            "AliasTarget": {
+                "DNSName": str,
+                "HostedZoneId": str
+            }
+        }
+    """
+    resource_record_values = [resource_record.value for resource_record in resource_record_set.resource_records]
+    resource_record_set_cloud_formation_dict = {
+        "Name": resource_record_set.name,
+        "Type": resource_record_set.type
+    }
+    if resource_record_set.ttl:
+        resource_record_set_cloud_formation_dict['TTL'] = resource_record_set.ttl
+    if resource_record_values:
+        resource_record_set_cloud_formation_dict['ResourceRecords'] = resource_record_values
+    if resource_record_set.alias_target:
+        resource_record_set_cloud_formation_dict['AliasTarget'] = {
+            "DNSName": resource_record_set.alias_target.dns_name,
+            "HostedZoneId": resource_record_set.alias_target.hosted_zone_id
+        }
+    return resource_record_set_cloud_formation_dict
+
+
+class BackupWriter:
+    """
+    Base class of the backup file writers.
+
+    The backup is written to a temporary file which replaces the target file when the
+    writer is closed. If no record set has been written, no file is created at all.
+
+    Subclasses provide the file extension and the serialization of the header, of the
+    pages of record sets and of the footer of the file. The serialization of the pages
+    is recorded in the serialize stage of the metrics, as route53.<file extension>.
+
+    Usage example:
+    ``
+    with CloudFormationTemplateWriter(output_file_path, zone_name, zone_id) as writer:
+        for page in pages:
+            writer.write(page_record_sets)
+    ``
+    """
+    file_extension = ""
+    """Extension of the backup files, appended to the zone name (which ends with a dot)"""
+
+    def __init__(self, output_file_path: str, zone_name: str, zone_id: str):
+        """
+        :param output_file_path: directory where the backup file will be created
+        :param zone_name: name of the hosted zone
+        :param zone_id: ID of the hosted zone
+        """
+        self.file_path = output_file_path + zone_name + self.file_extension
+        self.zone_name = zone_name
+        self.zone_id = zone_id
+        self.records_count = 0
+        self._tmp_file_path = self.file_path + ".part"
+        self._file = None
+
+    def __enter__(self) -> 'BackupWriter':
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def open(self):
+        """Open the temporary file and write the beginning of the backup."""
+        self._file = open(self._tmp_file_path, 'w+')
+        self._file.write(self.get_header())
+
+    def write(self, record_sets: List[ResourceRecordSet]):
+        """
+        Append record sets to the backup.
+
+        :param record_sets: the record sets of a page
+        """
+        if not record_sets:
+            return
+        with metrics.time("serialize", "route53." + self.file_extension):
+            serialized_record_sets = self.serialize(record_sets)
+        self._file.write(serialized_record_sets)
+        self.records_count += len(record_sets)
+
+    def close(self) -> bool:
+        """
+        Write the end of the backup and move it to its final location.
+
+        :return: True if the backup file has been created, False if there was
+        no record set to write.
+        """
+        if self.records_count == 0:
+            self.abort()
+            return False
+        self._file.write(self.get_footer())
+        self._file.close()
+        os.replace(self._tmp_file_path, self.file_path)
+        return True
+
+    def abort(self):
+        """Discard the temporary file."""
+        self._file.close()
+        os.remove(self._tmp_file_path)
+
+    def get_header(self) -> str:
+        """The beginning of the file, written before the first record set."""
+        return ""
+
+    def serialize(self, record_sets: List[ResourceRecordSet]) -> str:
+        """The serialization of a page of record sets."""
+        raise NotImplementedError()
+
+    def get_footer(self) -> str:
+        """The end of the file, written after the last record set."""
+        return ""
+
+
+class CloudFormationTemplateWriter(BackupWriter):
+    """
+    Stream the CloudFormation template of a hosted zone to a YAML file.
+
+    The produced file is byte-identical to the result of:
+    ``
+    dump_yaml(get_cloud_formation_template_dict(zone_name, zone_id, record_set_dicts), outfile,
+              explicit_start=True)
+    ``
+    """
+    file_extension = "yml"
+
+    _RECORD_SETS_PLACEHOLDER = "__RECORD_SETS__"
+    _RECORD_SETS_PATH = ("Resources", "records", "Properties", "RecordSets")
+
+    def __init__(self, output_file_path: str, zone_name: str, zone_id: str):
+        super().__init__(output_file_path, zone_name, zone_id)
+        template = dump_yaml(
+            get_cloud_formation_template_dict(self.zone_name, self.zone_id, self._RECORD_SETS_PLACEHOLDER),
+            explicit_start=True)
+        self._prefix, self._suffix = template.split(" " + self._RECORD_SETS_PLACEHOLDER + "\n", 1)
+
+    def get_header(self) -> str:
+        return self._prefix + "\n"
+
+    def serialize(self, record_sets: List[ResourceRecordSet]) -> str:
+        # The record sets are dumped at the same nesting level as in the full
+        # template, so that indentation and line folding are exactly the same.
+        nested_record_sets = [get_cloud_formation_record_set_dict(record_set) for record_set in record_sets]
+        for key in reversed(self._RECORD_SETS_PATH):
+            nested_record_sets = {key: nested_record_sets}
+        return dump_yaml(nested_record_sets).split("\n", len(self._RECORD_SETS_PATH))[-1]
+
+    def get_footer(self) -> str:
+        return self._suffix
+
+
+class BindZoneFileWriter(BackupWriter):
+    """
+    Write the record sets of a hosted zone in a BIND zone file.
+
+    Alias records have no equivalent in BIND: they are written as comments. The
+    routing policy of weighted, latency, failover and geolocation records is lost,
+    their SetIdentifier is written as a comment before their records.
+    """
+    file_extension = "zone"
+
+    def get_header(self) -> str:
+        return ("; Backup of the %s zone, HostedZoneId is %s\n"
+                "$ORIGIN %s\n") % (self.zone_name, self.zone_id, self.zone_name)
+
+    def serialize(self, record_sets: List[ResourceRecordSet]) -> str:
+        lines = []
+        for record_set in record_sets:
+            if record_set.set_identifier:
+                lines.append("; SetIdentifier: %s" % record_set.set_identifier)
+            alias_target = record_set.alias_target
+            if alias_target:
+                lines.append("; %s\tALIAS\t%s\t%s\t%s" % (record_set.name, record_set.type,
+                                                          alias_target.dns_name, alias_target.hosted_zone_id))
+            for resource_record in record_set.resource_records:
+                lines.append("%s\t%s\tIN\t%s\t%s" % (record_set.name, record_set.ttl,
+                                                     record_set.type, resource_record.value))
+        return "\n".join(lines) + "\n"
+
+
+class JsonRecordSetsWriter(BackupWriter):
+    """
+    Write the record sets of a hosted zone as compact JSON.
+
+    The record sets are written as returned by the API (see ResourceRecordSet.to_dict,
+    which keeps the fields that are not modelled), with sorted keys, one record set
+    per line, so that backups can easily be compared.
+
+    The file has the form:
+
+    {"HostedZoneId": str, "Name": str, "ResourceRecordSets": [
+    {"Name": str, "Type": str, ...},
+    ...
+    ]}
+    """
+    file_extension = "json"
+
+    def get_header(self) -> str:
+        return '{"HostedZoneId":%s,"Name":%s,"ResourceRecordSets":[' % (json.dumps(self.zone_id),
+                                                                          json.dumps(self.zone_name))
+
+    def serialize(self, record_sets: List[ResourceRecordSet]) -> str:
+        separator = ",\n" if self.records_count else "\n"
+        return separator + ",\n".join(json.dumps(record_set.to_dict(), separators=(",", ":"), sort_keys=True)
+                                      for record_set in record_sets)
+
+    def get_footer(self) -> str:
+        return "\n]}\n"
+
+
+BACKUP_WRITERS = {
+    "cloudformation": CloudFormationTemplateWriter,
+    "bind": BindZoneFileWriter,
+    "json": JsonRecordSetsWriter
+}
+"""The backup writer classes, by name of the backup format"""
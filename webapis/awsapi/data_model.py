@@ -1,5 +1,22 @@
-from webapis.common.data_model import GenericWrappingIterator
-from typing import NamedTuple
+from typing import NamedTuple, Tuple
+
+
+GeoLocation = NamedTuple("GeoLocation", [("continent_code", str), ("country_code", str),
+                                         ("subdivision_code", str)])
+"""Information about the location of the queries routed by a resource record set"""
+
+AliasTarget = NamedTuple("AliasTarget", [("hosted_zone_id", str), ("dns_name", str),
+                                         ("evaluate_target_health", bool)])
+"""Information about the AWS resource to which an alias resource record set routes traffic"""
+
+_MODELLED_FIELDS = {
+    'Name': None, 'Type': None, 'SetIdentifier': None, 'Weight': None, 'Region': None, 'Failover': None,
+    'MultiValueAnswer': None, 'TTL': None, 'HealthCheckId': None, 'TrafficPolicyInstanceId': None,
+    'ResourceRecords': frozenset(('Value',)),
+    'GeoLocation': frozenset(('ContinentCode', 'CountryCode', 'SubdivisionCode')),
+    'AliasTarget': frozenset(('HostedZoneId', 'DNSName', 'EvaluateTargetHealth'))
+}
+"""The fields of a resource record set stored in the slots of ResourceRecordSet, with the keys of their items"""
 
 
 class ResourceRecordSetList:
@@ -57,7 +74,8 @@ class ResourceRecordSetList:
         :param json_as_dict: a dictionary that represent the JSON response from the boto3 API
         """
         self.data = json_as_dict
-        self._items_iterator = GenericWrappingIterator(self.data.get("ResourceRecordSets", []), ResourceRecordSet)
+        self._resource_record_sets = tuple(ResourceRecordSet(resource_record_set)
+                                           for resource_record_set in self.data.get("ResourceRecordSets", ()))
 
     @property
     def is_truncated(self) -> bool:
@@ -85,14 +103,18 @@ class ResourceRecordSetList:
         return self.data.get('NextRecordIdentifier')
 
     @property
-    def resource_record_sets(self) -> GenericWrappingIterator:
-        """"""
-        return self._items_iterator
+    def resource_record_sets(self) -> Tuple['ResourceRecordSet', ...]:
+        """The resource record sets of this page. Each one is built once, when the page is wrapped."""
+        return self._resource_record_sets
 
 
 class ResourceRecordSet:
     """
-    Wrapper other an AWS Route53 resource record set.
+    Compact representation of an AWS Route53 resource record set.
+
+    The values of the JSON data are read once, when the record set is built, and
+    stored in slots: no dict is kept per record set, and no object is created when
+    the attributes are read.
 
     The JSON data has the form:
 
@@ -124,96 +146,107 @@ class ResourceRecordSet:
         'TrafficPolicyInstanceId': 'string'
     }
 
+    Attributes:
+
+    - name: the name of the domain on which you want t perform actions
+    - type: the type of the DNS record
+    - set_identifier: an identifier that differentiates among multiple resource record sets
+    that have the same combination of DNS name and type
+    - weight: the weight of a weighted resource record set
+    - region: the region in which is set the actual resource record set
+    - failover: PRIMARY or SECONDARY, for failover resource record sets
+    - multi_value_answer: whether or not this is a multivalue answer resource record set
+    - ttl: the lifetime of the Resource Record Cache
+    - resource_records: the ResourceRecord items of this ResourceRecordSet
+    - health_check_id: the ID of the health check of the resource record set
+    - traffic_policy_instance_id: the ID of the traffic policy instance record
+    - geo_location: a GeoLocation, information about the location of queries
+    - alias_target: an AliasTarget, information about an alias target
+    - other_fields: the fields of the JSON data that are not modelled by the other
+    attributes (fields added to the API since, or items with additional keys), as
+    they are in the JSON data. None if there are none, which is the usual case.
+
      API reference page:
      http://boto3.readthedocs.io/en/latest/reference/services/route53.html#Route53.Client.list_resource_record_sets
     """
-    def __init__(self, json_as_dict: dict):
-        self.data = json_as_dict
-        self._items_iterator = GenericWrappingIterator(self.data.get("ResourceRecords", []), ResourceRecord)
-
-    @property
-    def name(self) -> str:
-        """Indicate the name of the domain on which you want t perform actions"""
-        return self.data.get('Name')
+    __slots__ = ("name", "type", "set_identifier", "weight", "region", "failover", "multi_value_answer",
+                 "ttl", "resource_records", "health_check_id", "traffic_policy_instance_id",
+                 "geo_location", "alias_target", "other_fields")
 
-    @property
-    def type(self) -> str:
-        """Indicate the type of the DNS record"""
-        return self.data.get("Type")
-
-    @property
-    def set_identifier(self) -> str:
-        """ An identifier that differentiates among multiple resource record sets
-         that have the same combination of DNS name and type"""
-        return self.data.get('SetIdentifier')
-
-    @property
-    def weight(self) -> int:
-        return self.data.get('Weight')
-
-    @property
-    def region(self) -> str:
-        """Indicate the region in which is set the actual resource record set"""
-        return self.data.get('Region')
-
-    @property
-    def failover(self) -> str:
-        return self.data.get('Failover')
-
-    @property
-    def multi_value_answer(self) -> bool:
-        return self.data.get('MultiValueAnswer')
-
-    @property
-    def ttl(self) -> int:
-        """Indicate the lifetime of the Resource Record Cache"""
-        return self.data.get("TTL")
-
-    @property
-    def resource_records(self) -> GenericWrappingIterator:
+    def __init__(self, json_as_dict: dict):
         """
-        Iterator to iterate over ResourceRecords items of this ResourceRecordSet.
-
-        :rtype: GenericWrappingIterator of ResourceRecord
+        :param json_as_dict: a dictionary that represent a resource record set in the boto3 API response
         """
-        return self._items_iterator
-
-    @property
-    def health_check_id(self) -> str:
-        """Indicate if you want to check the integrity of a resource record set"""
-        return self.data.get('HealthCheckId')
-
-    @property
-    def traffic_policy_instance_id(self) -> str:
-        """Indicate the ID of the traffic policy instance record"""
-        return self.data.get('TrafficPolicyInstanceId')
-
-    @property
-    def geo_location(self) -> NamedTuple:
-        """An object that gives information about the location of queries"""
-        geo_location = self.data.get('GeoLocation')
+        get = json_as_dict.get
+        self.name = get('Name')
+        self.type = get('Type')
+        self.set_identifier = get('SetIdentifier')
+        self.weight = get('Weight')
+        self.region = get('Region')
+        self.failover = get('Failover')
+        self.multi_value_answer = get('MultiValueAnswer')
+        self.ttl = get('TTL')
+        self.resource_records = tuple(ResourceRecord(resource_record)
+                                      for resource_record in get('ResourceRecords', ()))
+        self.health_check_id = get('HealthCheckId')
+        self.traffic_policy_instance_id = get('TrafficPolicyInstanceId')
+        geo_location = get('GeoLocation')
+        self.geo_location = None
         if geo_location:
-            geo_location = NamedTuple("GeoLocation", [("continent_code", str), ("country_code", str),
-                                                      ("subdivision_code", str)])(
-                continent_code=geo_location.get('ContinentCode'),
-                country_code=geo_location.get('CountryCode'),
-                subdivision_code=geo_location.get('SubdivisionCode'))
-        return geo_location
-
-    @property
-    def alias_target(self) -> NamedTuple:
-        """An object that gives information about an alias target"""
-        alias_target = self.data.get('AliasTarget')
+            self.geo_location = GeoLocation(continent_code=geo_location.get('ContinentCode'),
+                                            country_code=geo_location.get('CountryCode'),
+                                            subdivision_code=geo_location.get('SubdivisionCode'))
+        alias_target = get('AliasTarget')
+        self.alias_target = None
         if alias_target:
-            alias_target = NamedTuple("GeoLocation", [("hosted_zone_id", str), ("dns_name", str)])(
-                hosted_zone_id=alias_target['HostedZoneId'],
-                dns_name=alias_target['DNSName'])
-        return alias_target
+            self.alias_target = AliasTarget(hosted_zone_id=alias_target['HostedZoneId'],
+                                            dns_name=alias_target['DNSName'],
+                                            evaluate_target_health=alias_target.get('EvaluateTargetHealth'))
+        self.other_fields = _get_other_fields(json_as_dict)
+
+    def to_dict(self) -> dict:
+        """
+        Provide the JSON data of this resource record set, in the form of the API response.
+
+        Only the keys that have a value are present in the returned dict. The fields
+        that are not modelled are returned as they were received (see other_fields).
+        """
+        json_as_dict = {
+            'Name': self.name,
+            'Type': self.type,
+            'SetIdentifier': self.set_identifier,
+            'Weight': self.weight,
+            'Region': self.region,
+            'Failover': self.failover,
+            'MultiValueAnswer': self.multi_value_answer,
+            'TTL': self.ttl,
+            'HealthCheckId': self.health_check_id,
+            'TrafficPolicyInstanceId': self.traffic_policy_instance_id
+        }
+        if self.resource_records:
+            json_as_dict['ResourceRecords'] = [{'Value': resource_record.value}
+                                               for resource_record in self.resource_records]
+        if self.geo_location:
+            json_as_dict['GeoLocation'] = {
+                'ContinentCode': self.geo_location.continent_code,
+                'CountryCode': self.geo_location.country_code,
+                'SubdivisionCode': self.geo_location.subdivision_code
+            }
+        if self.alias_target:
+            json_as_dict['AliasTarget'] = {
+                'HostedZoneId': self.alias_target.hosted_zone_id,
+                'DNSName': self.alias_target.dns_name,
+                'EvaluateTargetHealth': self.alias_target.evaluate_target_health
+            }
+        json_as_dict = _without_none_values(json_as_dict)
+        if self.other_fields:
+            json_as_dict.update(self.other_fields)
+        return json_as_dict
 
 
 class ResourceRecord:
     """
-    Wrapper other an AWS Route53 resource record.
+    Compact representation of an AWS Route53 resource record.
 
     The JSON data has the form:
 
@@ -221,13 +254,43 @@ class ResourceRecord:
         'Value': 'string'
     }
 
+    Attributes:
+
+    - value: the value of the Resource Record
+
      API reference page:
      http://boto3.readthedocs.io/en/latest/reference/services/route53.html#Route53.Client.list_resource_record_sets
     """
-    def __init__(self, json_as_dict):
-        self.data = json_as_dict
+    __slots__ = ("value",)
 
-    @property
-    def value(self) -> str:
-        """Give the value of the Resource Record"""
-        return self.data.get('Value')
+    def __init__(self, json_as_dict: dict):
+        self.value = json_as_dict.get('Value')
+
+
+def _get_other_fields(json_as_dict: dict) -> dict:
+    """
+    Gather the fields of a resource record set that would be lost by its slots: the
+    unknown fields, and the known ones whose items have unknown keys.
+
+    :param json_as_dict: a resource record set in the boto3 API response
+    :return: the fields, or None if all of them are modelled
+    """
+    other_fields = None
+    for key, value in json_as_dict.items():
+        if key in _MODELLED_FIELDS:
+            item_keys = _MODELLED_FIELDS[key]
+            if item_keys is None or not value:
+                continue
+            items = value if isinstance(value, list) else (value,)
+            if all(isinstance(item, dict) and item_keys.issuperset(item) for item in items):
+                continue
+        if other_fields is None:
+            other_fields = {}
+        other_fields[key] = value
+    return other_fields
+
+
+def _without_none_values(json_as_dict: dict) -> dict:
+    """Remove, recursively, the keys that have no value from a dict."""
+    return {key: _without_none_values(value) if isinstance(value, dict) else value
+            for key, value in json_as_dict.items() if value is not None}
@@ -0,0 +1,37 @@
+"""
+Serialization helpers for the Route 53 backup files.
+
+The YAML templates are dumped with the C-accelerated dumper of libyaml when PyYAML
+has been built with it, and with the pure-Python dumper otherwise. Both dumpers
+produce the same output for the data of the backups (str, int, list and dict).
+"""
+import yaml
+
+try:
+    from yaml import CSafeDumper as YamlDumper
+except ImportError:
+    from yaml import SafeDumper as YamlDumper
+
+
+YAML_WIDTH = 1000
+"""Maximum line width of the YAML files, long enough to never fold the record values"""
+
+
+def has_libyaml() -> bool:
+    """Tell whether or not the C-accelerated YAML dumper is used."""
+    return YamlDumper is not yaml.SafeDumper
+
+
+def dump_yaml(data: object, stream: object = None, explicit_start: bool = False,
+              dumper: type = YamlDumper) -> str:
+    """
+    Dump data as block-style YAML.
+
+    :param data: the data to dump
+    :param stream: a file-like object to write to. If None, the YAML is returned as a string.
+    :param explicit_start: whether or not to start the document with the '---' marker
+    :param dumper: the PyYAML dumper class to use. Defaults to the fastest available.
+    :return: the YAML string if no stream is provided, None otherwise
+    """
+    return yaml.dump(data, stream, Dumper=dumper, explicit_start=explicit_start,
+                     width=YAML_WIDTH, default_flow_style=False)
@@ -1,3 +1,14 @@
+import random
+import time
+from typing import Callable, Iterator
+
+import botocore.client
+import botocore.exceptions
+
+import settings
+from webapis.awsapi.data_model import ResourceRecordSetList
+from webapis.instrumentation import metrics, record_boto3_call_failure
+
 
 def update_type_counter_aws_resource_record_set(type_counter_aws_resource_record_set: dict, record_type: str) -> dict:
     value = type_counter_aws_resource_record_set.get(record_type)
@@ -6,3 +17,75 @@ def update_type_counter_aws_resource_record_set(type_counter_aws_resource_record
     else:
         type_counter_aws_resource_record_set[record_type] = 1
     return type_counter_aws_resource_record_set
+
+
+def call_with_backoff(api_call: Callable[..., dict], **kwargs) -> dict:
+    """
+    Call a boto3 client method, backing off when AWS throttles the request.
+
+    Route 53 limits the request rate per account and answers with a Throttling
+    or PriorRequestNotComplete error when the limit is reached. Those calls are
+    retried after an exponentially growing (and jittered) delay, as configured in
+    settings.awsapi["throttling"]. Any other error is raised immediately. The retries,
+    and the calls that failed without a response, are recorded in the metrics of the
+    call (see webapis.instrumentation).
+
+    Usage example:
+    ``
+    response = call_with_backoff(client.list_resource_record_sets, HostedZoneId=zone_id)
+    ``
+
+    :param api_call: the boto3 client method to call
+    :param kwargs: the parameters of the call
+    :return: the response of the API, as returned by boto3
+    """
+    throttling_settings = settings.awsapi["throttling"]
+    retries = 0
+    while True:
+        try:
+            return api_call(**kwargs)
+        except botocore.exceptions.ClientError as error:
+            error_code = error.response.get("Error", {}).get("Code")
+            if (error_code not in throttling_settings["error_codes"]
+                    or retries >= throttling_settings["max_retries"]):
+                raise
+            metrics.record_retries("aws", "%s.%s" % (api_call.__self__.meta.service_model.service_name,
+                                                     error.operation_name))
+        except Exception:
+            # A connection error or a timeout, after the retries of botocore.
+            record_boto3_call_failure()
+            raise
+        delay = min(throttling_settings["base_delay"] * 2 ** retries, throttling_settings["max_delay"])
+        time.sleep(random.uniform(delay / 2, delay))
+        retries += 1
+
+
+def iter_resource_record_set_pages(client: botocore.client.BaseClient,
+                                   zone_id: str) -> Iterator[ResourceRecordSetList]:
+    """
+    Iterate over the pages of the record sets of a hosted zone.
+
+    Each page is requested only when the previous one has been consumed, so that
+    a whole zone never has to be held in memory.
+
+    :param client: the boto3 Route 53 client
+    :param zone_id: ID of the hosted zone
+    :return: an iterator over the pages of the list_resource_record_sets endpoint
+    """
+    page = ResourceRecordSetList(call_with_backoff(client.list_resource_record_sets, HostedZoneId=zone_id))
+    while page is not None:
+        yield page
+        if page.is_truncated and page.next_record_name:
+            # The next page starts exactly at the next (name, type, identifier) triple,
+            # otherwise the other types of the current name would be listed again.
+            next_page_params = {
+                "HostedZoneId": zone_id,
+                "StartRecordName": page.next_record_name,
+                "StartRecordType": page.next_record_type
+            }
+            if page.next_record_identifier:
+                next_page_params["StartRecordIdentifier"] = page.next_record_identifier
+            page = ResourceRecordSetList(call_with_backoff(client.list_resource_record_sets,
+                                                           **next_page_params))
+        else:
+            page = None
@@ -2,11 +2,15 @@
 The classes in this module are common model used to represent the data
 manipulated in the various APIs.
 """
-from typing import TypeVar, List, Dict
+from collections.abc import Sequence
+from typing import Callable, Iterator, TypeVar, List, Dict, Union
 
 
 T = TypeVar("T")
-"""Used to type hint the GenericWrappingIterator class' methods"""
+"""Used to type hint the GenericWrappingIterator and WrappingSequence classes' methods"""
+
+_NOT_WRAPPED = object()
+"""Marks the items of a memoizing WrappingSequence that have not been wrapped yet"""
 
 
 class GenericWrappingIterator:
@@ -41,3 +45,76 @@ class GenericWrappingIterator:
     def __len__(self) -> int:
         """Used by the builtin len() function."""
         return len(self._items)
+
+
+class WrappingSequence(Sequence):
+    """
+    Read-only sequence view of the dict items of a list in an API response, each
+    item being wrapped when it is accessed.
+
+    Unlike GenericWrappingIterator, the view can be iterated several times and
+    sliced, and nothing is allocated before the first access. With memoize, each
+    item is wrapped at most once, and the same wrapper is returned by the following
+    accesses; otherwise a new wrapper is created by each access, and none is kept.
+
+    Usage example:
+    ``
+    web_properties = WrappingSequence(account_summary_dict.get("webProperties", []), WebProperty)
+    first_web_property = web_properties[0]
+    for web_property in web_properties[1:]:
+        ...
+    ``
+    """
+    __slots__ = ("_items", "_wrapper_class", "_memoize", "_wrapped_items")
+
+    def __init__(self, items: List[Dict], wrapper_class: Callable[[Dict], T], memoize: bool = False):
+        """
+        :param items: the (dict) items of the sequence
+        :param wrapper_class: the class used to wrap each item
+        :param memoize: whether or not the wrapped items are kept, to be returned by the following accesses
+        """
+        self._items = items
+        self._wrapper_class = wrapper_class
+        self._memoize = memoize
+        self._wrapped_items = None
+
+    def _get_wrapped_items(self) -> list:
+        """The wrapped items, _NOT_WRAPPED for the items not accessed yet. Allocated on first access."""
+        if self._wrapped_items is None:
+            self._wrapped_items = [_NOT_WRAPPED] * len(self._items)
+        return self._wrapped_items
+
+    def __iter__(self) -> Iterator[T]:
+        """Used in for..in loops to get a new iterator."""
+        if not self._memoize:
+            return map(self._wrapper_class, self._items)
+        return self._iter_memoized()
+
+    def _iter_memoized(self) -> Iterator[T]:
+        wrapped_items = self._get_wrapped_items()
+        for index, item in enumerate(self._items):
+            wrapped_item = wrapped_items[index]
+            if wrapped_item is _NOT_WRAPPED:
+                wrapped_item = wrapped_items[index] = self._wrapper_class(item)
+            yield wrapped_item
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[T, 'WrappingSequence']:
+        """[] operator. A slice is a new view over the sliced items."""
+        if isinstance(key, slice):
+            return WrappingSequence(self._items[key], self._wrapper_class, self._memoize)
+        if not self._memoize:
+            return self._wrapper_class(self._items[key])
+        wrapped_items = self._wrapped_items
+        if wrapped_items is None:
+            wrapped_items = self._get_wrapped_items()
+        wrapped_item = wrapped_items[key]
+        if wrapped_item is _NOT_WRAPPED:
+            wrapped_item = wrapped_items[key] = self._wrapper_class(self._items[key])
+        return wrapped_item
+
+    def __len__(self) -> int:
+        """Used by the builtin len() function."""
+        return len(self._items)
+
+    def __repr__(self) -> str:
+        return "WrappingSequence(%d %s)" % (len(self._items), getattr(self._wrapper_class, "__name__", "items"))
@@ -0,0 +1,88 @@
+"""
+Incremental decoding of the items of a JSON array, from a response body read by chunks.
+
+Only one item at a time is decoded, so that the memory used does not depend on the
+size of the array.
+"""
+import codecs
+import json
+import re
+from typing import Any, Iterable, Iterator, Union
+
+_WHITESPACES = " \t\n\r"
+
+
+def iter_json_array_items(chunks: Iterable[Union[bytes, str]], array_key: str,
+                          encoding: str = "utf-8") -> Iterator[Any]:
+    """
+    Decode the items of the array found under a given key in a JSON document.
+
+    The first occurrence of "<array_key>": [ in the document is used, whatever
+    its nesting level. The rest of the document is not read once the array has been
+    decoded.
+
+    Usage example:
+    ``
+    response = session.get(url, stream=True)
+    for monitor in iter_json_array_items(response.iter_content(65536), "monitors"):
+        ...
+    ``
+
+    :param chunks: the document, in consecutive chunks of bytes or str
+    :param array_key: the key of the array to decode
+    :param encoding: encoding of the document, if the chunks are bytes
+    :return: an iterator over the decoded items
+    :raise ValueError: if the document has no such array or if the array is not valid JSON
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder(encoding)()
+    array_start = re.compile(r'"%s"\s*:\s*\[' % re.escape(array_key))
+    buffer = ""
+    position = None
+    """Position of the next item in the buffer, None until the beginning of the array is found"""
+    chunks = iter(chunks)
+    end_of_document = False
+    while True:
+        chunk = next(chunks, None)
+        if chunk is None:
+            end_of_document = True
+            chunk = text_decoder.decode(b"", final=True)
+        elif isinstance(chunk, bytes):
+            chunk = text_decoder.decode(chunk)
+        buffer += chunk
+
+        if position is None:
+            match = array_start.search(buffer)
+            if match is None:
+                if end_of_document:
+                    raise ValueError("No %s array found in the JSON document" % array_key)
+                # Keep the end of the buffer: the key may be split between two chunks.
+                buffer = buffer[-(len(array_key) + 64):]
+                continue
+            position = match.end()
+
+        while True:
+            while position < len(buffer) and buffer[position] in _WHITESPACES + ",":
+                position += 1
+            if position == len(buffer):
+                break
+            if buffer[position] == "]":
+                return
+            try:
+                item, item_end = decoder.raw_decode(buffer, position)
+            except ValueError:
+                if end_of_document:
+                    raise
+                break
+            if item_end == len(buffer) or buffer[item_end] not in _WHITESPACES + ",]":
+                # A number may continue in the next chunk: 1.5e3 would be decoded as 1.
+                if end_of_document:
+                    raise ValueError("Invalid item in the %s array at position %d" % (array_key, position))
+                break
+            position = item_end
+            yield item
+        buffer = buffer[position:]
+        position = 0
+
+        if end_of_document:
+            raise ValueError("The %s array is not terminated" % array_key)
@@ -6,7 +6,7 @@ allow a better understanding of the data used in the scripts.
 
 API reference page: https://developers.google.com/analytics/devguides/config/mgmt/v3/mgmtReference/
 """
-from webapis.common.data_model import GenericWrappingIterator
+from webapis.common.data_model import WrappingSequence
 
 
 class AccountSummaryList:
@@ -64,7 +64,7 @@ class AccountSummaryList:
         :param json_as_dict: a dictionary that represent the JSON response from the Google API
         """
         self.data = json_as_dict
-        self._items_iterator = GenericWrappingIterator(self.data.get("items", []), AccountSummary)
+        self._items = None
 
     @property
     def kind(self) -> str:
@@ -109,13 +109,15 @@ class AccountSummaryList:
         return self.data.get("nextLink")
 
     @property
-    def items(self) -> GenericWrappingIterator:
+    def items(self) -> WrappingSequence:
         """
-        Iterator to iterate over AccountSummary items of this AccountSummaryList.
+        Sequence of the AccountSummary items of this AccountSummaryList.
 
-        :rtype: GenericWrappingIterator of AccountSummary
+        :rtype: WrappingSequence of AccountSummary
         """
-        return self._items_iterator
+        if self._items is None:
+            self._items = WrappingSequence(self.data.get("items", []), AccountSummary)
+        return self._items
 
 
 class AccountSummary:
@@ -133,7 +135,7 @@ class AccountSummary:
         :param json_as_dict: a dictionary that represent the JSON response from the Google API
         """
         self.data = json_as_dict
-        self._items_iterator = GenericWrappingIterator(self.data.get("webProperties", []), WebProperty)
+        self._web_properties = None
 
     @property
     def id(self) -> str:
@@ -151,13 +153,15 @@ class AccountSummary:
         return self.data.get("name")
 
     @property
-    def web_properties(self) -> GenericWrappingIterator:
+    def web_properties(self) -> WrappingSequence:
         """
-        Iterator to iterate over WebProperty items of this AccountSummary.
+        Sequence of the WebProperty items of this AccountSummary.
 
-        :rtype: GenericWrappingIterator of WebProperty
+        :rtype: WrappingSequence of WebProperty
         """
-        return self._items_iterator
+        if self._web_properties is None:
+            self._web_properties = WrappingSequence(self.data.get("webProperties", []), WebProperty)
+        return self._web_properties
 
 
 class WebProperty:
@@ -174,7 +178,7 @@ class WebProperty:
         :param json_as_dict: a dictionary that represent the JSON response from the Google API
         """
         self.data = json_as_dict
-        self._profile_iterator = GenericWrappingIterator(self.data.get("profiles", []), Profile)
+        self._profiles = None
 
     @property
     def kind(self) -> str:
@@ -207,13 +211,15 @@ class WebProperty:
         return self.data.get("websiteUrl")
 
     @property
-    def profiles(self) -> GenericWrappingIterator:
+    def profiles(self) -> WrappingSequence:
         """
-        Iterator to iterate over Profile items of this WebProperty.
+        Sequence of the Profile items of this WebProperty.
 
-        :rtype: GenericWrappingIterator of Profile
+        :rtype: WrappingSequence of Profile
         """
-        return self._profile_iterator
+        if self._profiles is None:
+            self._profiles = WrappingSequence(self.data.get("profiles", []), Profile)
+        return self._profiles
 
 
 class Profile:
@@ -250,3 +256,172 @@ class Profile:
     def type(self) -> str:
         """View (Profile) type. Supported types: WEB or APP."""
         return self.data.get("type")
+
+
+class ManagementList:
+    """
+    This class represent a page of the result of a call to one of the list endpoints
+    of the Management API (webproperties/list, profiles/list...).
+
+    Each of this class' properties exactly maps to one of the JSON from the API response.
+
+    The JSON response has the following structure:
+
+    {
+      "kind": string,
+      "username": string,
+      "totalResults": integer,
+      "startIndex": integer,
+      "itemsPerPage": integer,
+      "previousLink": string,
+      "nextLink": string,
+      "items": [
+        ...
+      ]
+    }
+    """
+    item_class = dict
+    """The class used to wrap the items of the list"""
+
+    def __init__(self, json_as_dict: dict):
+        """
+        :param json_as_dict: a dictionary that represent the JSON response from the Google API
+        """
+        self.data = json_as_dict
+        self._items = None
+
+    @property
+    def kind(self) -> str:
+        """Collection type."""
+        return self.data.get("kind")
+
+    @property
+    def total_results(self) -> int:
+        """The total number of results for the query, regardless of the number of results in the response."""
+        return self.data.get("totalResults")
+
+    @property
+    def start_index(self) -> int:
+        """
+        The starting index of the resources, which is 1 by default or otherwise
+        specified by the start-index query parameter.
+        """
+        return self.data.get("startIndex")
+
+    @property
+    def items_per_page(self) -> int:
+        """The maximum number of resources the response can contain."""
+        return self.data.get("itemsPerPage")
+
+    @property
+    def next_link(self) -> str:
+        """Link to next page for this collection."""
+        return self.data.get("nextLink")
+
+    @property
+    def items(self) -> WrappingSequence:
+        """
+        Sequence of the items of this page.
+
+        :rtype: WrappingSequence of item_class
+        """
+        if self._items is None:
+            self._items = WrappingSequence(self.data.get("items", []), self.item_class)
+        return self._items
+
+
+class WebPropertyDetails:
+    """
+    This class represent a web property as returned by the /management/webproperties endpoint.
+
+    Each of this class' properties exactly maps to one of the JSON from the API response.
+
+    API reference page:
+    https://developers.google.com/analytics/devguides/config/mgmt/v3/mgmtReference/management/webproperties
+    """
+    def __init__(self, json_as_dict: dict):
+        """
+        :param json_as_dict: a dictionary that represent the JSON response from the Google API
+        """
+        self.data = json_as_dict
+
+    @property
+    def id(self) -> str:
+        """Web property ID of the form UA-XXXXX-YY."""
+        return self.data.get("id")
+
+    @property
+    def name(self) -> str:
+        """Name of this web property."""
+        return self.data.get("name")
+
+    @property
+    def website_url(self) -> str:
+        """Website url for this web property."""
+        return self.data.get("websiteUrl")
+
+    @property
+    def industry_vertical(self) -> str:
+        """The industry vertical/category selected for this web property."""
+        return self.data.get("industryVertical")
+
+    @property
+    def default_profile_id(self) -> str:
+        """Default view (profile) ID."""
+        return self.data.get("defaultProfileId")
+
+    @property
+    def profile_count(self) -> int:
+        """View (Profile) count for this web property."""
+        return self.data.get("profileCount")
+
+
+class ProfileDetails:
+    """
+    This class represent a view (profile) as returned by the /management/profiles endpoint.
+
+    Each of this class' properties exactly maps to one of the JSON from the API response.
+
+    API reference page:
+    https://developers.google.com/analytics/devguides/config/mgmt/v3/mgmtReference/management/profiles
+    """
+    def __init__(self, json_as_dict: dict):
+        """
+        :param json_as_dict: a dictionary that represent the JSON response from the Google API
+        """
+        self.data = json_as_dict
+
+    @property
+    def id(self) -> str:
+        """View (Profile) ID."""
+        return self.data.get("id")
+
+    @property
+    def web_property_id(self) -> str:
+        """Web property ID of the form UA-XXXXX-YY to which this view (profile) belongs."""
+        return self.data.get("webPropertyId")
+
+    @property
+    def name(self) -> str:
+        """Name of this view (profile)."""
+        return self.data.get("name")
+
+    @property
+    def website_url(self) -> str:
+        """Website URL for this view (profile)."""
+        return self.data.get("websiteUrl")
+
+    @property
+    def timezone(self) -> str:
+        """Time zone for which this view (profile) has been configured."""
+        return self.data.get("timezone")
+
+
+class WebPropertyList(ManagementList):
+    """A page of the result of a call to the /management/webproperties/list endpoint."""
+    item_class = WebPropertyDetails
+
+
+class ProfileList(ManagementList):
+    """A page of the result of a call to the /management/profiles/list endpoint."""
+    item_class = ProfileDetails
@@ -0,0 +1,84 @@
+"""
+Paginated calls to the Management API of Google Analytics.
+
+The list endpoints of the Management API return at most max-results items per call,
+and a nextLink to the following page, which holds the start-index of that page.
+
+API reference page: https://developers.google.com/analytics/devguides/config/mgmt/v3/pagination
+"""
+from typing import Callable, Iterator, List, NamedTuple
+
+import googleapiclient.discovery
+import httplib2
+
+import settings
+from webapis.googleapi.analyticss.data_model import (AccountSummary, AccountSummaryList, ProfileDetails,
+                                                     ProfileList, WebPropertyDetails, WebPropertyList)
+from webapis.googleapi.pagination import PageIterator, get_next_link_params
+
+
+AccountDetails = NamedTuple("AccountDetails", [("web_properties", List[WebPropertyDetails]),
+                                               ("profiles", List[ProfileDetails])])
+"""The web properties and the views (profiles) of an account"""
+
+
+def get_page_iterator(list_method: Callable, page_class: Callable,
+                      max_results: int = settings.googleapi["analytics"]["max_results"],
+                      http: httplib2.Http = None, **kwargs) -> PageIterator:
+    """
+    Iterate over the pages of a list endpoint of the Management API, following their nextLink.
+
+    Usage example:
+    ``
+    for page in get_page_iterator(api_analytics.management().webproperties().list, WebPropertyList,
+                                  accountId="123456"):
+        ...
+    ``
+
+    :param list_method: the list method of a collection of the service
+    :param page_class: the model class used to wrap the pages
+    :param max_results: maximum number of items per page (at most 1000)
+    :param http: the authorized http object used to execute the requests.
+    Defaults to the one of the service.
+    :param kwargs: the other parameters of the list method
+    :return: a lazy iterator over the pages
+    """
+    return PageIterator(list_method, page_class, get_next_link_params, http=http,
+                        num_retries=settings.googleapi["analytics"]["num_retries"],
+                        max_results=max_results, start_index=1, **kwargs)
+
+
+def iter_account_summaries(api_analytics: googleapiclient.discovery.Resource,
+                           max_results: int = settings.googleapi["analytics"]["max_results"]
+                           ) -> Iterator[AccountSummary]:
+    """
+    List all the account summaries, page by page. The next page is requested
+    while the current one is consumed.
+
+    :param api_analytics: the Google Analytics service
+    :param max_results: maximum number of accounts per page (at most 1000)
+    :return: an iterator over the account summaries of all the pages
+    """
+    return get_page_iterator(api_analytics.management().accountSummaries().list, AccountSummaryList,
+                             max_results).items("items")
+
+
+def get_account_details(api_analytics: googleapiclient.discovery.Resource, account_id: str,
+                        http: httplib2.Http = None,
+                        max_results: int = settings.googleapi["analytics"]["max_results"]) -> AccountDetails:
+    """
+    Get the details of the web properties and views (profiles) of an account.
+
+    :param api_analytics: the Google Analytics service
+    :param account_id: ID of the account
+    :param http: the authorized http object used to execute the requests. Must be
+    specific to the current thread if this function is called from several threads.
+    :param max_results: maximum number of items per page (at most 1000)
+    :return: the web properties and the views (profiles) of the account
+    """
+    management = api_analytics.management()
+    web_properties = list(get_page_iterator(management.webproperties().list, WebPropertyList, max_results, http,
+                                            accountId=account_id).items("items"))
+    profiles = list(get_page_iterator(management.profiles().list, ProfileList, max_results, http,
+                                      accountId=account_id, webPropertyId="~all").items("items"))
+    return AccountDetails(web_properties, profiles)
@@ -0,0 +1,205 @@
+"""
+Loading and grouping of the Google Analytics properties dumped by google_analytics_dump_property_list.py.
+
+The CSV file has one row per property, with the columns:
+Account Id, Account, Properties Id, Properties, Without URL
+
+The file is parsed once into a PropertyTable, which holds one tuple per column. The
+account names and IDs, repeated on the rows of all the properties of an account, are
+interned so that each of them is held only once in memory. The table is cached in a
+binary file next to the CSV file, so that the following runs of the scripts do not
+parse the CSV file again as long as it is unchanged.
+"""
+import csv
+import os
+import pickle
+import sys
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Tuple
+
+CACHE_FORMAT_VERSION = 1
+"""Version of the content of the cache files. Caches of another version are ignored."""
+
+PropertyRow = NamedTuple("PropertyRow", [("account_id", str),
+                                         ("account", str),
+                                         ("property_id", str),
+                                         ("url", str),
+                                         ("domain_name", str)])
+"""A row of the CSV file"""
+
+
+class PropertyTable:
+    """
+    The Analytics properties of a CSV file, stored by column.
+
+    The columns are tuples with one item per row of the file:
+     - account_ids: the "Account Id" column
+     - accounts: the "Account" column
+     - property_ids: the "Properties Id" column
+     - urls: the "Properties" column
+     - domain_names: the "Without URL" column
+
+    Usage example:
+    ``
+    table = load_property_table("etc/dump/GA_property_list.csv")
+    for account, url in zip(table.accounts, table.urls):
+        ...
+    ``
+    """
+    __slots__ = ("account_ids", "accounts", "property_ids", "urls", "domain_names")
+
+    def __init__(self, account_ids: Tuple[str, ...], accounts: Tuple[str, ...], property_ids: Tuple[str, ...],
+                 urls: Tuple[str, ...], domain_names: Tuple[str, ...]):
+        self.account_ids = account_ids
+        self.accounts = accounts
+        self.property_ids = property_ids
+        self.urls = urls
+        self.domain_names = domain_names
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[dict]) -> 'PropertyTable':
+        """
+        Build a table from the rows of a CSV file.
+
+        :param rows: the rows of the CSV file, as returned by csv.DictReader
+        :return: the table
+        """
+        columns = ([], [], [], [], [])
+        account_ids, accounts, property_ids, urls, domain_names = columns
+        for row in rows:
+            account_ids.append(sys.intern(row.get("Account Id") or ""))
+            accounts.append(sys.intern(row.get("Account") or ""))
+            property_ids.append(row.get("Properties Id") or "")
+            urls.append(row.get("Properties") or "")
+            domain_names.append(row.get("Without URL") or "")
+        return cls(*(tuple(column) for column in columns))
+
+    @classmethod
+    def from_records(cls, records: Iterable[PropertyRow]) -> 'PropertyTable':
+        """
+        Build a table from properties fetched from the API, without a CSV file.
+
+        :param records: the properties, with the values of the columns in the order of PropertyRow
+        :return: the table
+        """
+        columns = ([], [], [], [], [])
+        account_ids, accounts, property_ids, urls, domain_names = columns
+        for account_id, account, property_id, url, domain_name in records:
+            account_ids.append(sys.intern(account_id))
+            accounts.append(sys.intern(account))
+            property_ids.append(property_id)
+            urls.append(url)
+            domain_names.append(domain_name)
+        return cls(*(tuple(column) for column in columns))
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def rows(self) -> Iterator[PropertyRow]:
+        """
+        :return: an iterator over the rows of the table
+        """
+        return map(PropertyRow._make, zip(self.account_ids, self.accounts, self.property_ids,
+                                          self.urls, self.domain_names))
+
+    def group_by_account(self, column: str = "urls") -> Dict[str, List[str]]:
+        """
+        Gather the values of a column by account name (see group_by_account()).
+
+        :param column: name of the attribute of the column to gather
+        :return: a dict of the lists of unique, non empty values by account name
+        """
+        return _group_values(zip(self.accounts, getattr(self, column)))
+
+    def __getstate__(self) -> tuple:
+        return tuple(getattr(self, column) for column in self.__slots__)
+
+    def __setstate__(self, state: tuple):
+        for column, values in zip(self.__slots__, state):
+            setattr(self, column, values)
+
+
+def group_by_account(rows: Iterable[dict], account_column: str = "Account",
+                     value_column: str = "Properties") -> Dict[str, List[str]]:
+    """
+    Gather the values of a column by account, in linear time.
+
+    Empty values are ignored, and each value appears only once per account,
+    at the position of its first occurrence.
+
+    :param rows: the rows of the CSV file, as returned by csv.DictReader
+    :param account_column: the column used to group the rows
+    :param value_column: the column whose values are gathered
+    :return: a dict of the lists of values by account, in the order of the rows
+    """
+    return _group_values((row[account_column], row[value_column]) for row in rows)
+
+
+def _group_values(account_values: Iterable[Tuple[str, str]]) -> Dict[str, List[str]]:
+    groups = {}
+    for account, value in account_values:
+        if value != '':
+            # The keys of a dict are used as an ordered set.
+            groups.setdefault(account, {})[value] = None
+    return {account: list(values) for account, values in groups.items()}
+
+
+def get_cache_file_path(csv_file_path: str) -> str:
+    """
+    :param csv_file_path: path to a CSV file of Analytics properties
+    :return: the path of the binary cache of the file, a hidden file in the same directory
+    """
+    directory, file_name = os.path.split(os.path.abspath(csv_file_path))
+    return os.path.join(directory, "." + file_name + ".cache")
+
+
+def load_property_table(csv_file_path: str, use_cache: bool = True) -> PropertyTable:
+    """
+    Load a CSV file of Analytics properties.
+
+    The table is read from the cache file if it has been written for the current
+    version of the CSV file (same modification time and size), and the cache file
+    is written otherwise. The cache is a pickle file: like the CSV file, it must only
+    be writable by trusted users.
+
+    :param csv_file_path: path to the CSV file where Google Analytics
+    Properties have previously been dumped.
+    :param use_cache: whether or not the cache file is read and written
+    :return: the properties of the file
+    """
+    csv_file_stat = os.stat(csv_file_path)
+    cache_key = (CACHE_FORMAT_VERSION, csv_file_stat.st_mtime_ns, csv_file_stat.st_size)
+    cache_file_path = get_cache_file_path(csv_file_path)
+    if use_cache and os.path.isfile(cache_file_path):
+        try:
+            with open(cache_file_path, "rb") as cache_file:
+                cached_key, table = pickle.load(cache_file)
+            if cached_key == cache_key and isinstance(table, PropertyTable):
+                return table
+        except (OSError, EOFError, ValueError, TypeError, pickle.UnpicklingError):
+            # An unreadable cache only costs a new parsing of the CSV file.
+            pass
+
+    with open(csv_file_path, "r", newline='') as csv_file:
+        table = PropertyTable.from_rows(csv.DictReader(csv_file))
+    if use_cache:
+        tmp_file_path = cache_file_path + ".tmp"
+        try:
+            with open(tmp_file_path, "wb") as cache_file:
+                pickle.dump((cache_key, table), cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file_path, cache_file_path)
+        except OSError:
+            # The CSV directory may be read-only: the cache is optional.
+            pass
+    return table
+
+
+def load_properties_by_account(csv_file_path: str, column: str = "urls") -> Dict[str, List[str]]:
+    """
+    Load a CSV file of Analytics properties, grouped by account.
+
+    :param csv_file_path: path to the CSV file where Google Analytics
+    Properties have previously been dumped.
+    :param column: name of the attribute of the PropertyTable column to gather, the property URLs by default
+    :return: a dict of the lists of unique values by account name
+    """
+    return load_property_table(csv_file_path).group_by_account(column)
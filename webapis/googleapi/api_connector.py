@@ -17,12 +17,32 @@
 import httplib2
 import os
 import argparse
+import threading
+import time
 import googleapiclient.discovery
+import googleapiclient.errors
+import googleapiclient.http
 from typing import List
 from oauth2client import client
 from oauth2client import file
 from oauth2client import tools
 
+import settings
+from webapis.googleapi.discovery_cache import FileDiscoveryCache, get_discovery_document_path
+from webapis.instrumentation import metrics
+
+discovery_argparser = argparse.ArgumentParser(add_help=False)
+"""Parent parser of the options of the discovery documents, to pass to the parsers of the scripts"""
+discovery_argparser.add_argument('--discovery-documents',
+                                 dest="discovery_documents",
+                                 help='directory of the vendored discovery documents, named '
+                                      '<api_name>.<api_version>.json. The services are then built '
+                                      'offline, without downloading the documents.')
+
+_credentials_cache = {}
+_services_cache = {}
+_cache_lock = threading.Lock()
+
 
 def create_oauth_flow(client_secrets_path: str, scope: List[str]) -> client.Flow:
     """
@@ -33,38 +53,206 @@ def create_oauth_flow(client_secrets_path: str, scope: List[str]) -> client.Flow
                                           message=tools.message_if_missing(client_secrets_path))
 
 
-def get_authorized_http_object(credentials_base_path: str, api_name: str,
-                               flow: client.Flow, flags: argparse.Namespace) -> httplib2.Http:
+def get_stored_credentials(credentials_base_path: str, api_name: str,
+                           flow: client.Flow, flags: argparse.Namespace) -> client.Credentials:
     """
-    Create an OAuth authorized http object.
+    Load the OAuth credentials of an API, or run the OAuth flow if there are none yet.
 
     :param credentials_base_path: directory where the credentials file will be created.
     :param api_name: name of the api. It will be used as the name of the credentials file
     :param flow: the OAuth flow object to use to create credentials
     :param flags: parsed CLI args (including google api args)
-    :return: authorize http object
+    :return: the credentials
     """
     storage = file.Storage(credentials_base_path + api_name + '.dat')
     credentials = storage.get()
     if credentials is None or credentials.invalid:
         credentials = tools.run_flow(flow, storage, flags=flags)
+    return credentials
+
+
+def get_authorized_http_object(credentials_base_path: str, api_name: str,
+                               flow: client.Flow, flags: argparse.Namespace) -> httplib2.Http:
+    """
+    Create an OAuth authorized http object.
+
+    :param credentials_base_path: directory where the credentials file will be created.
+    :param api_name: name of the api. It will be used as the name of the credentials file
+    :param flow: the OAuth flow object to use to create credentials
+    :param flags: parsed CLI args (including google api args)
+    :return: authorize http object
+    """
+    return new_authorized_http(get_stored_credentials(credentials_base_path, api_name, flow, flags))
+
+
+def new_authorized_http(credentials: client.Credentials) -> httplib2.Http:
+    """
+    Create a new OAuth authorized http object.
+
+    httplib2.Http objects are not thread-safe: each thread must use its own.
+
+    :param credentials: the credentials used to authorize the requests
+    :return: authorize http object
+    """
     return credentials.authorize(http=httplib2.Http())
 
 
+class ThreadLocalHttp:
+    """
+    Provide an authorized http object per thread, to execute the requests of a
+    service from a pool of threads.
+
+    Usage example:
+    ``
+    thread_local_http = ThreadLocalHttp(get_credentials(...))
+    # in each thread:
+    request.execute(http=thread_local_http.get())
+    ``
+    """
+    def __init__(self, credentials: client.Credentials):
+        """
+        :param credentials: the credentials used to authorize the requests
+        """
+        self.credentials = credentials
+        self._local = threading.local()
+
+    def get(self) -> httplib2.Http:
+        """
+        :return: the authorized http object of the current thread
+        """
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = self._local.http = new_authorized_http(self.credentials)
+        return http
+
+
+def get_credentials(api_name: str, scope: List[str], client_secrets_path: str,
+                    flags: argparse.Namespace) -> client.Credentials:
+    """
+    Get the OAuth credentials to use to connect to a Google API.
+
+    The credentials are loaded once per process for given API, scopes and client secrets.
+
+    :param api_name: The name of the api to connect to.
+    :param scope: A list of strings representing the auth
+    scopes to authorize for the connection.
+    :param client_secrets_path: A path to a valid client secrets file.
+    :param flags: parsed CLI args (including google api args)
+    :return: the credentials
+    """
+    client_secrets_path = os.path.abspath(client_secrets_path)
+    cache_key = (api_name, tuple(scope), client_secrets_path)
+    with _cache_lock:
+        credentials = _credentials_cache.get(cache_key)
+        if credentials is None:
+            credentials_base_path = os.path.dirname(client_secrets_path) + "/"
+            flow = create_oauth_flow(client_secrets_path, scope)
+            credentials = get_stored_credentials(credentials_base_path, api_name, flow, flags)
+            _credentials_cache[cache_key] = credentials
+    return credentials
+
+
+class InstrumentedHttpRequest(googleapiclient.http.HttpRequest):
+    """
+    A request that records its executions in the registry of the process (see
+    webapis.instrumentation), under the API googleapi and the ID of its method, for
+    example analytics.management.accountSummaries.list.
+
+    The retries of execute(num_retries=...) are counted, and the decoding of the
+    responses is recorded in the parse stage, including for the calls sent in batch
+    requests (which are not recorded as calls: see batch.BatchExecutor).
+
+    The services built by build_service() create their requests with this class.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._retries_count = 0
+        self._bytes_received = 0
+        decode_response = self.postproc
+        sleep = self._sleep
+
+        def postproc(response: httplib2.Response, content: bytes) -> object:
+            self._bytes_received = len(content or b"")
+            with metrics.time("parse", self.methodId):
+                return decode_response(response, content)
+
+        def sleep_before_retry(seconds: float):
+            self._retries_count += 1
+            sleep(seconds)
+
+        self.postproc = postproc
+        self._sleep = sleep_before_retry
+
+    def execute(self, http: httplib2.Http = None, num_retries: int = 0) -> object:
+        self._retries_count = 0
+        self._bytes_received = 0
+        start = time.perf_counter()
+        failed = True
+        try:
+            response = super().execute(http=http, num_retries=num_retries)
+            failed = False
+            return response
+        except googleapiclient.errors.HttpError as error:
+            self._bytes_received = len(error.content or b"")
+            raise
+        finally:
+            metrics.record_call("googleapi", self.methodId, time.perf_counter() - start, failed,
+                                len(self.body or ""), self._bytes_received, self._retries_count)
+
+
+def build_service(api_name: str, api_version: str, credentials: client.Credentials,
+                  documents_directory: str = None) -> googleapiclient.discovery.Resource:
+    """
+    Build a service that communicates to a Google API with given credentials.
+
+    The discovery document of the API is read from documents_directory if it is given,
+    without any network access. Otherwise it is downloaded, and kept in the discovery
+    cache configured in settings.googleapi["discovery"]. The requests of the service are
+    instrumented (see InstrumentedHttpRequest).
+
+    :param api_name: The name of the api to connect to.
+    :param api_version: The api version to connect to.
+    :param credentials: the credentials used to authorize the requests
+    :param documents_directory: directory of the vendored discovery documents
+    (see discovery_cache.get_discovery_document_path)
+    :return: A service that is connected to the specified API.
+    """
+    http = new_authorized_http(credentials)
+    if documents_directory:
+        document_path = get_discovery_document_path(documents_directory, api_name, api_version)
+        with open(document_path, "r", encoding="utf-8") as document_file:
+            return googleapiclient.discovery.build_from_document(document_file.read(), http=http,
+                                                                 requestBuilder=InstrumentedHttpRequest)
+    discovery_settings = settings.googleapi["discovery"]
+    cache = FileDiscoveryCache(discovery_settings["cache_directory"], discovery_settings["ttl"])
+    return googleapiclient.discovery.build(api_name, api_version, http=http, cache=cache,
+                                           requestBuilder=InstrumentedHttpRequest)
+
+
 def get_service(api_name: str, api_version: str, scope: List[str],
                 client_secrets_path: str, flags: argparse.Namespace) -> googleapiclient.discovery.Resource:
     """
     Get a service that communicates to a Google API.
 
+    The service is built once per process for given API, version and scopes, so that
+    the scripts run together share it. Its requests must be executed with the http
+    object of the current thread (see ThreadLocalHttp) if it is used from several threads.
+
     :param api_name: The name of the api to connect to.
     :param api_version: The api version to connect to.
     :param scope: A list of strings representing the auth
     scopes to authorize for the connection.
     :param client_secrets_path: A path to a valid client secrets file.
-    :param flags: parsed CLI args (including google api args)
+    :param flags: parsed CLI args (including google api args, and the
+    options of discovery_argparser if it is one of the parents of the parser)
     :return: A service that is connected to the specified API.
     """
-    credentials_base_path = os.path.dirname(os.path.abspath(client_secrets_path)) + "/"
-    flow = create_oauth_flow(client_secrets_path, scope)
-    http = get_authorized_http_object(credentials_base_path, api_name, flow, flags)
-    return googleapiclient.discovery.build(api_name, api_version, http=http)
+    cache_key = (api_name, api_version, tuple(scope))
+    with _cache_lock:
+        service = _services_cache.get(cache_key)
+    if service is None:
+        credentials = get_credentials(api_name, scope, client_secrets_path, flags)
+        service = build_service(api_name, api_version, credentials, getattr(flags, "discovery_documents", None))
+        with _cache_lock:
+            service = _services_cache.setdefault(cache_key, service)
+    return service
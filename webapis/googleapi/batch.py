@@ -0,0 +1,187 @@
+"""
+Execution of large numbers of Google API calls through batch requests.
+
+Google limits the number of calls of a batch request (1000 at most, and much less
+in practice before the batch gets throttled). The BatchExecutor splits the calls
+in chunks of a bounded size, sends several chunks at the same time and retries
+the calls that failed because of rate limits or server errors.
+
+API reference page: https://developers.google.com/api-client-library/python/guide/batch
+"""
+import json
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, NamedTuple
+
+import httplib2
+from googleapiclient.errors import HttpError
+from googleapiclient.http import BatchHttpRequest, HttpRequest
+from oauth2client import client
+
+import settings
+from webapis.googleapi.api_connector import ThreadLocalHttp
+from webapis.instrumentation import metrics
+from webapis.utils import with_output_label
+
+BatchCall = NamedTuple("BatchCall", [("request_id", str),
+                                     ("request", HttpRequest),
+                                     ("callback", Callable)])
+"""A call added to the executor, and the callback that receives its outcome"""
+
+BatchReport = NamedTuple("BatchReport", [("calls_count", int),
+                                         ("errors_count", int),
+                                         ("retries_count", int)])
+"""Outcome of the execution of the calls added to a BatchExecutor"""
+
+RATE_LIMIT_REASONS = ("rateLimitExceeded", "userRateLimitExceeded")
+"""Reasons of the 403 errors that are returned when a rate limit is reached"""
+
+
+def is_retryable_error(exception: Exception) -> bool:
+    """
+    Tell whether or not a failed call should be retried.
+
+    :param exception: the exception of a call, or of a whole batch request
+    :return: True for rate limit errors, server errors and transport errors
+    """
+    if isinstance(exception, HttpError):
+        status = exception.resp.status
+        if status in settings.googleapi["batch"]["retry_status_codes"]:
+            return True
+        if status == 403:
+            try:
+                errors = json.loads(exception.content.decode("utf-8"))["error"]["errors"]
+            except (ValueError, KeyError, TypeError, AttributeError):
+                return False
+            return any(error.get("reason") in RATE_LIMIT_REASONS for error in errors)
+        return False
+    return isinstance(exception, (httplib2.HttpLib2Error, OSError))
+
+
+class BatchExecutor:
+    """
+    Send API calls in batch requests of at most chunk_size calls, with up to workers
+    batch requests at the same time. Each thread has its own authorized http object.
+
+    The calls that fail because of a rate limit (429 or 403 rateLimitExceeded) or a
+    server error (5xx) are retried in a new batch request, after an exponentially
+    growing (and jittered) delay, as configured in settings.googleapi["batch"].
+    The batch requests, and the retries of the calls by method, are recorded in the
+    metrics of the process (see webapis.instrumentation).
+
+    The callbacks have the signature of the BatchHttpRequest callbacks:
+    callback(request_id, response, exception). They are called once per call, with
+    its final outcome, and never from two threads at the same time.
+
+    Usage example:
+    ``
+    executor = BatchExecutor(credentials, callback=batch_http_request_default_callback)
+    for site_url in site_urls:
+        executor.add(api_search_console.sites().add(siteUrl=site_url))
+    report = executor.execute()
+    ``
+    """
+    def __init__(self, credentials: client.Credentials, callback: Callable = None,
+                 chunk_size: int = settings.googleapi["batch"]["chunk_size"],
+                 workers: int = settings.googleapi["batch"]["workers"],
+                 max_retries: int = settings.googleapi["batch"]["max_retries"]):
+        """
+        :param credentials: the credentials used to authorize the batch requests
+        :param callback: the callback of the calls added without their own callback
+        :param chunk_size: maximum number of calls per batch request (at most 1000)
+        :param workers: number of batch requests sent at the same time
+        :param max_retries: maximum number of retries of a call
+        """
+        self.callback = callback
+        self.chunk_size = max(1, min(chunk_size, 1000))
+        self.workers = max(1, workers)
+        self.max_retries = max_retries
+        self._thread_local_http = ThreadLocalHttp(credentials)
+        self._calls = []
+        self._callback_lock = threading.Lock()
+        self._errors_count = 0
+        self._retries_count = 0
+
+    def add(self, request: HttpRequest, callback: Callable = None) -> str:
+        """
+        Add a call.
+
+        :param request: the request of the call, as built by a service. For example:
+        api_search_console.sites().add(siteUrl=website_url)
+        :param callback: the callback that receives the outcome of this call.
+        Defaults to the callback of the executor.
+        :return: the ID of the call, passed to its callback: the position of the call
+        among the calls of the next execute()
+        """
+        request_id = str(len(self._calls))
+        self._calls.append(BatchCall(request_id, request, callback or self.callback))
+        return request_id
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def execute(self) -> BatchReport:
+        """
+        Send all the calls added so far, and wait for their outcome.
+
+        :return: the number of calls, of failed calls and of retries
+        """
+        calls, self._calls = self._calls, []
+        self._errors_count = 0
+        self._retries_count = 0
+        chunks = [calls[index:index + self.chunk_size] for index in range(0, len(calls), self.chunk_size)]
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            # list() propagates the unexpected exceptions of the chunks
+            list(executor.map(with_output_label(self._execute_chunk), chunks))
+        return BatchReport(len(calls), self._errors_count, self._retries_count)
+
+    def _execute_chunk(self, calls: List[BatchCall]):
+        """Send a chunk of calls in a batch request, then retry the failed calls until max_retries."""
+        retries = 0
+        while calls:
+            failed_calls = []
+
+            def handle_response(request_id: str, response: object, exception: Exception):
+                call = calls[int(request_id)]
+                if exception is not None and retries < self.max_retries and is_retryable_error(exception):
+                    failed_calls.append(call)
+                else:
+                    self._report(call, response, exception)
+
+            batch = BatchHttpRequest(callback=handle_response)
+            for index, call in enumerate(calls):
+                batch.add(call.request, request_id=str(index))
+            start = time.perf_counter()
+            try:
+                batch.execute(http=self._thread_local_http.get())
+            except (HttpError, httplib2.HttpLib2Error, OSError) as exception:
+                metrics.record_call("googleapi", "batch", time.perf_counter() - start, failed=True)
+                # The whole batch request failed: none of its calls has been reported.
+                if retries >= self.max_retries or not is_retryable_error(exception):
+                    for call in calls:
+                        self._report(call, None, exception)
+                    return
+                failed_calls = calls
+            else:
+                metrics.record_call("googleapi", "batch", time.perf_counter() - start)
+            if failed_calls:
+                # The retries are recorded by method, to tell which API throttles the calls.
+                for method_id, failed_count in Counter(call.request.methodId for call in failed_calls).items():
+                    metrics.record_retries("googleapi", method_id, failed_count)
+                batch_settings = settings.googleapi["batch"]
+                delay = min(batch_settings["base_delay"] * 2 ** retries, batch_settings["max_delay"])
+                time.sleep(random.uniform(delay / 2, delay))
+                retries += 1
+                with self._callback_lock:
+                    self._retries_count += len(failed_calls)
+            calls = failed_calls
+
+    def _report(self, call: BatchCall, response: object, exception: Exception):
+        with self._callback_lock:
+            if exception is not None:
+                self._errors_count += 1
+            if call.callback is not None:
+                call.callback(call.request_id, response, exception)
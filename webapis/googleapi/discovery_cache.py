@@ -0,0 +1,90 @@
+"""
+Local storage of the discovery documents of the Google APIs.
+
+googleapiclient.discovery.build() downloads the discovery document of an API,
+which describes its resources and methods, each time a service is built. The
+FileDiscoveryCache keeps the downloaded documents in a directory for a limited
+time, so that the scripts run from cron do not download them on every start.
+
+The documents can also be vendored in a directory, named <api_name>.<api_version>.json,
+to build the services without any network access (see api_connector.build_service).
+
+API reference page: https://developers.google.com/discovery/v1/using
+"""
+import hashlib
+import os
+import time
+from typing import Optional
+
+from googleapiclient.discovery_cache.base import Cache
+
+
+def get_discovery_document_path(documents_directory: str, api_name: str, api_version: str) -> str:
+    """
+    :param documents_directory: directory of the vendored discovery documents
+    :param api_name: name of the api, for example analytics
+    :param api_version: version of the api, for example v3
+    :return: the path of the discovery document of the API version in the directory
+    """
+    return os.path.join(documents_directory, "%s.%s.json" % (api_name, api_version))
+
+
+class FileDiscoveryCache(Cache):
+    """
+    A discovery cache that stores one file per discovery document URL.
+
+    A document is returned by get() as long as its file is younger than the TTL.
+    The files are written atomically, so that several scripts can share the directory.
+
+    Usage example:
+    ``
+    cache = FileDiscoveryCache(settings.googleapi["discovery"]["cache_directory"],
+                               settings.googleapi["discovery"]["ttl"])
+    service = googleapiclient.discovery.build("analytics", "v3", http=http, cache=cache)
+    ``
+    """
+    def __init__(self, cache_directory: str, ttl: float):
+        """
+        :param cache_directory: directory of the cache files. Created when the first document is stored.
+        :param ttl: number of seconds a document is kept
+        """
+        self.cache_directory = cache_directory
+        self.ttl = ttl
+
+    def get_cache_file_path(self, url: str) -> str:
+        """
+        :param url: the URL of a discovery document
+        :return: the path of the file where the document of the URL is stored
+        """
+        return os.path.join(self.cache_directory, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, url: str) -> Optional[str]:
+        """
+        :param url: the URL of a discovery document
+        :return: the document, or None if it is not stored or has expired
+        """
+        cache_file_path = self.get_cache_file_path(url)
+        try:
+            if time.time() - os.path.getmtime(cache_file_path) > self.ttl:
+                return None
+            with open(cache_file_path, "r", encoding="utf-8") as cache_file:
+                return cache_file.read()
+        except (OSError, ValueError):
+            # A missing or unreadable file only costs a download of the document.
+            return None
+
+    def set(self, url: str, content: str):
+        """
+        :param url: the URL of a discovery document
+        :param content: the document
+        """
+        cache_file_path = self.get_cache_file_path(url)
+        tmp_file_path = "%s.%d.tmp" % (cache_file_path, os.getpid())
+        try:
+            os.makedirs(self.cache_directory, exist_ok=True)
+            with open(tmp_file_path, "w", encoding="utf-8") as cache_file:
+                cache_file.write(content)
+            os.replace(tmp_file_path, cache_file_path)
+        except OSError:
+            # The cache is optional: the document will be downloaded again next time.
+            pass
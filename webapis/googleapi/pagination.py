@@ -0,0 +1,124 @@
+"""
+Lazy iteration over the pages of the list endpoints of the Google APIs.
+
+The Google APIs use two pagination styles:
+ - a nextPageToken in the response, passed as the pageToken parameter of the
+   next call (Tag Manager, Search Console...)
+ - a nextLink in the response, whose start-index parameter is passed as the
+   start-index parameter of the next call (Analytics Management API)
+
+PageIterator handles both, and requests the next page in the background while the
+current one is being consumed.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterator, Optional
+from urllib.parse import parse_qs, urlparse
+
+import httplib2
+
+
+def get_next_page_token_params(page: dict) -> Optional[dict]:
+    """
+    :param page: a page of results, as returned by the API
+    :return: the parameters of the call for the next page, or None if it is the last one
+    """
+    next_page_token = page.get("nextPageToken")
+    return {"pageToken": next_page_token} if next_page_token else None
+
+
+def get_next_start_index(next_link: str) -> int:
+    """
+    :param next_link: the nextLink of a page of results
+    :return: the start-index of the next page
+    """
+    return int(parse_qs(urlparse(next_link).query)["start-index"][0])
+
+
+def get_next_link_params(page: dict) -> Optional[dict]:
+    """
+    :param page: a page of results, as returned by the API
+    :return: the parameters of the call for the next page, or None if it is the last one
+    """
+    next_link = page.get("nextLink")
+    return {"start_index": get_next_start_index(next_link)} if next_link else None
+
+
+class PageIterator:
+    """
+    Iterate over the pages of a list endpoint, wrapped in a model class.
+
+    No request is sent before the iteration starts. Once a page has been received,
+    the next one is requested in the background, while the current one is consumed.
+    Only one request is in flight at any time, so that the http object of the requests
+    (the one of the service by default) must only not be used by another thread during
+    the iteration.
+
+    The iterator can be iterated several times: each iteration requests the pages again.
+
+    Usage example:
+    ``
+    accounts = PageIterator(api_tag_manager.accounts().list, AccountsList).items("account")
+    for account in accounts:
+        ...
+    ``
+    """
+    def __init__(self, list_method: Callable, page_class: Callable[[dict], Any] = dict,
+                 get_next_page_params: Callable[[dict], Optional[dict]] = get_next_page_token_params,
+                 http: httplib2.Http = None, num_retries: int = 0, prefetch: bool = True, **kwargs):
+        """
+        :param list_method: the list method of a collection of the service,
+        for example api_tag_manager.accounts().list
+        :param page_class: the model class used to wrap the pages
+        :param get_next_page_params: provides the parameters of the call for the page that
+        follows a given page: get_next_page_token_params or get_next_link_params
+        :param http: the authorized http object used to execute the requests.
+        Defaults to the one of the service.
+        :param num_retries: number of retries of a call that failed because of a server error
+        :param prefetch: whether or not the next page is requested while the current one is consumed
+        :param kwargs: the parameters of the calls
+        """
+        self.list_method = list_method
+        self.page_class = page_class
+        self.get_next_page_params = get_next_page_params
+        self.http = http
+        self.num_retries = num_retries
+        self.prefetch = prefetch
+        self.params = kwargs
+
+    def _fetch(self, page_params: dict) -> dict:
+        params = dict(self.params)
+        params.update(page_params)
+        return self.list_method(**params).execute(http=self.http, num_retries=self.num_retries)
+
+    def __iter__(self) -> Iterator[Any]:
+        if not self.prefetch:
+            page_params = {}
+            while page_params is not None:
+                page = self._fetch(page_params)
+                page_params = self.get_next_page_params(page)
+                yield self.page_class(page)
+            return
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        next_page = executor.submit(self._fetch, {})
+        try:
+            while next_page is not None:
+                page = next_page.result()
+                page_params = self.get_next_page_params(page)
+                next_page = executor.submit(self._fetch, page_params) if page_params is not None else None
+                yield self.page_class(page)
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+            executor.shutdown(wait=False)
+
+    def items(self, attribute: str) -> Iterator[Any]:
+        """
+        Iterate over the items of all the pages.
+
+        :param attribute: the attribute of the page model that iterates over the
+        items of the page, for example "account" for AccountsList
+        :return: an iterator over the items of all the pages
+        """
+        for page in self:
+            yield from getattr(page, attribute)
@@ -0,0 +1,93 @@
+"""
+The classes in this module represent the data model of Google Search Console API.
+
+API reference page: https://developers.google.com/webmaster-tools/search-console-api-original/v3/
+"""
+from webapis import utils
+from webapis.common.data_model import WrappingSequence
+
+
+DOMAIN_PROPERTY_PREFIX = "sc-domain:"
+"""Prefix of the site URL of the domain properties, for example sc-domain:example.com"""
+
+
+class SitesList:
+    """
+    This class represent the result of a call to the sites/list endpoint
+    of the Google Search Console API.
+
+    Each of this class' properties exactly maps to one of the JSON from the API response.
+
+    API reference page:
+    https://developers.google.com/webmaster-tools/search-console-api-original/v3/sites/list
+
+    The JSON response has the following structure:
+
+    {
+      "siteEntry": [
+        {
+          "siteUrl": string,
+          "permissionLevel": string
+        }
+      ]
+    }
+    """
+    def __init__(self, json_as_dict: dict):
+        """
+        :param json_as_dict: a dictionary that represent the JSON response from the Search Console API
+        """
+        self.data = json_as_dict
+        self._sites = None
+
+    @property
+    def site_entry(self) -> WrappingSequence:
+        """
+        Sequence of the Site items of this SitesList.
+
+        :rtype: WrappingSequence of Site
+        """
+        if self._sites is None:
+            self._sites = WrappingSequence(self.data.get("siteEntry", []), Site)
+        return self._sites
+
+
+class Site:
+    """
+    This class represent a site from the siteEntry section of the result of a call to the
+    sites/list endpoint of the Google Search Console API.
+
+    API reference page:
+    https://developers.google.com/webmaster-tools/search-console-api-original/v3/sites#resource
+    """
+    def __init__(self, json_as_dict: dict):
+        self.data = json_as_dict
+
+    @property
+    def site_url(self) -> str:
+        """The URL of the site."""
+        return self.data.get("siteUrl")
+
+    @property
+    def permission_level(self) -> str:
+        """The user's permission level for the site, for example siteOwner or siteUnverifiedUser."""
+        return self.data.get("permissionLevel")
+
+    @property
+    def domain_name(self) -> str:
+        """The domain name of the site, as returned by webapis.utils.get_domain_name_from_url."""
+        return get_site_domain_name(self.site_url)
+
+
+def get_site_domain_name(site_url: str) -> str:
+    """
+    Normalize the URL of a site, so that the URLs of the same site can be compared.
+
+    The domain of a domain property is normalized like the host of a URL, so that
+    both kinds of sites give the same domain names.
+
+    :param site_url: the URL of a site, or the sc-domain:<domain> name of a domain property
+    :return: the lower case domain name of the site, without its www. prefix
+    """
+    if site_url[:len(DOMAIN_PROPERTY_PREFIX)].lower() == DOMAIN_PROPERTY_PREFIX:
+        site_url = site_url[len(DOMAIN_PROPERTY_PREFIX):]
+    return utils.get_domain_name_from_url(site_url)
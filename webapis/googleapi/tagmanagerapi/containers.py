@@ -0,0 +1,81 @@
+"""
+Listing of the existing containers of the Tag Manager accounts.
+
+The containers of the accounts are listed concurrently, page by page, to find which
+domains already have a container before creating new ones.
+
+API reference page: https://developers.google.com/tag-manager/api/v2/reference/accounts/containers/list
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, Set
+
+import googleapiclient.discovery
+import httplib2
+from oauth2client import client
+
+import settings
+from webapis import utils
+from webapis.googleapi.api_connector import ThreadLocalHttp
+from webapis.googleapi.pagination import PageIterator
+from webapis.googleapi.tagmanagerapi.data_model import Container, ContainersList
+
+
+def iter_containers(api_tag_manager: googleapiclient.discovery.Resource, account_id: str,
+                    http: httplib2.Http = None) -> Iterator[Container]:
+    """
+    List the containers of an account, following the next page tokens.
+
+    :param api_tag_manager: the Tag Manager service
+    :param account_id: ID of the account
+    :param http: the authorized http object used to execute the requests. Must be
+    specific to the current thread if this function is called from several threads.
+    :return: an iterator over the containers of the account
+    """
+    return PageIterator(api_tag_manager.accounts().containers().list, ContainersList, http=http,
+                        num_retries=settings.googleapi["tag_manager"]["num_retries"],
+                        parent="accounts/" + account_id).items("container")
+
+
+def normalize_container_domain_name(domain_name: str) -> str:
+    """
+    :param domain_name: a container name or one of its domain names
+    :return: the domain name in the form used to name the containers (see get_domain_name_from_url)
+    """
+    return utils.get_domain_name_from_url(domain_name.strip())
+
+
+def index_containers(containers: Iterable[Container]) -> Set[str]:
+    """
+    Index the domains that already have a container.
+
+    :param containers: the containers of an account
+    :return: the normalized names and domain names of the containers
+    """
+    domain_names = set()
+    for container in containers:
+        if container.name:
+            domain_names.add(normalize_container_domain_name(container.name))
+        for domain_name in container.domain_name or ():
+            domain_names.add(normalize_container_domain_name(domain_name))
+    return domain_names
+
+
+def get_accounts_containers_indexes(api_tag_manager: googleapiclient.discovery.Resource,
+                                    credentials: client.Credentials, account_ids: Iterable[str],
+                                    workers: int = settings.googleapi["tag_manager"]["default_workers"]
+                                    ) -> Dict[str, Set[str]]:
+    """
+    Index the containers of several accounts, with a pool of threads.
+
+    :param api_tag_manager: the Tag Manager service
+    :param credentials: the credentials of the service, used to authorize the http object of each thread
+    :param account_ids: IDs of the accounts
+    :param workers: number of accounts whose containers are listed concurrently
+    :return: the index of the containers (see index_containers()) by account ID
+    """
+    account_ids = list(account_ids)
+    thread_local_http = ThreadLocalHttp(credentials)
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        indexes = executor.map(lambda account_id: index_containers(
+            iter_containers(api_tag_manager, account_id, http=thread_local_http.get())), account_ids)
+        return dict(zip(account_ids, indexes))
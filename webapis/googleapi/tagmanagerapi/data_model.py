@@ -1,6 +1,6 @@
 from typing import List
 
-from webapis.common.data_model import GenericWrappingIterator
+from webapis.common.data_model import WrappingSequence
 
 
 class AccountsList:
@@ -36,16 +36,18 @@ class AccountsList:
         :param json_as_dict: a dictionary that represent the JSON response from the Tag Manager API
         """
         self.data = json_as_dict
-        self._accounts_iterator = GenericWrappingIterator(self.data.get("account", []), Account)
+        self._accounts = None
 
     @property
-    def account(self) -> GenericWrappingIterator:
+    def account(self) -> WrappingSequence:
         """
-        Iterator to iterate over Account items of this AccountList.
+        Sequence of the Account items of this AccountList.
 
-        :rtype: GenericWrappingIterator of Account
+        :rtype: WrappingSequence of Account
         """
-        return self._accounts_iterator
+        if self._accounts is None:
+            self._accounts = WrappingSequence(self.data.get("account", []), Account)
+        return self._accounts
 
     @property
     def next_page_token(self) -> str:
@@ -135,11 +137,13 @@ class ContainersList:
 
     def __init__(self, json_as_dict):
         self.data = json_as_dict
-        self._containers_iterator = GenericWrappingIterator(self.data.get("container", []), Container)
+        self._containers = None
 
     @property
     def container(self):
-        return self._containers_iterator
+        if self._containers is None:
+            self._containers = WrappingSequence(self.data.get("container", []), Container)
+        return self._containers
 
     @property
     def next_page_token(self) -> str:
@@ -1,3 +1,6 @@
+from typing import Callable
+
+from webapis.googleapi.batch import BatchReport
 from webapis.utils import Console
 
 
@@ -17,3 +20,30 @@ def batch_http_request_default_callback(request_id: str, response: object, excep
         print(response)
     else:
         print("\tOK")
+
+
+def get_labelled_batch_callback(label: str) -> Callable:
+    """
+    Provide a response handler for the BatchHttpRequest that prints a label
+    before the outcome of the call.
+
+    :param label: a description of the call, for example the URL of the site to add
+    :return: a callback for BatchHttpRequest.add() or BatchExecutor.add()
+    """
+    def callback(request_id: str, response: object, exception: Exception):
+        print("\t", label)
+        batch_http_request_default_callback(request_id, response, exception)
+    return callback
+
+
+def print_batch_report(report: BatchReport):
+    """
+    Print the outcome of the execution of a BatchExecutor.
+
+    :param report: the report returned by BatchExecutor.execute()
+    """
+    Console.print_green("\n", report.calls_count - report.errors_count, " call(s) succeeded.")
+    if report.errors_count:
+        Console.print_red(report.errors_count, " call(s) failed.")
+    if report.retries_count:
+        Console.print_yellow(report.retries_count, " call(s) retried.")
@@ -0,0 +1,378 @@
+"""
+Measures of the calls to the web APIs, and of the time spent parsing the responses
+and serializing the outputs.
+
+The connectors record their calls in the process-wide registry `metrics`:
+ - Monitis: api_connector.Service.request()
+ - Google APIs: the requests of the services built by api_connector.build_service()
+ (see InstrumentedHttpRequest), and the batch requests of batch.BatchExecutor
+ - AWS: the boto3 clients passed to instrument_boto3_client()
+
+For each endpoint, the registry counts the calls, the failed calls, the retries and
+the bytes sent and received, and keeps a histogram of the latency of the calls.
+
+With the --metrics option of the scripts (see metrics_argparser), the measures are
+written when the script exits, whether it succeeds or not: as a JSON summary, or as
+a Prometheus text file that can be exposed by the textfile collector of the node exporter.
+"""
+import argparse
+import atexit
+import bisect
+import contextlib
+import json
+import os
+import threading
+import time
+from typing import Iterator, Sequence, Tuple
+
+import settings
+
+
+METRICS_FORMATS = ("json", "prometheus")
+"""The formats of the files written by MetricsRegistry.write()"""
+
+metrics_argparser = argparse.ArgumentParser(add_help=False)
+metrics_argparser.add_argument('--metrics',
+                               dest="metrics_file",
+                               required=False,
+                               help='path of a file where the measures of the API calls are written when '
+                                    'the script exits')
+metrics_argparser.add_argument('--metrics-format',
+                               dest="metrics_format",
+                               choices=METRICS_FORMATS,
+                               default=settings.metrics["default_format"],
+                               help='format of the --metrics file')
+
+
+class Histogram:
+    """
+    Distribution of durations, in buckets of fixed upper bounds.
+
+    A value equal to the upper bound of a bucket is counted in this bucket. The
+    values greater than the last bound are counted in an implicit +Inf bucket.
+    """
+    __slots__ = ("bounds", "bucket_counts", "count", "sum", "max")
+
+    def __init__(self, bounds: Sequence[float]):
+        """
+        :param bounds: the upper bounds of the buckets, in increasing order
+        """
+        self.bounds = bounds
+        self.bucket_counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.bucket_counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def iter_cumulative_counts(self) -> Iterator[Tuple[str, int]]:
+        """
+        :return: an iterator over the (upper bound, number of values lower or equal
+        to the bound) pairs, ending with the +Inf bound
+        """
+        cumulative_count = 0
+        for bound, bucket_count in zip(list(self.bounds) + ["+Inf"], self.bucket_counts):
+            cumulative_count += bucket_count
+            yield str(bound), cumulative_count
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "max": self.max,
+            "buckets": dict(self.iter_cumulative_counts())
+        }
+
+
+class EndpointMetrics:
+    """The measures of the calls to an endpoint of an API"""
+    __slots__ = ("calls", "errors", "retries", "bytes_sent", "bytes_received", "latency")
+
+    def __init__(self, latency_bounds: Sequence[float]):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.latency = Histogram(latency_bounds)
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "latency_seconds": self.latency.to_dict()
+        }
+
+
+class MetricsRegistry:
+    """
+    Thread-safe registry of the measures of the API calls and of the processing
+    stages (parse, serialize...).
+
+    Usage example:
+    ``
+    start = time.perf_counter()
+    response = session.get(url)
+    metrics.record_call("monitis", "searchitem", time.perf_counter() - start,
+                        failed=response.status_code >= 400, bytes_received=len(response.content))
+    with metrics.time("parse", "monitis.searchitem"):
+        monitors = response.json()
+    ``
+    """
+    def __init__(self, latency_bounds: Sequence[float] = settings.metrics["latency_buckets"]):
+        """
+        :param latency_bounds: the upper bounds of the buckets of the latency histograms (seconds)
+        """
+        self.latency_bounds = tuple(latency_bounds)
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._timings = {}
+
+    def _get_endpoint(self, api: str, endpoint: str) -> EndpointMetrics:
+        # Must be called with the lock held.
+        endpoint_metrics = self._endpoints.get((api, endpoint))
+        if endpoint_metrics is None:
+            endpoint_metrics = self._endpoints[(api, endpoint)] = EndpointMetrics(self.latency_bounds)
+        return endpoint_metrics
+
+    def record_call(self, api: str, endpoint: str, seconds: float, failed: bool = False,
+                    bytes_sent: int = 0, bytes_received: int = 0, retries: int = 0):
+        """
+        Record a call to an endpoint.
+
+        :param api: name of the API, for example monitis
+        :param endpoint: name of the endpoint, for example the API action or method
+        :param seconds: duration of the call, including its retries
+        :param failed: whether or not the call failed (error status or exception)
+        :param bytes_sent: size of the body of the request
+        :param bytes_received: size of the body of the response
+        :param retries: number of retries of the call, made by the HTTP client
+        """
+        with self._lock:
+            endpoint_metrics = self._get_endpoint(api, endpoint)
+            endpoint_metrics.calls += 1
+            endpoint_metrics.errors += int(failed)
+            endpoint_metrics.retries += retries
+            endpoint_metrics.bytes_sent += bytes_sent
+            endpoint_metrics.bytes_received += bytes_received
+            endpoint_metrics.latency.observe(seconds)
+
+    def record_retries(self, api: str, endpoint: str, retries: int = 1):
+        """
+        Record the retries of calls made by the application (after a throttling
+        error, for example), in addition to those of the HTTP client.
+
+        :param api: name of the API
+        :param endpoint: name of the endpoint
+        :param retries: number of retries
+        """
+        with self._lock:
+            self._get_endpoint(api, endpoint).retries += retries
+
+    def record_bytes_received(self, api: str, endpoint: str, bytes_received: int):
+        """
+        Record the size of a response read after its call has been recorded (a streamed response).
+
+        :param api: name of the API
+        :param endpoint: name of the endpoint
+        :param bytes_received: number of bytes read
+        """
+        with self._lock:
+            self._get_endpoint(api, endpoint).bytes_received += bytes_received
+
+    def record_timing(self, stage: str, name: str, seconds: float):
+        """
+        :param stage: the processing stage, for example parse or serialize
+        :param name: what has been processed, for example the endpoint of a response
+        :param seconds: the duration
+        """
+        with self._lock:
+            histogram = self._timings.get((stage, name))
+            if histogram is None:
+                histogram = self._timings[(stage, name)] = Histogram(self.latency_bounds)
+            histogram.observe(seconds)
+
+    @contextlib.contextmanager
+    def time(self, stage: str, name: str):
+        """
+        Record the duration of a block of code (see record_timing()).
+
+        :param stage: the processing stage, for example parse or serialize
+        :param name: what is processed
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_timing(stage, name, time.perf_counter() - start)
+
+    def reset(self):
+        """Forget all the measures."""
+        with self._lock:
+            self._endpoints = {}
+            self._timings = {}
+
+    def get_summary(self) -> dict:
+        """
+        :return: the measures, in the form:
+            {
+                "calls": {<api>: {<endpoint>: EndpointMetrics.to_dict()}},
+                "timings": {<stage>: {<name>: Histogram.to_dict()}}
+            }
+        """
+        summary = {"calls": {}, "timings": {}}
+        with self._lock:
+            for (api, endpoint), endpoint_metrics in sorted(self._endpoints.items()):
+                summary["calls"].setdefault(api, {})[endpoint] = endpoint_metrics.to_dict()
+            for (stage, name), histogram in sorted(self._timings.items()):
+                summary["timings"].setdefault(stage, {})[name] = histogram.to_dict()
+        return summary
+
+    def to_prometheus(self) -> str:
+        """
+        :return: the measures in the Prometheus text exposition format
+        """
+        counters = (("calls", "webapis_api_calls_total", "Number of calls to the API endpoints"),
+                    ("errors", "webapis_api_errors_total", "Number of failed calls to the API endpoints"),
+                    ("retries", "webapis_api_retries_total", "Number of retried calls to the API endpoints"),
+                    ("bytes_sent", "webapis_api_sent_bytes_total", "Size of the bodies of the requests"),
+                    ("bytes_received", "webapis_api_received_bytes_total", "Size of the bodies of the responses"))
+        lines = []
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            for attribute, metric_name, description in counters:
+                lines += ["# HELP %s %s" % (metric_name, description), "# TYPE %s counter" % metric_name]
+                lines += ["%s%s %d" % (metric_name, _format_labels(api=api, endpoint=endpoint),
+                                       getattr(endpoint_metrics, attribute))
+                          for (api, endpoint), endpoint_metrics in endpoints]
+            lines += _format_histograms("webapis_api_call_duration_seconds",
+                                        "Duration of the calls to the API endpoints",
+                                        [({"api": api, "endpoint": endpoint}, endpoint_metrics.latency)
+                                         for (api, endpoint), endpoint_metrics in endpoints])
+            lines += _format_histograms("webapis_processing_duration_seconds",
+                                        "Duration of the processing stages (parse, serialize...)",
+                                        [({"stage": stage, "name": name}, histogram)
+                                         for (stage, name), histogram in sorted(self._timings.items())])
+        return "\n".join(lines) + "\n"
+
+    def write(self, file_path: str, output_format: str = "json"):
+        """
+        Write the measures in a file, replacing it atomically, so that a collector
+        never reads a partial file.
+
+        :param file_path: path of the file
+        :param output_format: one of METRICS_FORMATS
+        """
+        if output_format == "prometheus":
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.get_summary(), indent=2)
+        tmp_file_path = "%s.%d.tmp" % (file_path, os.getpid())
+        with open(tmp_file_path, "w") as file:
+            file.write(content)
+        os.replace(tmp_file_path, file_path)
+
+
+def _format_labels(**labels: str) -> str:
+    return "{%s}" % ",".join('%s="%s"' % (name, str(value).replace("\\", "\\\\").replace('"', '\\"')
+                                          .replace("\n", "\\n"))
+                             for name, value in labels.items())
+
+
+def _format_histograms(metric_name: str, description: str, histograms: list) -> list:
+    lines = ["# HELP %s %s" % (metric_name, description), "# TYPE %s histogram" % metric_name]
+    for labels, histogram in histograms:
+        for bound, cumulative_count in histogram.iter_cumulative_counts():
+            lines.append("%s_bucket%s %d" % (metric_name, _format_labels(le=bound, **labels), cumulative_count))
+        lines.append("%s_sum%s %r" % (metric_name, _format_labels(**labels), histogram.sum))
+        lines.append("%s_count%s %d" % (metric_name, _format_labels(**labels), histogram.count))
+    return lines
+
+
+metrics = MetricsRegistry()
+"""The registry of the process, used by all the connectors"""
+
+
+def write_metrics_on_exit(flags: argparse.Namespace):
+    """
+    Write the measures of the process in the --metrics file when the script exits,
+    if the option is given.
+
+    :param flags: parsed CLI args (including the options of metrics_argparser)
+    """
+    metrics_file = getattr(flags, "metrics_file", None)
+    if metrics_file:
+        atexit.register(metrics.write, metrics_file, flags.metrics_format)
+
+
+_boto3_calls = threading.local()
+"""The call of an instrumented boto3 client in progress in each thread, until it is recorded"""
+
+
+def instrument_boto3_client(boto3_client, registry: MetricsRegistry = metrics):
+    """
+    Record the calls of a boto3 client, from its botocore events. The calls are
+    recorded under the API aws, and the endpoint <service>.<operation>, for example
+    route53.ListResourceRecordSets. The retries are those made by botocore.
+
+    The calls that raise an exception without a response must be recorded by the
+    caller with record_boto3_call_failure(): the botocore installed with boto3==1.4.7
+    emits no event for them.
+
+    :param boto3_client: a boto3 client
+    :param registry: the registry where the calls are recorded
+    """
+    service_name = boto3_client.meta.service_model.service_name
+
+    def start_call(model, params: dict, **kwargs):
+        body = params.get("body")
+        _boto3_calls.call = (registry, "%s.%s" % (service_name, model.name), time.perf_counter(),
+                             len(body) if isinstance(body, (bytes, str)) else 0)
+
+    def end_call(http_response=None, parsed: dict = None, **kwargs):
+        call = getattr(_boto3_calls, "call", None)
+        if call is None:
+            return
+        _boto3_calls.call = None
+        _, endpoint, start, bytes_sent = call
+        failed = http_response is None or http_response.status_code >= 300
+        # The body of a streamed response must not be read here: its size is taken from the headers.
+        bytes_received = int(http_response.headers.get("Content-Length", 0)) if http_response is not None else 0
+        retries = (parsed or {}).get("ResponseMetadata", {}).get("RetryAttempts", 0)
+        registry.record_call("aws", endpoint, time.perf_counter() - start, failed, bytes_sent,
+                             bytes_received, retries)
+
+    events = boto3_client.meta.events
+    # The emitter of a client only receives the events of its service. The handlers of the
+    # most specific event names are called first, and the wildcards before the names at the
+    # same level: the start of the calls is registered first, for all the operations, so that
+    # the handlers which answer a call from the event (botocore Stubber...) do not prevent
+    # it from being recorded.
+    events.register_first("before-call.*.*", start_call)
+    events.register("after-call.*.*", end_call)
+    # Emitted instead of after-call when the request could not be sent or received, by the
+    # recent versions of botocore only.
+    events.register("after-call-error.*.*", end_call)
+
+
+def record_boto3_call_failure():
+    """
+    Record the call of an instrumented boto3 client (see instrument_boto3_client())
+    which raised an exception in the current thread as failed, unless it has already
+    been recorded from the botocore events.
+    """
+    call = getattr(_boto3_calls, "call", None)
+    if call is None:
+        return
+    _boto3_calls.call = None
+    registry, endpoint, start, bytes_sent = call
+    registry.record_call("aws", endpoint, time.perf_counter() - start, True, bytes_sent)
@@ -1,10 +1,192 @@
 import datetime
 import json
-from typing import List
+import os
+import threading
+import time
+from typing import Dict, Iterator, List, NamedTuple, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
 
 import settings
+from webapis.common.json_stream import iter_json_array_items
+from webapis.instrumentation import metrics
+from webapis.utils import RateLimiter
+
+
+RequestStats = NamedTuple("RequestStats", [("count", int),
+                                           ("errors", int),
+                                           ("total_seconds", float),
+                                           ("max_seconds", float)])
+"""Latency counters of the calls to an endpoint of the Monitis API"""
+
+
+def create_session(pool_size: int = settings.monitisapi["http"]["pool_size"],
+                   max_retries: int = settings.monitisapi["http"]["max_retries"],
+                   backoff_factor: float = settings.monitisapi["http"]["backoff_factor"],
+                   status_forcelist: tuple = settings.monitisapi["http"]["retry_status_codes"]) -> requests.Session:
+    """
+    Provide a session that keeps its connections to the Monitis API alive.
+
+    Failed connections are retried whatever the method. Responses with a status in
+    status_forcelist and read errors are only retried for the idempotent methods
+    (GET, ...): a monitor creation (POST) that reached the server is never replayed.
+
+    :param pool_size: maximum number of connections kept open per host. Should be at
+    least the number of threads that share the session.
+    :param max_retries: maximum number of retries of a request
+    :param backoff_factor: the delay between retries is backoff_factor * 2 ^ (retry number - 1) seconds
+    :param status_forcelist: HTTP status codes of the responses to retry
+    :return: a requests session
+    """
+    retry = Retry(total=max_retries,
+                  backoff_factor=backoff_factor,
+                  status_forcelist=status_forcelist,
+                  raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_token_cache_file_path(credentials_file_path: str) -> str:
+    """
+    :param credentials_file_path: path to Monitis credentials files.
+    :return: the path of the auth token cache, in the directory of the credentials file
+    """
+    return os.path.join(os.path.dirname(os.path.abspath(credentials_file_path)),
+                        settings.monitisapi["token_cache"]["file_name"])
+
+
+class TokenCache:
+    """
+    Keep the Monitis auth tokens on disk until they expire, so that they can be
+    reused by the following runs of the scripts.
+
+    A token is considered expired refresh_margin seconds before the end of its
+    validity, so that it does not expire during the calls that use it.
+
+    The cache file contains JSON in the form:
+
+    {
+        "<api key>": {
+            "auth_token": str,
+            "expires_at": float (POSIX timestamp)
+        }
+    }
+    """
+    def __init__(self, cache_file_path: str,
+                 ttl: float = settings.monitisapi["token_cache"]["ttl"],
+                 refresh_margin: float = settings.monitisapi["token_cache"]["refresh_margin"]):
+        """
+        :param cache_file_path: path to the cache file. It is created on the first save.
+        :param ttl: validity of a new token, in seconds
+        :param refresh_margin: number of seconds before the expiry of a token
+        from which it is not used anymore
+        """
+        self.cache_file_path = cache_file_path
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self._tokens = {}
+        if os.path.isfile(cache_file_path):
+            try:
+                with open(cache_file_path, "r") as file:
+                    self._tokens = json.load(file)
+            except ValueError:
+                # A corrupted cache only costs a new token.
+                self._tokens = {}
+
+    def get(self, api_key: str) -> Optional[str]:
+        """
+        :param api_key: the API key the token has been delivered for
+        :return: the cached token, or None if there is none or if it is about to expire
+        """
+        cached_token = self._tokens.get(api_key)
+        if cached_token is None or cached_token["expires_at"] - self.refresh_margin <= time.time():
+            return None
+        return cached_token["auth_token"]
+
+    def set(self, api_key: str, auth_token: str):
+        """
+        Store a new token and save the cache.
+
+        :param api_key: the API key the token has been delivered for
+        :param auth_token: the token
+        """
+        self._tokens[api_key] = {"auth_token": auth_token, "expires_at": time.time() + self.ttl}
+        self.save()
+
+    def invalidate(self, api_key: str):
+        """
+        Remove a token which has been rejected by the API.
+
+        :param api_key: the API key the token has been delivered for
+        """
+        if self._tokens.pop(api_key, None) is not None:
+            self.save()
+
+    def save(self):
+        """Write the cache to disk, readable by its owner only, replacing the previous one atomically."""
+        tmp_file_path = self.cache_file_path + ".tmp"
+        file_descriptor = os.open(tmp_file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(file_descriptor, "w") as file:
+            json.dump(self._tokens, file)
+        os.replace(tmp_file_path, self.cache_file_path)
+
+
+def is_auth_error(response: requests.Response) -> bool:
+    """
+    Tell whether or not the API rejected the auth token of a call.
+
+    :param response: the response of a call authenticated with a token
+    :return: True if the token is invalid or expired
+    """
+    if response.status_code in (401, 403):
+        return True
+    try:
+        error = response.json().get("error")
+    except ValueError:
+        return False
+    return bool(error) and "auth" in str(error).lower()
+
+
+def get_body_size(body) -> int:
+    """
+    :param body: the body of a prepared request (bytes, str, None or a stream)
+    :return: the size of the body, 0 if it is unknown
+    """
+    if isinstance(body, str):
+        return len(body.encode("utf-8"))
+    return len(body) if isinstance(body, bytes) else 0
+
+
+def get_retries_count(response: requests.Response) -> int:
+    """
+    :param response: a response received through a session of create_session()
+    :return: the number of retries made by urllib3 before the response
+    """
+    retries = getattr(response.raw, "retries", None)
+    return len(retries.history) if retries is not None else 0
+
+
+def iter_counted_chunks(chunks: Iterator[bytes], stats_key: str) -> Iterator[bytes]:
+    """
+    Pass the chunks of a streamed response through, and record their size once
+    they have all been read (see webapis.instrumentation).
+
+    :param chunks: the chunks of the response
+    :param stats_key: name under which the call has been recorded
+    :return: an iterator over the chunks
+    """
+    bytes_received = 0
+    try:
+        for chunk in chunks:
+            bytes_received += len(chunk)
+            yield chunk
+    finally:
+        metrics.record_bytes_received("monitis", stats_key, bytes_received)
 
 
 class Service:
@@ -25,12 +207,23 @@ class Service:
     ``
 
     api_key, secret_key and agent_key can be obtained from the Monitis account under the Tools > API menu.
+
+    All the calls go through a pooled session (see create_session()), with the timeouts
+    set in settings.monitisapi["http"]. The latency of the calls is recorded per action
+    and can be read with get_request_stats(). The calls are also recorded in the registry
+    of the process (see webapis.instrumentation), with their size and their retries.
+    A Service can be shared between threads.
+
+    The auth token is cached in a file next to the credentials file (see TokenCache),
+    and renewed when it is about to expire or when the API rejects it.
     """
-    def __init__(self, credentials_file_path):
+    def __init__(self, credentials_file_path, pool_size: int = None):
         """
         Allows connecting to the Monitis' API.
 
         :param credentials_file_path: path to Monitis credentials files.
+        :param pool_size: maximum number of connections kept open. Defaults to
+        settings.monitisapi["http"]["pool_size"].
         """
         with open(credentials_file_path, "r") as file:
             secret_credentials = json.loads(file.read())
@@ -38,6 +231,59 @@ class Service:
         self.secret_key = secret_credentials["secret_key"]
         self.agent_key = secret_credentials["agent_key"]
         self.user_key = secret_credentials["user_key"]
+        self.timeout = (settings.monitisapi["http"]["connect_timeout"], settings.monitisapi["http"]["read_timeout"])
+        self.session = create_session(pool_size or settings.monitisapi["http"]["pool_size"])
+        self._stats_lock = threading.Lock()
+        self._request_stats = {}
+        self.token_cache = TokenCache(get_token_cache_file_path(credentials_file_path))
+        self._token_lock = threading.Lock()
+
+    def request(self, stats_key: str, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request to the Monitis API through the session and record its latency.
+
+        :param stats_key: name under which the latency of the call is recorded. For example, the API action.
+        :param method: HTTP method
+        :param url: URL of the endpoint
+        :param kwargs: other arguments of requests.Session.request (params, data...)
+        :return: the response
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        start = time.perf_counter()
+        response = None
+        try:
+            response = self.session.request(method, url, **kwargs)
+            return response
+        finally:
+            duration = time.perf_counter() - start
+            failed = response is None or response.status_code >= 400
+            self._record_request(stats_key, duration, failed)
+            if response is None:
+                metrics.record_call("monitis", stats_key, duration, failed)
+            else:
+                metrics.record_call("monitis", stats_key, duration, failed, get_body_size(response.request.body),
+                                    # The body of a streamed response is not read yet.
+                                    0 if kwargs.get("stream") else len(response.content),
+                                    get_retries_count(response))
+
+    def _record_request(self, stats_key: str, duration: float, failed: bool):
+        with self._stats_lock:
+            stats = self._request_stats.get(stats_key, RequestStats(0, 0, 0.0, 0.0))
+            self._request_stats[stats_key] = RequestStats(count=stats.count + 1,
+                                                          errors=stats.errors + int(failed),
+                                                          total_seconds=stats.total_seconds + duration,
+                                                          max_seconds=max(stats.max_seconds, duration))
+
+    def get_request_stats(self) -> Dict[str, RequestStats]:
+        """
+        :return: the latency counters of the calls made so far, by action
+        """
+        with self._stats_lock:
+            return dict(self._request_stats)
+
+    def close(self):
+        """Close the connections of the session."""
+        self.session.close()
 
     def get_auth_token_request_data(self) -> dict:
         """
@@ -124,20 +370,72 @@ class Service:
             "fromDashboard": from_dashboard
         }
 
-    def get_token(self) -> str:
-        response = requests.get(
-            settings.monitisapi["api_url"],
-            params=self.get_auth_token_request_data())
+    def request_token(self) -> str:
+        """
+        Request a new auth token from the API, bypassing the cache.
+
+        :return: the auth token
+        """
+        response = self.request(settings.monitisapi["api_actions"]["get_auth_token"], "GET",
+                                settings.monitisapi["api_url"],
+                                params=self.get_auth_token_request_data())
         return response.json()["authToken"]
 
-    def add_rum_monitor(self, monitor_name: str, resource_url: str, auth_token: str,
-                        tag: str) -> requests.Response:
+    def get_token(self, rejected_token: str = None) -> str:
+        """
+        Provide a valid auth token, from the cache if possible.
+
+        :param rejected_token: a token rejected by the API. If it is still the
+        cached token, it is replaced by a new one.
+        :return: the auth token
+        """
+        with self._token_lock:
+            auth_token = self.token_cache.get(self.api_key)
+            if auth_token is not None and auth_token == rejected_token:
+                self.token_cache.invalidate(self.api_key)
+                auth_token = None
+            if auth_token is None:
+                auth_token = self.request_token()
+                self.token_cache.set(self.api_key, auth_token)
+            return auth_token
+
+    def add_rum_monitor(self, monitor_name: str, resource_url: str, auth_token: str = None,
+                        tag: str = None, rate_limiter: RateLimiter = None) -> requests.Response:
+        """
+        Create a RUM monitor.
+
+        :param monitor_name: the name to assign to the monitor
+        :param resource_url: the resource to monitor
+        :param auth_token: auth token for authentication. If None, the cached token
+        is used, and renewed once if the API rejects it.
+        :param tag: the group name or list of the groups the monitor will belong to: E.g. ["dev", "ops"].
+        Required: it only has a default so that auth_token keeps its position.
+        :param rate_limiter: if given, waited before each creation call, including the
+        one repeated with a renewed token.
+        :return: the response of the API
+        """
+        if tag is None:
+            raise TypeError("add_rum_monitor() missing the tag argument")
+        use_cached_token = auth_token is None
+        if use_cached_token:
+            auth_token = self.get_token()
+        response = self._post_rum_monitor(monitor_name, resource_url, tag, auth_token, rate_limiter)
+        if use_cached_token and is_auth_error(response):
+            auth_token = self.get_token(rejected_token=auth_token)
+            response = self._post_rum_monitor(monitor_name, resource_url, tag, auth_token, rate_limiter)
+        return response
+
+    def _post_rum_monitor(self, monitor_name: str, resource_url: str, tag: str,
+                          auth_token: str, rate_limiter: Optional[RateLimiter]) -> requests.Response:
+        if rate_limiter is not None:
+            rate_limiter.wait()
         data = self.get_add_monitor_request_data(
             auth_token=auth_token,
             monitor_name=monitor_name,
             resource_url=resource_url,
             tag=tag)
-        return requests.post(settings.monitisapi["api_url"], data=data)
+        return self.request(settings.monitisapi["api_actions"]["add_rum"], "POST",
+                            settings.monitisapi["api_url"], data=data)
 
     def list_monitors(self) -> List[dict]:
         """
@@ -164,5 +462,23 @@ class Service:
             ]
         """
         search_url = settings.monitisapi["search_url"].format(user_key=self.user_key)
-        response = requests.get(search_url)
-        return response.json()["searchItems"]["monitors"]
+        response = self.request("searchitem", "GET", search_url)
+        with metrics.time("parse", "monitis.searchitem"):
+            return response.json()["searchItems"]["monitors"]
+
+    def iter_monitors(self, chunk_size: int = settings.monitisapi["http"]["stream_chunk_size"]) -> Iterator[dict]:
+        """
+        Stream the list of monitors: the monitors are decoded one by one while the
+        response is downloaded, instead of loading the whole response in memory.
+
+        The latency recorded for this call is the time to receive the response headers.
+
+        :param chunk_size: number of bytes read from the response at a time
+        :return: an iterator over the monitors, in the same form as list_monitors()
+        """
+        search_url = settings.monitisapi["search_url"].format(user_key=self.user_key)
+        response = self.request("searchitem", "GET", search_url, stream=True)
+        with response:
+            response.raise_for_status()
+            yield from iter_json_array_items(iter_counted_chunks(response.iter_content(chunk_size), "searchitem"),
+                                             "monitors", encoding=response.encoding or "utf-8")
@@ -1,4 +1,13 @@
 import argparse
+import contextlib
+import functools
+import re
+import sys
+import threading
+import time
+from typing import Callable, Iterable, List, Optional, TextIO
+
+from webapis.instrumentation import metrics_argparser
 
 
 def get_output_arg_parser(description: str="", require_credentials: bool=True,
@@ -9,13 +18,15 @@ def get_output_arg_parser(description: str="", require_credentials: bool=True,
     The parser will expect the arguments:
     * --credentials: path to the credentials file to use to authenticate over the API.
     * --output: path of the file where the data must be written
+    * --metrics, --metrics-format: where the measures of the API calls are written
+    (see instrumentation.metrics_argparser)
 
     :param description: description of the parser
     :param require_credentials: tell whether or not the credentials
     argument must be required.
     :param parents: parents parser. Especially useful for Google API Client.
     """
-    parser = argparse.ArgumentParser(description=description, parents=parents)
+    parser = argparse.ArgumentParser(description=description, parents=list(parents) + [metrics_argparser])
     parser.add_argument('--credentials',
                         dest="credentials",
                         required=require_credentials,
@@ -40,6 +51,8 @@ def get_input_arg_parser(description: str="", require_credentials: bool=True,
     The parser will expect the arguments:
     * --credentials: path to the credentials file to use to authenticate over the API.
     * --input: path of the file to use as the data input
+    * --metrics, --metrics-format: where the measures of the API calls are written
+    (see instrumentation.metrics_argparser)
 
     :param description: description of the parser
     :param require_credentials: tell whether or not the credentials
@@ -48,7 +61,7 @@ def get_input_arg_parser(description: str="", require_credentials: bool=True,
     argument must be required.
     :param parents: parents parser. Especially useful for Google API Client.
     """
-    parser = argparse.ArgumentParser(description=description, parents=parents)
+    parser = argparse.ArgumentParser(description=description, parents=list(parents) + [metrics_argparser])
     parser.add_argument('--credentials',
                         dest="credentials",
                         required=require_credentials,
@@ -64,6 +77,29 @@ def get_input_arg_parser(description: str="", require_credentials: bool=True,
     return parser
 
 
+def get_diff_arg_parser(description: str="", parents: tuple=()) -> argparse.ArgumentParser:
+    """
+    Provide an arg parser for scripts that compare two dumps.
+
+    The parser will expect the arguments:
+    * --old: path of the old dump
+    * --new: path of the new dump
+
+    :param description: description of the parser
+    :param parents: parents parser.
+    """
+    parser = argparse.ArgumentParser(description=description, parents=parents)
+    parser.add_argument('--old',
+                        dest="old_dump",
+                        required=True,
+                        help='path of the old dump')
+    parser.add_argument('--new',
+                        dest="new_dump",
+                        required=True,
+                        help='path of the new dump')
+    return parser
+
+
 def str_to_boolean(value: str):
     if value.lower() in ('yes', 'true', 't', 'y', '1'):
         print("ici")
@@ -111,6 +147,18 @@ def substring_after(initial_str: str, sub: str) -> str:
     return parts[0]
 
 
+DOMAIN_NAME_CACHE_SIZE = 65536
+"""Maximum number of URLs whose domain name is memoized by get_domain_name_from_url()"""
+
+_URL_HOST = re.compile(r"\s*(?:[a-z][a-z0-9+.-]*://|//)?(?:[^/?#@]*@)?(?:www\d*\.(?=[^/?#:.]+\.[^/?#:.]))?"
+                       r"(\[[^\]]*\]|[^/?#:]*)", re.IGNORECASE)
+"""
+Captures the host of an URL, after the optional scheme, user info and www., www2... prefix, and before
+the port or the path. The prefix is kept if it is followed by a single label (www.com).
+"""
+
+
+@functools.lru_cache(maxsize=DOMAIN_NAME_CACHE_SIZE)
 def get_domain_name_from_url(url: str) -> str:
     """
     Extract the domain name from an URL.
@@ -118,11 +166,165 @@ def get_domain_name_from_url(url: str) -> str:
     Given an URL in the form http://www.ipsen.com/fr/,
     returns ipsen.com
 
+    The scheme (whatever its case), user info, port, path, query and fragment
+    are removed, as well as a www., www2.... prefix. The domain name is lower
+    case, and internationalized domain names are converted to their ASCII
+    (punycode) form, so that equivalent URLs give the same domain name.
+
+    The results are memoized: the same URLs are often found on several rows.
+
     :param url: the URL from wich we want to extract a domain name
     :return: the domain name extracted from the URL
     """
-    wo_url = substring_after(substring_after(substring_after(url, "http://"), "https://"), "www.")
-    return substring_before(wo_url, "/")
+    host = _URL_HOST.match(url).group(1).strip().rstrip(".").lower()
+    try:
+        host.encode("ascii")
+    except UnicodeEncodeError:
+        try:
+            host = host.encode("idna").decode("ascii")
+        except UnicodeError:
+            # Not a valid internationalized domain name: kept as is.
+            pass
+    return host
+
+
+def get_domain_names_from_urls(urls: Iterable[str]) -> List[str]:
+    """
+    Extract the domain names of a column of URLs (see get_domain_name_from_url()).
+
+    Each distinct URL is normalized only once, whatever the number of times it
+    appears in the column, and the domain names are memoized for the following
+    calls, like those of get_domain_name_from_url().
+
+    :param urls: the URLs from wich we want to extract the domain names
+    :return: the domain names, in the order of the URLs
+    """
+    urls = urls if isinstance(urls, (list, tuple)) else list(urls)
+    unique_urls = set(urls)
+    domain_names = dict(zip(unique_urls, map(get_domain_name_from_url, unique_urls)))
+    return [domain_names[url] for url in urls]
+
+
+class RateLimiter:
+    """
+    Limit the rate of calls made to an API, possibly from several threads.
+
+    Usage example:
+    ``
+    rate_limiter = RateLimiter(calls_per_second=5)
+    for item in items:
+        rate_limiter.wait()
+        call_the_api(item)
+    ``
+    """
+    def __init__(self, calls_per_second: float):
+        """
+        :param calls_per_second: maximum number of calls per second. If not positive,
+        the rate is not limited.
+        """
+        self._interval = 1.0 / calls_per_second if calls_per_second > 0 else 0
+        self._next_call_time = 0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Block until the next call is allowed."""
+        if not self._interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            call_time = max(now, self._next_call_time)
+            self._next_call_time = call_time + self._interval
+        if call_time > now:
+            time.sleep(call_time - now)
+
+
+class LabelledOutput:
+    """
+    A text stream shared by threads, which prefixes each line written by a thread
+    with the label of the task the thread is running, so that the outputs of
+    concurrent tasks can be told apart. The lines are written whole: the lines of
+    two threads are never mixed. The threads without a label write as is.
+
+    Usage example:
+    ``
+    with contextlib.redirect_stdout(LabelledOutput(sys.stdout)) as output:
+        def task(label):
+            with output.labelled(label):
+                print("Done")  # [<label>] Done
+        ...
+    ``
+    """
+    def __init__(self, stream: TextIO):
+        """
+        :param stream: the stream where the lines are written
+        """
+        self._stream = stream
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def get_label(self) -> Optional[str]:
+        """
+        :return: the label of the current thread, None if it has none
+        """
+        return getattr(self._local, "label", None)
+
+    @contextlib.contextmanager
+    def labelled(self, label: str):
+        """
+        Prefix the lines written by the current thread with a label, until the end
+        of the with block. The last line is then written even if it is not complete.
+
+        :param label: the label of the task run by the current thread
+        """
+        previous_label, previous_line = self.get_label(), getattr(self._local, "line", "")
+        self._local.label, self._local.line = label, ""
+        try:
+            yield self
+        finally:
+            if self._local.line:
+                self._write_lines([self._local.line])
+            self._local.label, self._local.line = previous_label, previous_line
+
+    def write(self, text: str) -> int:
+        if self.get_label() is None:
+            with self._lock:
+                return self._stream.write(text)
+        lines = (self._local.line + text).split("\n")
+        self._local.line = lines.pop()
+        if lines:
+            self._write_lines(lines)
+        return len(text)
+
+    def _write_lines(self, lines: List[str]):
+        prefix = "[%s] " % self._local.label
+        with self._lock:
+            self._stream.write("".join(prefix + line + "\n" for line in lines))
+
+    def flush(self):
+        with self._lock:
+            self._stream.flush()
+
+    def __getattr__(self, name: str):
+        return getattr(self._stream, name)
+
+
+def with_output_label(function: Callable) -> Callable:
+    """
+    Make a function print with the label of the calling thread (see LabelledOutput)
+    when it is run by other threads, like those of a pool.
+
+    :param function: the function to run in other threads
+    :return: the function, run with the label of the current thread if it has one
+    """
+    output = sys.stdout
+    label = output.get_label() if isinstance(output, LabelledOutput) else None
+    if label is None:
+        return function
+
+    def labelled_function(*args, **kwargs):
+        with output.labelled(label):
+            return function(*args, **kwargs)
+    return labelled_function
 
 
 class Console: